@@ -21,7 +21,7 @@ fileConfig(config.config_file_name)
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 # target_metadata = None
-from models import factors, users, computational_motif
+from models import factors, users, computational_motif, catalog_version, search_job
 
 target_metadata = SQLModel.metadata
 
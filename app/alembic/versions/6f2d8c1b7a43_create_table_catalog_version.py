@@ -0,0 +1,36 @@
+"""create table catalog_version
+
+Revision ID: 6f2d8c1b7a43
+Revises: 5c6e19bff8ee
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6f2d8c1b7a43"
+down_revision: Union[str, None] = "5c6e19bff8ee"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    catalog_version = op.create_table(
+        "catalogversion",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.bulk_insert(
+        catalog_version, [{"id": 1, "version": 0, "updated_at": datetime.now()}]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("catalogversion")
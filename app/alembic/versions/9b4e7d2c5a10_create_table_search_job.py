@@ -0,0 +1,55 @@
+"""create table search_job
+
+Revision ID: 9b4e7d2c5a10
+Revises: 6f2d8c1b7a43
+Create Date: 2026-10-18 14:37:05.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4e7d2c5a10"
+down_revision: Union[str, None] = "6f2d8c1b7a43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "searchjob",
+        sa.Column("kind", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+        sa.Column("error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("history_id", sa.Integer(), nullable=True),
+        sa.Column("id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column("sequences", sa.JSON(), nullable=False),
+        sa.Column("results", sa.JSON(), nullable=True),
+        sa.Column("result_file", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["history_id"],
+            ["searchforcrehistory.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["user.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_searchjob_status"), "searchjob", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_searchjob_status"), table_name="searchjob")
+    op.drop_table("searchjob")
@@ -0,0 +1,61 @@
+"""update table computational_motif add matrix and sites
+
+Revision ID: c41f7e2a9d36
+Revises: 9b4e7d2c5a10
+Create Date: 2026-10-18 15:02:41.507316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41f7e2a9d36"
+down_revision: Union[str, None] = "9b4e7d2c5a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "computationalmotif",
+        sa.Column("matrix_name", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.add_column("computationalmotif", sa.Column("score", sa.Float(), nullable=True))
+    op.add_column(
+        "computationalmotif", sa.Column("matrix", sa.LargeBinary(), nullable=True)
+    )
+    op.create_table(
+        "computationalmotifsite",
+        sa.Column("sequence_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("start", sa.Integer(), nullable=False),
+        sa.Column("end", sa.Integer(), nullable=False),
+        sa.Column("strand", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("site", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("motif_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["motif_id"], ["computationalmotif.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_computationalmotifsite_motif_id"),
+        "computationalmotifsite",
+        ["motif_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_computationalmotifsite_motif_id"), table_name="computationalmotifsite"
+    )
+    op.drop_table("computationalmotifsite")
+    op.drop_column("computationalmotif", "matrix")
+    op.drop_column("computationalmotif", "score")
+    op.drop_column("computationalmotif", "matrix_name")
@@ -12,6 +12,7 @@ from models.factors_function_labels import (
 
 from core.config import settings
 from models.base import Message
+from api.applications.cre.motif_catalog import bump_catalog_version
 
 
 def read_all_cre(
@@ -82,6 +83,7 @@ def update_cre(
 
     db_factors.sqlmodel_update(data_in.model_dump(exclude_unset=True))
     session.add(db_factors)
+    bump_catalog_version(session)
     session.commit()
     session.refresh(db_factors)
 
@@ -97,6 +99,7 @@ def delete_cre(session: Session, factor_id: uuid.UUID) -> Message:
         )
 
     session.delete(db_factors)
+    bump_catalog_version(session)
     session.commit()
 
     return Message(status_code=status.HTTP_200_OK, message="Item deleted")
@@ -144,6 +147,7 @@ def update_function_label(
 
     db_function_label.sqlmodel_update(data_in.model_dump(exclude_unset=True))
     session.add(db_function_label)
+    bump_catalog_version(session)
     session.commit()
     session.refresh(db_function_label)
 
@@ -161,6 +165,7 @@ def delete_function_label(session: Session, ft_id: uuid.UUID) -> Message:
         )
 
     session.delete(db_function_label)
+    bump_catalog_version(session)
     session.commit()
 
     return Message(status_code=status.HTTP_200_OK, message="Item deleted")
@@ -0,0 +1,129 @@
+import hashlib
+
+import numpy as np
+
+# 4-bit nucleotide masks; an IUPAC code is the union of the bases it stands for
+BASE_MASKS = {"A": 1, "C": 2, "G": 4, "T": 8}
+IUPAC_MASKS = {
+    "-": 0,
+    "A": 1,
+    "C": 2,
+    "M": 3,
+    "G": 4,
+    "R": 5,
+    "S": 6,
+    "V": 7,
+    "T": 8,
+    "W": 9,
+    "Y": 10,
+    "H": 11,
+    "K": 12,
+    "D": 13,
+    "B": 14,
+    "N": 15,
+}
+GAP = 0
+# Codes read as the base they stand for, never written back by `to_text()`:
+# RNA uracil is thymine
+BASE_ALIASES = {"U": BASE_MASKS["T"]}
+SEQUENCE_MASKS = {**IUPAC_MASKS, **BASE_ALIASES}
+
+# Characters outside the IUPAC alphabet are stored as a gap
+ENCODE_TABLE = np.full(256, GAP, dtype=np.uint8)
+for _char, _mask in SEQUENCE_MASKS.items():
+    ENCODE_TABLE[ord(_char)] = _mask
+    ENCODE_TABLE[ord(_char.lower())] = _mask
+
+DECODE_TABLE = np.zeros(16, dtype=np.uint8)
+for _char, _mask in IUPAC_MASKS.items():
+    DECODE_TABLE[_mask] = ord(_char)
+
+# Masks that can take part in a match: the four unambiguous bases
+CONCRETE_TABLE = np.array(
+    [mask if mask in BASE_MASKS.values() else GAP for mask in range(16)],
+    dtype=np.uint8,
+)
+
+# Complementing a mask swaps A <-> T and C <-> G bit-wise (R <-> Y, K <-> M, ...)
+COMPLEMENT_TABLE = np.array(
+    [
+        ((mask & 1) << 3) | ((mask & 2) << 1) | ((mask & 4) >> 1) | ((mask & 8) >> 3)
+        for mask in range(16)
+    ],
+    dtype=np.uint8,
+)
+
+
+class EncodedSequence:
+    """
+    Nucleotide sequence stored as one 4-bit IUPAC mask per base.
+
+    Wraps a NumPy uint8 array: slicing returns views that share the buffer,
+    the reverse complement is a single table lookup, and `to_text()` restores
+    the upper-cased IUPAC text (U as T). `packed()` stores two bases per byte for
+    caches and persistence. Matching treats only the single-base masks
+    (A, C, G, T) as concrete, so ambiguous or unknown input never matches a
+    motif, exactly like the regex search on upper-case text.
+    """
+
+    __slots__ = ("codes",)
+
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+
+    @classmethod
+    def from_text(cls, text: str) -> "EncodedSequence":
+        return cls.from_bytes(text.encode("ascii", "replace"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "EncodedSequence":
+        return cls(ENCODE_TABLE[np.frombuffer(data, dtype=np.uint8)])
+
+    @classmethod
+    def coerce(cls, sequence: "EncodedSequence | str") -> "EncodedSequence":
+        if isinstance(sequence, EncodedSequence):
+            return sequence
+        return cls.from_text(sequence)
+
+    @classmethod
+    def from_packed(cls, data: bytes, length: int) -> "EncodedSequence":
+        packed = np.frombuffer(data, dtype=np.uint8)
+        codes = np.empty(len(packed) * 2, dtype=np.uint8)
+        codes[0::2] = packed >> 4
+        codes[1::2] = packed & 0x0F
+        return cls(codes[:length])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, item: slice) -> "EncodedSequence":
+        if not isinstance(item, slice):
+            raise TypeError("EncodedSequence only supports slicing")
+        return EncodedSequence(self.codes[item])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EncodedSequence):
+            return NotImplemented
+        return np.array_equal(self.codes, other.codes)
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+    def reverse_complement(self) -> "EncodedSequence":
+        return EncodedSequence(COMPLEMENT_TABLE[self.codes[::-1]])
+
+    def to_text(self) -> str:
+        return DECODE_TABLE[self.codes].tobytes().decode("ascii")
+
+    def packed(self) -> bytes:
+        codes = self.codes
+        if len(codes) % 2:
+            codes = np.append(codes, np.uint8(GAP))
+        return ((codes[0::2] << 4) | codes[1::2]).astype(np.uint8).tobytes()
+
+    def digest(self) -> str:
+        return hashlib.sha256(np.ascontiguousarray(self.codes).tobytes()).hexdigest()
@@ -0,0 +1,19 @@
+from api.applications.cre.engines.aho_corasick_engine import AhoCorasickMatcher
+from api.applications.cre.engines.bit_parallel_engine import BitParallelMatcher
+from api.applications.cre.engines.regex_engine import RegexMatcher, iupac_to_regex
+from api.applications.cre.engines.strand_folding import StrandFoldedMatcher
+
+SEARCH_ENGINES = {
+    RegexMatcher.name: RegexMatcher,
+    AhoCorasickMatcher.name: AhoCorasickMatcher,
+    BitParallelMatcher.name: BitParallelMatcher,
+}
+
+__all__ = [
+    "SEARCH_ENGINES",
+    "AhoCorasickMatcher",
+    "BitParallelMatcher",
+    "RegexMatcher",
+    "StrandFoldedMatcher",
+    "iupac_to_regex",
+]
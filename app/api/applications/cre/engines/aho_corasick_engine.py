@@ -0,0 +1,158 @@
+import math
+from collections import deque
+from itertools import product
+
+import numpy as np
+
+from api.applications.cre.encoded_sequence import (
+    BASE_MASKS,
+    CONCRETE_TABLE,
+    EncodedSequence,
+)
+from api.applications.cre.engines.base import IUPAC_BASES, MotifMatcher, motif_masks
+
+# Upper bound on the number of concrete strings a single motif may contribute
+# to the automaton when its anchor window spans degenerate IUPAC positions.
+MAX_ANCHOR_EXPANSIONS = 64
+
+_ALPHABET = "ACGT"
+_ALPHABET_SIZE = len(_ALPHABET) + 1  # the extra symbol resets to the root
+# Maps the 4-bit masks of an EncodedSequence onto automaton symbols
+_CODE_TABLE = bytes(
+    _ALPHABET.index(base) if base else len(_ALPHABET)
+    for base in (
+        next((base for base, mask in BASE_MASKS.items() if mask == byte), None)
+        for byte in range(256)
+    )
+)
+
+
+def _choose_anchor(motif: str) -> tuple[int, int] | None:
+    """
+    Pick the most selective window of `motif` whose IUPAC expansion stays
+    within `MAX_ANCHOR_EXPANSIONS`. Returns `(start, end)`.
+    """
+    best = None
+    best_key = None
+    for start in range(len(motif)):
+        expansions = 1
+        information = 0.0
+        for end in range(start + 1, len(motif) + 1):
+            bases = IUPAC_BASES[motif[end - 1]]
+            expansions *= len(bases)
+            if expansions > MAX_ANCHOR_EXPANSIONS:
+                break
+            information += math.log2(len(_ALPHABET) / len(bases))
+            key = (information, -expansions, -start)
+            if best_key is None or key > best_key:
+                best, best_key = (start, end), key
+    return best
+
+
+class AhoCorasickMatcher(MotifMatcher):
+    """
+    Single-pass multi-pattern matcher.
+
+    Every motif contributes the concrete expansions of its most selective
+    window ("anchor") to one Aho-Corasick automaton, compiled into a dense
+    transition table. A scan walks the sequence once; each anchor hit yields
+    a candidate start whose remaining motif positions are then verified
+    against the sequence masks, vectorised per motif. The scan cost therefore
+    depends on the sequence length and the number of candidates, not on the
+    number of motifs in the catalog.
+    """
+
+    name = "aho_corasick"
+
+    def __init__(self, database: dict[str, str]):
+        super().__init__(database)
+        # motif index -> [(offset, mask)] of the positions outside its anchor
+        self.verifiers = {}
+
+        goto = [{}]
+        outputs = [[]]
+        for index, (_, value) in enumerate(self.motifs):
+            masks = motif_masks(value)
+            if masks is None:
+                continue
+
+            start, end = _choose_anchor(value)
+            self.verifiers[index] = [
+                (offset, mask)
+                for offset, mask in enumerate(masks)
+                if not start <= offset < end
+            ]
+            for expansion in product(*(IUPAC_BASES[char] for char in value[start:end])):
+                state = 0
+                for char in expansion:
+                    code = _ALPHABET.index(char)
+                    next_state = goto[state].get(code)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][code] = next_state
+                        goto.append({})
+                        outputs.append([])
+                    state = next_state
+                outputs[state].append((index, start, end - start))
+
+        self._delta, self._outputs = self._compile(goto, outputs)
+
+    @staticmethod
+    def _compile(goto, outputs):
+        """Resolve failure links into a dense DFA transition table."""
+        delta = [[0] * _ALPHABET_SIZE for _ in goto]
+        fail = [0] * len(goto)
+        merged = [list(output) for output in outputs]
+
+        queue = deque()
+        for code in range(len(_ALPHABET)):
+            next_state = goto[0].get(code)
+            if next_state is not None:
+                delta[0][code] = next_state
+                queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            merged[state].extend(merged[fail[state]])
+            for code in range(len(_ALPHABET)):
+                next_state = goto[state].get(code)
+                if next_state is None:
+                    delta[state][code] = delta[fail[state]][code]
+                else:
+                    fail[next_state] = delta[fail[state]][code]
+                    delta[state][code] = next_state
+                    queue.append(next_state)
+
+        return delta, [tuple(output) if output else None for output in merged]
+
+    def find_starts(self, sequence: EncodedSequence) -> dict[int, list[int]]:
+        length = len(sequence)
+        codes = sequence.codes.tobytes().translate(_CODE_TABLE)
+        delta = self._delta
+        outputs = self._outputs
+
+        candidates = {}
+        state = 0
+        for position, code in enumerate(codes):
+            state = delta[state][code]
+            hits = outputs[state]
+            if hits is not None:
+                for index, offset, anchor_length in hits:
+                    start = position + 1 - anchor_length - offset
+                    candidates.setdefault(index, []).append(start)
+
+        concrete = CONCRETE_TABLE[sequence.codes]
+        starts_by_motif = {}
+        for index, starts in candidates.items():
+            verifier = self.verifiers[index]
+            if verifier:
+                motif_length = len(self.motifs[index][1])
+                starts = np.array(starts)
+                starts = starts[(starts >= 0) & (starts <= length - motif_length)]
+                matched = np.ones(len(starts), dtype=bool)
+                for offset, mask in verifier:
+                    matched &= (concrete[starts + offset] & mask) != 0
+                starts = starts[matched].tolist()
+            if starts:
+                starts_by_motif[index] = starts
+        return starts_by_motif
@@ -0,0 +1,161 @@
+from api.applications.cre.encoded_sequence import SEQUENCE_MASKS, EncodedSequence
+from api.applications.cre.hit_table import FORWARD, REVERSE, HitTable
+
+IUPAC_BASES = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "T",
+    "U": "T",
+    "R": "AG",
+    "Y": "CT",
+    "S": "GC",
+    "W": "AT",
+    "K": "GT",
+    "M": "AC",
+    "B": "CGT",
+    "D": "AGT",
+    "H": "ACT",
+    "V": "ACG",
+    "N": "ACGT",
+}
+
+# Same semantics as the controllers' reverse complement: only upper-case
+# A/C/G/T are complemented, everything else is kept before upper-casing.
+_SEQUENCE_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+_IUPAC_COMPLEMENT = str.maketrans("ACGTURYSWKMBDHVN", "TGCAAYRSWMKVHDBN")
+
+
+def reverse_complement(sequence: str) -> str:
+    return sequence[::-1].translate(_SEQUENCE_COMPLEMENT).upper()
+
+
+def reverse_complement_motif(motif: str) -> str:
+    """Reverse complement of an IUPAC motif (R <-> Y, K <-> M, B <-> V, ...)."""
+    return motif[::-1].translate(_IUPAC_COMPLEMENT)
+
+
+def motif_masks(motif: str) -> list[int] | None:
+    """4-bit masks of an IUPAC motif, or None if the motif can never match."""
+    if not motif or any(char not in IUPAC_BASES for char in motif):
+        return None
+    return [SEQUENCE_MASKS[char] for char in motif]
+
+
+def leftmost_non_overlapping(starts: list[int], length: int) -> list[int]:
+    """
+    Reduce sorted, possibly overlapping start positions of a fixed-length
+    motif to the hits `re.finditer` would report (leftmost, non-overlapping).
+    """
+    kept = []
+    next_free = -1
+    for start in starts:
+        if start >= next_free:
+            kept.append(start)
+            next_free = start + length
+    return kept
+
+
+class MotifMatcher:
+    """
+    Base class of the search engines.
+
+    Subclasses compile `database` (`{ac: sq}`) in `__init__` and implement
+    `find_starts`, which returns every (possibly overlapping) start of every
+    motif in an `EncodedSequence`. `find` turns those into the
+    `(value, key, start, end)` tuples of the leftmost non-overlapping
+    matches, in catalog order, and `find_hits` into a `HitTable` of both
+    strands. Plain strings are encoded on the way in.
+    """
+
+    name = None
+
+    def __init__(self, database: dict[str, str]):
+        self.motifs = list(database.items())
+        self.motif_lengths = [len(value) for _, value in self.motifs]
+
+    def find_starts(self, sequence: EncodedSequence) -> dict[int, list[int]]:
+        raise NotImplementedError
+
+    def find(
+        self, sequence: EncodedSequence | str
+    ) -> list[tuple[str, str, int, int]]:
+        sequence = EncodedSequence.coerce(sequence)
+        return self.build_matches(self.find_starts(sequence))
+
+    def find_both_strands(
+        self, sequence: EncodedSequence | str
+    ) -> tuple[list[tuple[str, str, int, int]], list[tuple[str, str, int, int]]]:
+        """Matches on the sequence and on its reverse complement."""
+        sequence = EncodedSequence.coerce(sequence)
+        return self.find(sequence), self.find(sequence.reverse_complement())
+
+    def find_strand_starts(
+        self, sequence: EncodedSequence
+    ) -> tuple[dict[int, list[int]], dict[int, list[int]]]:
+        """
+        `find_starts` of both strands, the reverse ones in ascending reverse
+        complement coordinates.
+        """
+        return self.find_starts(sequence), self.find_starts(sequence.reverse_complement())
+
+    def find_hits(self, sequence: EncodedSequence | str) -> HitTable:
+        """The matches of `find_both_strands` as a `HitTable`."""
+        sequence = EncodedSequence.coerce(sequence)
+        forward_starts, reverse_starts = self.find_strand_starts(sequence)
+        return HitTable.concat(
+            [
+                self.build_hits(forward_starts, FORWARD),
+                self.build_hits(reverse_starts, REVERSE),
+            ]
+        )
+
+    def build_hits(self, starts_by_motif: dict[int, list[int]], strand: int) -> HitTable:
+        return HitTable.from_starts(starts_by_motif, self.motif_lengths, strand)
+
+    def count_both_strands(
+        self, sequence: EncodedSequence | str
+    ) -> tuple[dict[int, int], dict[int, int]]:
+        """
+        Number of `find_both_strands` matches of each motif index on both
+        strands, without building the match tuples.
+        """
+        sequence = EncodedSequence.coerce(sequence)
+        return tuple(
+            self.count_starts(starts) for starts in self.find_strand_starts(sequence)
+        )
+
+    def find_present_both_strands(
+        self, sequence: EncodedSequence | str
+    ) -> tuple[set[int], set[int]]:
+        """Indexes of the motifs found at least once on either strand."""
+        sequence = EncodedSequence.coerce(sequence)
+        return tuple(
+            {index for index, starts in starts_by_motif.items() if starts}
+            for starts_by_motif in self.find_strand_starts(sequence)
+        )
+
+    @property
+    def max_motif_length(self) -> int:
+        return max((len(value) for _, value in self.motifs), default=0)
+
+    def count_starts(self, starts_by_motif: dict[int, list[int]]) -> dict[int, int]:
+        counts = {}
+        for index, starts in starts_by_motif.items():
+            if starts:
+                counts[index] = len(
+                    leftmost_non_overlapping(starts, len(self.motifs[index][1]))
+                )
+        return counts
+
+    def build_matches(
+        self, starts_by_motif: dict[int, list[int]]
+    ) -> list[tuple[str, str, int, int]]:
+        found_sequences = []
+        for index, (key, value) in enumerate(self.motifs):
+            starts = starts_by_motif.get(index)
+            if not starts:
+                continue
+            for start in leftmost_non_overlapping(starts, len(value)):
+                found_sequences.append((value, key, start, start + len(value)))
+        return found_sequences
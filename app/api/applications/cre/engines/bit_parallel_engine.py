@@ -0,0 +1,210 @@
+import numpy as np
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.base import MotifMatcher, motif_masks
+from api.applications.cre.hit_table import FORWARD, REVERSE, HitTable
+
+# Number of 64-bit words (64 sequence positions each) scanned per block
+BLOCK_WORDS = 1024
+
+_WORD_BITS = 64
+_BASE_BITS = np.array([1, 2, 4, 8], dtype=np.uint8)
+# _MASK_HAS_BASE[mask, i] is True when the 4-bit mask contains base i
+_MASK_HAS_BASE = (np.arange(16, dtype=np.uint8)[:, None] & _BASE_BITS[None, :]) != 0
+
+
+def pack_base_planes(masks: np.ndarray, padding_words: int) -> np.ndarray:
+    """
+    Return a (4, words) uint64 array where bit `i` of plane `b` is set when
+    position `i` holds base `b`. `padding_words` zero words are appended so
+    shifted reads past the end of the sequence stay in bounds.
+    """
+    words = -(-len(masks) // _WORD_BITS) + padding_words
+    planes = np.zeros((4, words * 8), dtype=np.uint8)
+    for index, base_mask in enumerate(_BASE_BITS):
+        packed = np.packbits(masks == base_mask, bitorder="little")
+        planes[index, : len(packed)] = packed
+    return planes.view("<u8")
+
+
+def _shift_planes(planes: np.ndarray, offset: int, words: int) -> np.ndarray:
+    """Shift packed bitsets so that bit `i` describes position `i + offset`."""
+    word_offset, bit_offset = divmod(offset, _WORD_BITS)
+    low = planes[:, word_offset : word_offset + words]
+    if bit_offset == 0:
+        return low.copy()
+    high = planes[:, word_offset + 1 : word_offset + 1 + words]
+    return (low >> np.uint64(bit_offset)) | (high << np.uint64(_WORD_BITS - bit_offset))
+
+
+def _symbol_planes(base_planes: np.ndarray) -> np.ndarray:
+    """Expand 4 base planes into the 16 planes of every possible IUPAC mask."""
+    selected = np.where(_MASK_HAS_BASE[:, :, None], base_planes[None, :, :], 0)
+    return np.bitwise_or.reduce(selected, axis=1)
+
+
+class BitParallelMatcher(MotifMatcher):
+    """
+    Shift-And style matcher vectorised with NumPy across the whole catalog.
+
+    The 4-bit masks of the `EncodedSequence` are packed into one bitset per
+    base. Each motif's state is a bitset over sequence positions: after
+    column `j` bit `i` is set when the motif prefix of length `j + 1` matches
+    at `i`. All motifs (sorted by length so the still-active ones form a
+    prefix of the state matrix) are advanced together, one column at a time,
+    by AND-ing with the shifted plane of the column's IUPAC mask. No regex is
+    involved, and the cost grows with total motif length times sequence
+    length / 64.
+    """
+
+    name = "bit_parallel"
+
+    def __init__(self, database: dict[str, str]):
+        super().__init__(database)
+
+        bit_parallel = [
+            index
+            for index, (_, value) in enumerate(self.motifs)
+            if motif_masks(value) is not None
+        ]
+
+        # Longest motifs first: at column j the active motifs are rows [0, k)
+        self.order = np.array(
+            sorted(bit_parallel, key=lambda index: -len(self.motifs[index][1])),
+            dtype=np.int64,
+        )
+        self.lengths = np.array(
+            [len(self.motifs[index][1]) for index in self.order], dtype=np.int64
+        )
+        self.max_length = int(self.lengths.max()) if len(self.order) else 0
+        self.columns = np.zeros((len(self.order), self.max_length), dtype=np.uint8)
+        for row, index in enumerate(self.order):
+            value = self.motifs[index][1]
+            self.columns[row, : len(value)] = motif_masks(value)
+        self.active = [
+            int(np.count_nonzero(self.lengths > column))
+            for column in range(self.max_length)
+        ]
+
+    def scan_positions(
+        self, masks: np.ndarray, max_mismatches: int = 0
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return `(rows, starts, mismatches)` of every, possibly overlapping,
+        occurrence with at most `max_mismatches` substitutions. Rows index
+        `self.order`; the result is sorted by row, then start.
+
+        With mismatches, `k + 1` states are kept per motif (Shift-And with
+        error states): after column `j`, bit `i` of state `e` is set when the
+        motif prefix of length `j + 1` matches at `i` with at most `e`
+        mismatches, i.e. `D[e] = (D[e] & match) | D[e - 1]`. Motifs no longer
+        than `max_mismatches` would match everywhere and are skipped.
+        """
+        empty = np.empty(0, dtype=np.int64)
+        if not len(self.order) or not len(masks):
+            return empty, empty, empty.astype(np.int8)
+
+        padding_words = self.max_length // _WORD_BITS + 2
+        base_planes = pack_base_planes(masks, padding_words)
+        total_words = base_planes.shape[1] - padding_words
+
+        found_rows = []
+        found_starts = []
+        found_mismatches = []
+        for first_word in range(0, total_words, BLOCK_WORDS):
+            words = min(BLOCK_WORDS, total_words - first_word)
+            block = base_planes[:, first_word : first_word + words + padding_words]
+
+            states = np.full(
+                (max_mismatches + 1, len(self.order), words),
+                np.uint64(0xFFFFFFFFFFFFFFFF),
+            )
+            for column in range(self.max_length):
+                active = self.active[column]
+                planes = _symbol_planes(_shift_planes(block, column, words))
+                matched = planes[self.columns[:active, column]]
+                # Highest error level first, it reads the previous lower level
+                for errors in range(max_mismatches, 0, -1):
+                    states[errors, :active] &= matched
+                    states[errors, :active] |= states[errors - 1, :active]
+                states[0, :active] &= matched
+
+            rows, word_indexes = np.nonzero(states[max_mismatches])
+            if not len(rows):
+                continue
+            bits = np.unpackbits(
+                np.ascontiguousarray(states[:, rows, word_indexes])
+                .view(np.uint8)
+                .reshape(max_mismatches + 1, len(rows), 8),
+                axis=2,
+                bitorder="little",
+            )
+            hit_indexes, bit_indexes = np.nonzero(bits[max_mismatches])
+            starts = (first_word + word_indexes[hit_indexes]) * _WORD_BITS + bit_indexes
+            # Levels are nested: a hit with `m` mismatches is set from level `m` up
+            levels = bits[:, hit_indexes, bit_indexes].sum(axis=0)
+            found_rows.append(rows[hit_indexes])
+            found_starts.append(starts)
+            found_mismatches.append((max_mismatches + 1 - levels).astype(np.int8))
+
+        if not found_rows:
+            return empty, empty, empty.astype(np.int8)
+        rows = np.concatenate(found_rows)
+        starts = np.concatenate(found_starts)
+        mismatches = np.concatenate(found_mismatches)
+        if max_mismatches:
+            # Padding past the end reads as mismatches, drop those windows;
+            # short motifs would match anywhere
+            lengths = self.lengths[rows]
+            valid = (starts + lengths <= len(masks)) & (lengths > max_mismatches)
+            rows, starts, mismatches = rows[valid], starts[valid], mismatches[valid]
+        order = np.argsort(rows, kind="stable")
+        return rows[order], starts[order], mismatches[order]
+
+    def find_starts(self, sequence: EncodedSequence) -> dict[int, list[int]]:
+        rows, starts, _ = self.scan_positions(sequence.codes)
+
+        starts_by_motif = {}
+        if len(rows):
+            boundaries = np.flatnonzero(np.diff(rows)) + 1
+            first_rows = rows[np.concatenate(([0], boundaries))]
+            for row, row_starts in zip(first_rows, np.split(starts, boundaries)):
+                starts_by_motif[int(self.order[row])] = row_starts.tolist()
+        return starts_by_motif
+
+    def find_approximate_hits(
+        self, sequence: EncodedSequence | str, max_mismatches: int
+    ) -> HitTable:
+        """
+        `find_hits` allowing up to `max_mismatches` substitutions per hit.
+        Of overlapping candidates of a motif, the ones with the fewest
+        mismatches are kept, then the leftmost.
+        """
+        sequence = EncodedSequence.coerce(sequence)
+        tables = []
+        for strand, strand_sequence in (
+            (FORWARD, sequence),
+            (REVERSE, sequence.reverse_complement()),
+        ):
+            rows, starts, mismatches = self.scan_positions(
+                strand_sequence.codes, max_mismatches
+            )
+            starts_by_motif = {}
+            mismatches_by_motif = {}
+            if len(rows):
+                boundaries = np.flatnonzero(np.diff(rows)) + 1
+                first_rows = rows[np.concatenate(([0], boundaries))]
+                for row, row_starts, row_mismatches in zip(
+                    first_rows,
+                    np.split(starts, boundaries),
+                    np.split(mismatches, boundaries),
+                ):
+                    index = int(self.order[row])
+                    starts_by_motif[index] = row_starts
+                    mismatches_by_motif[index] = row_mismatches
+            tables.append(
+                HitTable.from_starts(
+                    starts_by_motif, self.motif_lengths, strand, mismatches_by_motif
+                )
+            )
+        return HitTable.concat(tables)
@@ -0,0 +1,114 @@
+import re
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.base import MotifMatcher
+from api.applications.cre.hit_table import FORWARD, REVERSE, HitTable
+
+
+def iupac_to_regex(substring):
+    """Chuyển đổi chuỗi IUPAC thành biểu thức chính quy."""
+    iupac_codes = {
+        # The searched text is decoded from masks, where U reads as T
+        "U": "T",
+        "R": "[AG]",
+        "Y": "[CT]",
+        "S": "[GC]",
+        "W": "[AT]",
+        "K": "[GT]",
+        "M": "[AC]",
+        "B": "[CGT]",
+        "D": "[AGT]",
+        "H": "[ACT]",
+        "V": "[ACG]",
+        "N": "[ACGT]",
+    }
+    pattern = ""
+    for char in substring:
+        if char in iupac_codes:
+            pattern += iupac_codes[char]
+        else:
+            pattern += char
+    return pattern
+
+
+class RegexMatcher(MotifMatcher):
+    """One compiled regex per motif, scanned with `re.finditer` in turn."""
+
+    name = "regex"
+
+    def __init__(self, database: dict[str, str]):
+        super().__init__(database)
+        self.patterns = [
+            (key, value, re.compile(iupac_to_regex(value)))
+            for key, value in self.motifs
+        ]
+        # Zero-width lookaheads report overlapping occurrences as well
+        self.overlapping_patterns = [
+            re.compile(f"(?=(?:{iupac_to_regex(value)}))") for _, value in self.motifs
+        ]
+
+    def find_starts(self, sequence: EncodedSequence) -> dict[int, list[int]]:
+        fragment_dna = sequence.to_text()
+        starts_by_motif = {}
+        for index, pattern in enumerate(self.overlapping_patterns):
+            starts = [match.start() for match in pattern.finditer(fragment_dna)]
+            if starts:
+                starts_by_motif[index] = starts
+        return starts_by_motif
+
+    def find(
+        self, sequence: EncodedSequence | str
+    ) -> list[tuple[str, str, int, int]]:
+        fragment_dna = EncodedSequence.coerce(sequence).to_text()
+        found_sequences = []
+        for key, value, pattern in self.patterns:
+            for match in pattern.finditer(fragment_dna):
+                start = match.start()
+                end = start + len(value)
+                found_sequences.append((value, key, start, end))
+        return found_sequences
+
+    def find_hits(self, sequence: EncodedSequence | str) -> HitTable:
+        sequence = EncodedSequence.coerce(sequence)
+        tables = []
+        for strand, strand_sequence in (
+            (FORWARD, sequence),
+            (REVERSE, sequence.reverse_complement()),
+        ):
+            fragment_dna = strand_sequence.to_text()
+            starts_by_motif = {}
+            for index, (_, _, pattern) in enumerate(self.patterns):
+                starts = [match.start() for match in pattern.finditer(fragment_dna)]
+                if starts:
+                    starts_by_motif[index] = starts
+            # `finditer` already reports leftmost non-overlapping matches
+            tables.append(self.build_hits(starts_by_motif, strand))
+        return HitTable.concat(tables)
+
+    def count_both_strands(self, sequence: EncodedSequence | str):
+        sequence = EncodedSequence.coerce(sequence)
+        counts = []
+        for strand in (sequence, sequence.reverse_complement()):
+            fragment_dna = strand.to_text()
+            strand_counts = {}
+            for index, (_, _, pattern) in enumerate(self.patterns):
+                count = sum(1 for _ in pattern.finditer(fragment_dna))
+                if count:
+                    strand_counts[index] = count
+            counts.append(strand_counts)
+        return tuple(counts)
+
+    def find_present_both_strands(self, sequence: EncodedSequence | str):
+        # `search` stops at the first occurrence of each motif
+        sequence = EncodedSequence.coerce(sequence)
+        present = []
+        for strand in (sequence, sequence.reverse_complement()):
+            fragment_dna = strand.to_text()
+            present.append(
+                {
+                    index
+                    for index, (_, _, pattern) in enumerate(self.patterns)
+                    if pattern.search(fragment_dna)
+                }
+            )
+        return tuple(present)
@@ -0,0 +1,68 @@
+from bisect import bisect_left, bisect_right
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.base import MotifMatcher
+
+
+def chunk_bounds(
+    length: int, chunk_size: int, overlap: int
+) -> list[tuple[int, int, int]]:
+    """
+    Split `[0, length)` into `(start, core_end, end)` chunks. Each chunk owns
+    the starts in its core `[start, core_end)` and extends `overlap` bases
+    past it, so any occurrence starting in the core lies inside the chunk.
+    """
+    bounds = []
+    for start in range(0, length, chunk_size):
+        core_end = min(start + chunk_size, length)
+        bounds.append((start, core_end, min(core_end + overlap, length)))
+    return bounds
+
+
+def find_chunk_starts(
+    matcher: MotifMatcher, chunk: EncodedSequence, core_length: int
+) -> tuple[dict[int, list[int]], dict[int, list[int]]]:
+    """
+    `find_strand_starts` of one chunk, restricted to the occurrences whose
+    leftmost forward base lies in the first `core_length` bases. Coordinates
+    stay local to the chunk; `merge_chunk_starts` makes them global.
+    """
+    forward_starts, reverse_starts = matcher.find_strand_starts(chunk)
+
+    forward = {}
+    for index, starts in forward_starts.items():
+        starts = starts[: bisect_left(starts, core_length)]
+        if starts:
+            forward[index] = starts
+
+    # A reverse hit at `q` covers forward bases from `len(chunk) - q - length`
+    reverse = {}
+    for index, starts in reverse_starts.items():
+        length = len(matcher.motifs[index][1])
+        starts = starts[bisect_right(starts, len(chunk) - length - core_length) :]
+        if starts:
+            reverse[index] = starts
+    return forward, reverse
+
+
+def merge_chunk_starts(
+    bounds: list[tuple[int, int, int]],
+    chunk_starts: list[tuple[dict[int, list[int]], dict[int, list[int]]]],
+    length: int,
+) -> tuple[dict[int, list[int]], dict[int, list[int]]]:
+    """
+    Combine the `find_chunk_starts` results of every chunk into sorted,
+    duplicate-free global starts of both strands.
+    """
+    forward = {}
+    for (start, _, _), (forward_starts, _) in zip(bounds, chunk_starts):
+        for index, starts in forward_starts.items():
+            forward.setdefault(index, []).extend(position + start for position in starts)
+
+    # The last chunk holds the smallest reverse complement coordinates
+    reverse = {}
+    for (_, _, end), (_, reverse_starts) in reversed(list(zip(bounds, chunk_starts))):
+        offset = length - end
+        for index, starts in reverse_starts.items():
+            reverse.setdefault(index, []).extend(position + offset for position in starts)
+    return forward, reverse
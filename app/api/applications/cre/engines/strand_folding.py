@@ -0,0 +1,66 @@
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.base import MotifMatcher, reverse_complement_motif
+
+
+class StrandFoldedMatcher(MotifMatcher):
+    """
+    Wraps an engine so both strands are searched in one scan of the input.
+
+    The inner engine is compiled over the catalog motifs plus the reverse
+    complement of every non-palindromic motif. A hit of a motif's reverse
+    complement at forward position `p` is the motif at `len - p - length` on
+    the reverse complement strand, which is the coordinate system the
+    two-scan search reports. Palindromic motifs are scanned once and their
+    hits are reported on both strands.
+    """
+
+    def __init__(self, engine_class: type[MotifMatcher], database: dict[str, str]):
+        super().__init__(database)
+        self.name = engine_class.name
+
+        sequences = [value for _, value in self.motifs]
+        self.reverse_indexes = []
+        self.palindromes = set()
+        for index, (_, value) in enumerate(self.motifs):
+            reverse = reverse_complement_motif(value)
+            if reverse == value:
+                self.palindromes.add(index)
+                self.reverse_indexes.append(index)
+            else:
+                self.reverse_indexes.append(len(sequences))
+                sequences.append(reverse)
+
+        self.matcher = engine_class(
+            {str(index): value for index, value in enumerate(sequences)}
+        )
+
+    def find_starts(self, sequence: EncodedSequence) -> dict[int, list[int]]:
+        starts_by_motif = self.matcher.find_starts(sequence)
+        return {
+            index: starts
+            for index, starts in starts_by_motif.items()
+            if index < len(self.motifs)
+        }
+
+    def find_strand_starts(self, sequence: EncodedSequence):
+        length = len(sequence)
+        starts_by_motif = self.matcher.find_starts(sequence)
+
+        forward_starts = {}
+        reverse_starts = {}
+        for index, (_, value) in enumerate(self.motifs):
+            starts = starts_by_motif.get(index)
+            if starts:
+                forward_starts[index] = starts
+            starts = starts_by_motif.get(self.reverse_indexes[index])
+            if starts:
+                reverse_starts[index] = [
+                    length - start - len(value) for start in reversed(starts)
+                ]
+        return forward_starts, reverse_starts
+
+    def find_both_strands(self, sequence: EncodedSequence | str):
+        forward_starts, reverse_starts = self.find_strand_starts(
+            EncodedSequence.coerce(sequence)
+        )
+        return self.build_matches(forward_starts), self.build_matches(reverse_starts)
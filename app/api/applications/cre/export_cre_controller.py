@@ -1,11 +1,14 @@
 import io
-from fastapi import HTTPException, status
-from sqlmodel import Session, select
-
-from api.applications.cre.search_cre_controller import find_sequence_in_database, rev_comp_st
-from models.factors_function_labels import FactorsFunctionLabels
+from fastapi import status
+from sqlmodel import Session
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.search_cre_controller import (
+    STRAND_MATCH_FIELDS,
+    find_cre_matches,
+)
 from utils import send_email_attach_file_stream
-from models.factors import CreResultSendEmail, Factors, MotifSearch, MotifSearchOut, Position
+from models.factors import CreResultSendEmail, MotifSearch, MotifSearchOut
 
 from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font
@@ -14,22 +17,33 @@ from core.config import settings
 
 from models.base import Message
 
+# The export sheets also show the annotation columns of each factor
+EXPORT_MATCH_FIELDS = STRAND_MATCH_FIELDS + ("dt", "kw", "os", "ra", "rt", "rl", "rd")
+
 
-def export_excel(session: Session, data_in: list[MotifSearch]):
+def export_excel(session: Session, data_in: list[MotifSearch], on_progress=None):
+    """
+    Build the result workbook of `data_in`. `on_progress`, if given, is
+    called with the number of sequences searched so far.
+    """
     workbook = Workbook()
 
     # Iterate over each sequence and aggregate results
     all_forward_matches = []
     all_reverse_matches = []
 
-    for motif_search in data_in:
+    for index, motif_search in enumerate(data_in):
         data_matches = _search_for_cre(session, motif_search)
-        for match in data_matches["forward_strand_matches"]:
-            match["original_sequence"] = motif_search.sequence
-        for match in data_matches["reverse_strand_matches"]:
-            match["original_sequence"] = motif_search.sequence
-        all_forward_matches.extend(data_matches["forward_strand_matches"])
-        all_reverse_matches.extend(data_matches["reverse_strand_matches"])
+        all_forward_matches.extend(
+            {**match, "original_sequence": motif_search.sequence}
+            for match in data_matches["forward_strand_matches"]
+        )
+        all_reverse_matches.extend(
+            {**match, "original_sequence": motif_search.sequence}
+            for match in data_matches["reverse_strand_matches"]
+        )
+        if on_progress is not None:
+            on_progress(index + 1)
 
     # Forward sheet
     forward_sheet = workbook.active
@@ -65,7 +79,7 @@ def _add_header_row(sheet):
 
 def _add_factor_rows(sheet, matches):
     for match in matches:
-        positions = "; ".join([f"{pos.start}-{pos.end}" for pos in match["positions"]])
+        positions = "; ".join(_format_positions(match))
         sheet.append(
             [
                 match["factor_id"],
@@ -83,6 +97,18 @@ def _add_factor_rows(sheet, matches):
         )
 
 
+def _format_positions(match):
+    if "mismatches" not in match:
+        return [f"{start}-{end}" for start, end in zip(match["starts"], match["ends"])]
+    # Approximate matches show their substitutions, e.g. "10-16 (1 mm)"
+    return [
+        f"{start}-{end} ({mismatches} mm)" if mismatches else f"{start}-{end}"
+        for start, end, mismatches in zip(
+            match["starts"], match["ends"], match["mismatches"]
+        )
+    ]
+
+
 def _format_sheet(sheet):
     # Align center for all cells
     for row in sheet.iter_rows():
@@ -121,103 +147,19 @@ def send_cre_excel_email(session: Session, data_in: CreResultSendEmail):
     return Message(status_code=status.HTTP_200_OK, message="Email sent successfully.")
 
 
-def _search_for_cre(session: Session, data_in: MotifSearch) -> MotifSearchOut:
-    reverse_complement = rev_comp_st(data_in.sequence)
-    db_factors = session.exec(select(Factors).order_by(Factors.ft_id)).all()
-    database = {factor.ac: factor.sq for factor in db_factors}
-
-    # Find matches on both strands
-    forward_matches = find_sequence_in_database(data_in.sequence, database)
-    reverse_matches = find_sequence_in_database(reverse_complement, database)
-
-    # Group matches by factor_id
-    forward_matches_grouped = {}
-    for match in forward_matches:
-        factor_id = match[1]
-        if factor_id not in forward_matches_grouped:
-            forward_matches_grouped[factor_id] = []
-        forward_matches_grouped[factor_id].append(
-            Position(start=match[2], end=match[3])
-        )  # Store start, end
-
-    reverse_matches_grouped = {}
-    for match in reverse_matches:
-        factor_id = match[1]
-        if factor_id not in reverse_matches_grouped:
-            reverse_matches_grouped[factor_id] = []
-        reverse_matches_grouped[factor_id].append(
-            Position(start=match[2], end=match[3])
-        )  # Store start, end
-
-    # Prepare data for matches with color, only one entry per factor_id
-    forward_matches_with_color = []
-    for factor_id, positions in forward_matches_grouped.items():
-        factor = session.exec(select(Factors).where(Factors.ac == factor_id)).first()
-        if not factor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Factor with AC {factor_id} not found.",
-            )
-
-        function_label = None
-        if factor.ft_id:
-            function_label = session.exec(
-                select(FactorsFunctionLabels).where(
-                    FactorsFunctionLabels.id == factor.ft_id
-                )
-            ).first()
-
-        forward_matches_with_color.append(
-            {
-                "factor_id": factor_id,
-                "sq": factor.sq,
-                "de": factor.de,
-                "dt": factor.dt,  # Extract dt
-                "kw": factor.kw,  # Extract kw
-                "os": factor.os,  # Extract os
-                "ra": factor.ra,  # Extract ra
-                "rt": factor.rt,  # Extract rt
-                "rl": factor.rl,  # Extract rl
-                "rd": factor.rd,  # Extract rd
-                "function_label": function_label,
-                "positions": positions,  # Store start, end as an array
-                "color": factor.color,
-            }
-        )
-
-    reverse_matches_with_color = []
-    for factor_id, positions in reverse_matches_grouped.items():
-        factor = session.exec(select(Factors).where(Factors.ac == factor_id)).first()
-        if not factor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Factor with AC {factor_id} not found.",
-            )
-        function_label = None
-        if factor.ft_id:
-            function_label = session.exec(
-                select(FactorsFunctionLabels).where(
-                    FactorsFunctionLabels.id == factor.ft_id
-                )
-            ).first()
-
-        reverse_matches_with_color.append(
-            {
-                "factor_id": factor_id,
-                "sq": factor.sq,
-                "de": factor.de,
-                "dt": factor.dt,  # Extract dt
-                "kw": factor.kw,  # Extract kw
-                "os": factor.os,  # Extract os
-                "ra": factor.ra,  # Extract ra
-                "rt": factor.rt,  # Extract rt
-                "rl": factor.rl,  # Extract rl
-                "rd": factor.rd,  # Extract rd
-                "function_label": function_label,
-                "positions": positions,  # Store start, end as an array
-                "color": factor.color,
-            }
+def _search_for_cre(
+    session: Session, data_in: MotifSearch, engine: str | None = None
+) -> MotifSearchOut:
+    sequence = EncodedSequence.from_text(data_in.sequence)
+    reverse_complement, forward_matches_with_color, reverse_matches_with_color = (
+        find_cre_matches(
+            session,
+            sequence,
+            engine,
+            fields=EXPORT_MATCH_FIELDS,
+            max_mismatches=data_in.max_mismatches,
         )
+    )
 
     data = {
         "original_sequence": data_in.sequence,
@@ -225,4 +167,4 @@ def _search_for_cre(session: Session, data_in: MotifSearch) -> MotifSearchOut:
         "forward_strand_matches": forward_matches_with_color,
         "reverse_strand_matches": reverse_matches_with_color,
     }
-    return data
\ No newline at end of file
+    return data
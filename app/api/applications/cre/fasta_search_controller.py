@@ -0,0 +1,96 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, SQLModel
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.fasta_stream import (
+    FastaFormatError,
+    FastaRecord,
+    FastaStreamParser,
+    StreamDecoder,
+)
+from api.applications.cre.search_cre_controller import find_cre_matches
+from api.applications.cre.search_formats import expand_positions
+from core.config import settings
+from core.db import engine as db_engine
+from models.factors import FastaRecordSearchOut, FastaSearchErrorOut
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    Streaming response for endpoints that keep reading the request body
+    while responding. Starlette's `StreamingResponse` listens for a
+    disconnect on `receive` meanwhile, which would swallow body chunks; here
+    a disconnect surfaces through `request.stream()` instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def search_fasta_stream(
+    chunks: AsyncIterator[bytes], engine: str | None = None
+) -> AsyncIterator[str]:
+    """
+    Search every record of a (optionally gzip-compressed) multi-FASTA body
+    and yield one NDJSON line per record as soon as it is scanned.
+
+    The body is decoded and parsed while it is received, so memory is
+    bounded by the longest record rather than the upload. The stream opens
+    its own session: request dependencies are closed before a streaming
+    response starts. A malformed body ends the stream with an error line.
+    """
+    decoder = StreamDecoder()
+    parser = FastaStreamParser(settings.CRE_FASTA_MAX_RECORD_LENGTH)
+    with Session(db_engine) as session:
+        try:
+            async for chunk in chunks:
+                for record in parser.feed(decoder.decode(chunk)):
+                    yield await _search_record(session, record, engine)
+            for record in parser.feed(decoder.flush()) + parser.close():
+                yield await _search_record(session, record, engine)
+        except FastaFormatError as e:
+            yield _ndjson(FastaSearchErrorOut(error=str(e)))
+        except ClientDisconnect:
+            return
+
+
+async def _search_record(
+    session: Session, record: FastaRecord, engine: str | None
+) -> str:
+    sequence = EncodedSequence.from_bytes(record.sequence)
+    while True:
+        try:
+            _, forward_matches, reverse_matches = await run_in_threadpool(
+                find_cre_matches, session, sequence, engine
+            )
+            break
+        except HTTPException as e:
+            if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                return _ndjson(
+                    FastaSearchErrorOut(record_index=record.index, error=str(e.detail))
+                )
+            # The scan pool is saturated: wait instead of failing the stream
+            await asyncio.sleep(int(e.headers["Retry-After"]))
+
+    return _ndjson(
+        FastaRecordSearchOut(
+            record_index=record.index,
+            id=record.id,
+            header=record.header,
+            length=len(sequence),
+            forward_strand_matches=expand_positions(forward_matches),
+            reverse_strand_matches=expand_positions(reverse_matches),
+        )
+    )
+
+
+def _ndjson(item: SQLModel) -> str:
+    return item.model_dump_json() + "\n"
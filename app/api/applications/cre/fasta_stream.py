@@ -0,0 +1,201 @@
+import zlib
+
+from api.applications.cre.encoded_sequence import IUPAC_MASKS
+
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_HEADER_LENGTH = 64 * 1024
+# IUPAC nucleotide codes accepted in a validated record, either case
+SEQUENCE_ALPHABET = "".join(code for code in IUPAC_MASKS if code.isalpha())
+_SEQUENCE_BYTES = (SEQUENCE_ALPHABET + SEQUENCE_ALPHABET.lower()).encode()
+
+
+class FastaFormatError(ValueError):
+    pass
+
+
+class FastaLimitError(FastaFormatError):
+    """The FASTA exceeds a size limit rather than being malformed."""
+
+
+class FastaRecord:
+    __slots__ = ("index", "header", "sequence")
+
+    def __init__(self, index: int, header: str, sequence: bytes):
+        self.index = index
+        self.header = header
+        self.sequence = sequence
+
+    @property
+    def id(self) -> str:
+        return self.header.split(maxsplit=1)[0] if self.header else ""
+
+
+class StreamDecoder:
+    """
+    Incrementally decode an upload that may be gzip-compressed.
+
+    Compression is detected from the gzip magic bytes of the first chunk;
+    concatenated gzip members (e.g. bgzip output) are decoded one after the
+    other.
+    """
+
+    def __init__(self):
+        self._head = b""
+        self._gzip = None
+        self._decompressor = None
+
+    def decode(self, chunk: bytes) -> bytes:
+        if self._gzip is None:
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return b""
+            chunk, self._head = self._head, b""
+            self._gzip = chunk.startswith(GZIP_MAGIC)
+        if not self._gzip:
+            return chunk
+
+        output = []
+        while chunk:
+            if self._decompressor is None:
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                output.append(self._decompressor.decompress(chunk))
+            except zlib.error as e:
+                raise FastaFormatError(f"Invalid gzip data: {e}") from e
+            if not self._decompressor.eof:
+                break
+            chunk = self._decompressor.unused_data
+            self._decompressor = None
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        if self._gzip is None:
+            data, self._head = self._head, b""
+            return data
+        if self._decompressor is not None:
+            raise FastaFormatError("Truncated gzip data.")
+        return b""
+
+
+class FastaStreamParser:
+    """
+    Incremental multi-FASTA parser.
+
+    `feed` takes raw bytes in arbitrary chunks and returns the records
+    completed so far; `close` returns the last one. Sequence lines are
+    consumed as they arrive, even when a chunk ends mid-line, so only the
+    current record is held in memory; a record longer than
+    `max_record_length` bases is rejected instead of growing unbounded.
+    """
+
+    def __init__(self, max_record_length: int):
+        self.max_record_length = max_record_length
+        self._pending = b""
+        # The last chunk ended inside a sequence line already consumed
+        self._continued = False
+        self._header = None
+        self._sequence = bytearray()
+        self._count = 0
+
+    def feed(self, data: bytes) -> list[FastaRecord]:
+        records = []
+        *lines, tail = (self._pending + data).split(b"\n")
+        self._pending = b""
+        for line in lines:
+            if self._continued:
+                self._continued = False
+                self._append_sequence(line)
+                continue
+            record = self._parse_line(line)
+            if record is not None:
+                records.append(record)
+
+        stripped = tail.lstrip()
+        if self._continued or (
+            self._header is not None and stripped and stripped[:1] not in b">;"
+        ):
+            self._append_sequence(tail)
+            self._continued = True
+        else:
+            if len(tail) > MAX_HEADER_LENGTH:
+                raise FastaFormatError("FASTA header line is too long.")
+            self._pending = tail
+        return records
+
+    def close(self) -> list[FastaRecord]:
+        records = self.feed(b"\n")
+        if self._header is not None:
+            records.append(self._finish_record())
+        return records
+
+    def _parse_line(self, line: bytes) -> FastaRecord | None:
+        line = line.strip()
+        if not line or line.startswith(b";"):
+            return None
+
+        if line.startswith(b">"):
+            record = self._finish_record() if self._header is not None else None
+            self._header = line[1:].decode("utf-8", "replace").strip()
+            return record
+
+        if self._header is None:
+            raise FastaFormatError("Sequence data before the first '>' header.")
+        self._append_sequence(line)
+        return None
+
+    def _append_sequence(self, line: bytes) -> None:
+        bases = b"".join(line.split())
+        if len(self._sequence) + len(bases) > self.max_record_length:
+            raise FastaLimitError(
+                f"Record '{self._header}' is longer than {self.max_record_length} bases."
+            )
+        self._sequence += bases
+
+    def _finish_record(self) -> FastaRecord:
+        record = FastaRecord(self._count, self._header, bytes(self._sequence))
+        self._count += 1
+        self._header = None
+        self._sequence = bytearray()
+        return record
+
+
+class FastaValidator:
+    """
+    Validates a FASTA stream record by record while it is received: every
+    record must be non-empty and hold IUPAC nucleotide codes only, and the
+    stream at most `max_records` records and `max_bases` bases in total.
+    Only the current record is held in memory.
+    """
+
+    def __init__(self, max_records: int, max_bases: int):
+        self.max_records = max_records
+        self.max_bases = max_bases
+        self.records = 0
+        self.bases = 0
+        self._parser = FastaStreamParser(max_bases)
+
+    def feed(self, data: bytes) -> None:
+        for record in self._parser.feed(data):
+            self._check(record)
+
+    def close(self) -> None:
+        for record in self._parser.close():
+            self._check(record)
+        if not self.records:
+            raise FastaFormatError("The FASTA has no records.")
+
+    def _check(self, record: FastaRecord) -> None:
+        if not record.sequence:
+            raise FastaFormatError(f"Record '{record.header}' is empty.")
+        invalid = record.sequence.translate(None, _SEQUENCE_BYTES)
+        if invalid:
+            characters = "".join(sorted(set(invalid.decode("ascii", "replace"))))
+            raise FastaFormatError(
+                f"Record '{record.header}' has invalid characters: {characters!r}"
+            )
+        self.records += 1
+        self.bases += len(record.sequence)
+        if self.records > self.max_records:
+            raise FastaLimitError(f"The FASTA has more than {self.max_records} records.")
+        if self.bases > self.max_bases:
+            raise FastaLimitError(f"The FASTA has more than {self.max_bases} bases.")
@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.base import motif_masks, reverse_complement_motif
+
+_BASE_BITS = np.array([1, 2, 4, 8], dtype=np.uint8)
+
+
+def match_probabilities(motifs: list[str], background) -> np.ndarray:
+    """
+    Probability that a window of a sequence drawn from the Markov
+    `background` matches each IUPAC motif, all motifs at once: the oligo
+    distribution restricted to the first `order` masks, then one transition
+    step per further motif position. Motifs that can never match get 0.
+    """
+    masks = [motif_masks(motif) or [] for motif in motifs]
+    lengths = np.array([len(motif_mask) for motif_mask in masks], dtype=np.int64)
+    columns = np.zeros((len(motifs), int(lengths.max(initial=0))), dtype=np.uint8)
+    for index, motif_mask in enumerate(masks):
+        columns[index, : len(motif_mask)] = motif_mask
+    # allowed[m, j, b]: base b matches column j of motif m (any base past its end)
+    allowed = (columns[:, :, None] & _BASE_BITS) != 0
+    allowed[np.arange(columns.shape[1]) >= lengths[:, None]] = True
+
+    order = background.order
+    states = len(background.oligo_frequencies)
+    probabilities = np.tile(background.oligo_frequencies, (len(motifs), 1))
+    digits = (np.arange(states)[:, None] // 4 ** np.arange(order - 1, -1, -1)) % 4
+    for column in range(min(order, columns.shape[1])):
+        probabilities *= allowed[:, column, digits[:, column]]
+
+    if not order:
+        # Independent positions
+        matched = allowed[:, order:] @ background.frequencies
+        probabilities = probabilities[:, 0] * matched.prod(axis=1)
+    else:
+        transitions = background.transitions.reshape(4, states // 4, 4)
+        for column in range(order, columns.shape[1]):
+            # Drop the first base of the oligo, append the next one
+            shaped = probabilities.reshape(len(motifs), 4, states // 4)
+            stepped = np.einsum("mdr,drb->mrb", shaped, transitions)
+            stepped *= allowed[:, column, None, :]
+            probabilities = stepped.reshape(len(motifs), states)
+        probabilities = probabilities.sum(axis=1)
+    probabilities[lengths == 0] = 0
+    return probabilities
+
+
+def strand_match_probabilities(motifs: list[str], background) -> tuple[np.ndarray, np.ndarray]:
+    """
+    `match_probabilities` of the forward strand and of the reverse strand,
+    where a motif hit is a forward window matching its reverse complement.
+    """
+    return (
+        match_probabilities(motifs, background),
+        match_probabilities([reverse_complement_motif(motif) for motif in motifs], background),
+    )
+
+
+def window_counts(sequence: EncodedSequence, widths) -> dict[int, int]:
+    """Number of windows of each width made only of unambiguous bases."""
+    concrete = np.isin(sequence.codes, _BASE_BITS)
+    ambiguous = np.concatenate(([0], np.cumsum(~concrete)))
+    counts = {}
+    for width in set(widths):
+        if 0 < width <= len(sequence):
+            counts[width] = int(np.count_nonzero(ambiguous[width:] == ambiguous[:-width]))
+        else:
+            counts[width] = 0
+    return counts
+
+
+def poisson_sf(observed: int, mean: float) -> float:
+    """P(X >= observed) for X ~ Poisson(mean): the regularized lower gamma P(observed, mean)."""
+    if observed <= 0:
+        return 1.0
+    if mean <= 0:
+        return 0.0
+    log_prefix = observed * math.log(mean) - mean - math.lgamma(observed)
+    if mean < observed + 1:
+        # Series of the lower incomplete gamma function
+        term = total = 1 / observed
+        for step in range(1, 10_000):
+            term *= mean / (observed + step)
+            total += term
+            if term < total * 1e-15:
+                break
+        return min(1.0, math.exp(log_prefix + math.log(total)))
+    # Continued fraction of the upper one (modified Lentz)
+    tiny = 1e-300
+    b = mean + 1 - observed
+    c = 1 / tiny
+    d = 1 / b
+    fraction = d
+    for step in range(1, 10_000):
+        a = -step * (step - observed)
+        b += 2
+        d = a * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + a / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        fraction *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return max(0.0, 1.0 - math.exp(log_prefix + math.log(fraction)))
+
+
+def annotate_strand_matches(
+    catalog,
+    matches: list[dict],
+    probabilities: np.ndarray,
+    windows: dict[int, int],
+) -> list[dict]:
+    """
+    Add to hydrated `matches` the `expected` number of hits of their motif
+    in the scanned windows, the Poisson `p_value` of observing at least as
+    many and the `z_score`. Presence matches count as one hit.
+    """
+    for match in matches:
+        index = catalog.motif_indexes[match["factor_id"]]
+        if "starts" in match:
+            observed = len(match["starts"])
+        else:
+            observed = match.get("count", 1)
+        expected = float(probabilities[index]) * windows[catalog.motif_lengths[index]]
+        match["expected"] = expected
+        match["p_value"] = poisson_sf(observed, expected)
+        match["z_score"] = (
+            (observed - expected) / math.sqrt(expected) if expected > 0 else None
+        )
+    return matches
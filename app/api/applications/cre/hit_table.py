@@ -0,0 +1,209 @@
+from collections.abc import Iterator
+
+import numpy as np
+
+FORWARD = 0
+REVERSE = 1
+
+_INDEX_DTYPE = np.int32
+_STRAND_DTYPE = np.int8
+_POSITION_DTYPE = np.int64
+_MISMATCH_DTYPE = np.int8
+
+
+def non_overlapping(starts: np.ndarray, length: int) -> np.ndarray | slice:
+    """
+    Vectorized `leftmost_non_overlapping`: the rows of sorted `starts` it
+    keeps. All of them unless two starts are closer than `length`, the
+    rare case that needs the sequential reduction.
+    """
+    if len(starts) < 2 or np.diff(starts).min() >= length:
+        return slice(None)
+    # Each kept start jumps to the first start past its end, so the loop
+    # only visits the kept rows, not every (dense, approximate) candidate
+    next_rows = np.searchsorted(starts, starts + length).tolist()
+    kept = np.zeros(len(starts), dtype=bool)
+    row = 0
+    rows = len(next_rows)
+    while row < rows:
+        kept[row] = True
+        row = next_rows[row]
+    return kept
+
+
+def fewest_mismatches_non_overlapping(
+    starts: np.ndarray, mismatches: np.ndarray, length: int
+) -> np.ndarray | slice:
+    """
+    The rows of sorted approximate `starts` kept when overlapping candidates
+    are reduced by fewest mismatches, then leftmost: an occurrence with
+    more mismatches never displaces a better one it overlaps. Each mismatch
+    level, best first, keeps the leftmost non-overlapping candidates that
+    do not overlap the rows kept by the better levels.
+    """
+    if len(starts) < 2 or np.diff(starts).min() >= length:
+        return slice(None)
+    levels = np.unique(mismatches)
+    if len(levels) == 1:
+        return non_overlapping(starts, length)
+    kept = np.zeros(len(starts), dtype=bool)
+    for level in levels.tolist():
+        rows = np.flatnonzero(mismatches == level)
+        kept_starts = starts[kept]
+        if len(kept_starts):
+            # First kept start past the one `length` before each candidate
+            following = np.searchsorted(kept_starts, starts[rows] - length + 1)
+            blocked = following < len(kept_starts)
+            blocked[blocked] = (
+                kept_starts[following[blocked]] < starts[rows[blocked]] + length
+            )
+            rows = rows[~blocked]
+        kept[rows[non_overlapping(starts[rows], length)]] = True
+    return kept
+
+
+class HitTable:
+    """
+    Motif hits of one sequence as parallel typed arrays: the motif index in
+    the catalog, the strand (`FORWARD`/`REVERSE`), the `[start, end)`
+    coordinates, reverse hits in reverse complement coordinates, and the
+    number of mismatches (0 for exact searches).
+
+    About 22 bytes per hit and no Python object per hit: tables are sorted,
+    sliced, grouped and pickled to and from the scan workers as whole arrays.
+    """
+
+    __slots__ = ("motifs", "strands", "starts", "ends", "mismatches")
+
+    def __init__(
+        self,
+        motifs: np.ndarray,
+        strands: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        mismatches: np.ndarray,
+    ):
+        self.motifs = motifs
+        self.strands = strands
+        self.starts = starts
+        self.ends = ends
+        self.mismatches = mismatches
+
+    @classmethod
+    def empty(cls) -> "HitTable":
+        return cls(
+            np.empty(0, dtype=_INDEX_DTYPE),
+            np.empty(0, dtype=_STRAND_DTYPE),
+            np.empty(0, dtype=_POSITION_DTYPE),
+            np.empty(0, dtype=_POSITION_DTYPE),
+            np.empty(0, dtype=_MISMATCH_DTYPE),
+        )
+
+    @classmethod
+    def from_starts(
+        cls,
+        starts_by_motif: dict[int, list[int]],
+        lengths: list[int],
+        strand: int,
+        mismatches_by_motif: dict[int, np.ndarray] | None = None,
+    ) -> "HitTable":
+        """
+        Hits of the non-overlapping occurrences in `starts_by_motif`
+        (sorted, possibly overlapping starts per motif index), motifs in
+        index order, with the mismatch counts of the approximate searches.
+        Exact occurrences are reduced leftmost first, approximate ones by
+        `fewest_mismatches_non_overlapping`.
+        """
+        motifs = []
+        starts = []
+        ends = []
+        mismatches = []
+        for index in sorted(starts_by_motif):
+            motif_starts = np.asarray(starts_by_motif[index], dtype=_POSITION_DTYPE)
+            if not len(motif_starts):
+                continue
+            if mismatches_by_motif is None:
+                kept = non_overlapping(motif_starts, lengths[index])
+                motif_starts = motif_starts[kept]
+                mismatches.append(np.zeros(len(motif_starts), dtype=_MISMATCH_DTYPE))
+            else:
+                motif_mismatches = np.asarray(
+                    mismatches_by_motif[index], dtype=_MISMATCH_DTYPE
+                )
+                kept = fewest_mismatches_non_overlapping(
+                    motif_starts, motif_mismatches, lengths[index]
+                )
+                motif_starts = motif_starts[kept]
+                mismatches.append(motif_mismatches[kept])
+            motifs.append(np.full(len(motif_starts), index, dtype=_INDEX_DTYPE))
+            starts.append(motif_starts)
+            ends.append(motif_starts + lengths[index])
+        if not motifs:
+            return cls.empty()
+
+        motifs = np.concatenate(motifs)
+        return cls(
+            motifs,
+            np.full(len(motifs), strand, dtype=_STRAND_DTYPE),
+            np.concatenate(starts),
+            np.concatenate(ends),
+            np.concatenate(mismatches),
+        )
+
+    @classmethod
+    def concat(cls, tables: list["HitTable"]) -> "HitTable":
+        tables = [table for table in tables if len(table)]
+        if not tables:
+            return cls.empty()
+        if len(tables) == 1:
+            return tables[0]
+        return cls(
+            *(
+                np.concatenate([getattr(table, name) for table in tables])
+                for name in cls.__slots__
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, key) -> "HitTable":
+        """Rows selected by a slice, a boolean mask or an index array."""
+        return HitTable(*(getattr(self, name)[key] for name in self.__slots__))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def strand(self, strand: int) -> "HitTable":
+        return self[self.strands == strand]
+
+    def sorted(self) -> "HitTable":
+        """Rows ordered by strand, motif index and start."""
+        return self[np.lexsort((self.starts, self.motifs, self.strands))]
+
+    def group_by_motif(self) -> Iterator[tuple[int, "HitTable"]]:
+        """
+        `(motif index, hits)` of a table sorted by motif index, the hits
+        being views of this table.
+        """
+        if not len(self):
+            return
+        boundaries = np.flatnonzero(np.diff(self.motifs)) + 1
+        bounds = [0, *boundaries.tolist(), len(self)]
+        for start, end in zip(bounds, bounds[1:]):
+            yield int(self.motifs[start]), self[start:end]
+
+    def motif_counts(self) -> dict[int, int]:
+        """Number of hits of each motif index, in index order."""
+        motifs, counts = np.unique(self.motifs, return_counts=True)
+        return dict(zip(motifs.tolist(), counts.tolist()))
+
+    def to_matches(self, motifs: list[tuple[str, str]]) -> list[tuple[str, str, int, int]]:
+        """The `(value, key, start, end)` tuples of the hits, for `(key, value)` motifs."""
+        return [
+            (motifs[index][1], motifs[index][0], start, end)
+            for index, start, end in zip(
+                self.motifs.tolist(), self.starts.tolist(), self.ends.tolist()
+            )
+        ]
@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from api.applications.cre.export_cre_controller import export_excel
+from api.applications.cre.search_cre_controller import search_for_cre
+from core.config import settings
+from core.db import engine as db_engine
+from models.factors import MotifSearch, MotifSearchOut
+from models.search_job import SearchJob, SearchJobKind, SearchJobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _update_running_job(session: Session, job_id: uuid.UUID, **values) -> None:
+    """
+    Update a job only while it is still running, so a cancellation from
+    any API worker wins over progress and results. Raises `JobCancelled`
+    when the job is no longer running.
+    """
+    result = session.exec(
+        update(SearchJob)
+        .where(SearchJob.id == job_id, SearchJob.status == SearchJobStatus.RUNNING.value)
+        .values(updated_at=datetime.now(), **values)
+    )
+    session.commit()
+    if result.rowcount == 0:
+        raise JobCancelled()
+
+
+class JobHeartbeat:
+    """
+    Refreshes the `updated_at` of a running job every `interval` seconds
+    from a thread of its own, while the job waits for the scan pool or
+    scans a long sequence, so no process takes it for an orphan.
+    """
+
+    __slots__ = ("job_id", "interval", "_stopped", "_thread")
+
+    def __init__(self, job_id: uuid.UUID, interval: float):
+        self.job_id = job_id
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._beat, name=f"search-job-heartbeat-{job_id}", daemon=True
+        )
+
+    def __enter__(self) -> "JobHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _beat(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                with Session(db_engine) as session:
+                    session.exec(
+                        update(SearchJob)
+                        .where(
+                            SearchJob.id == self.job_id,
+                            SearchJob.status == SearchJobStatus.RUNNING.value,
+                        )
+                        .values(updated_at=datetime.now())
+                    )
+                    session.commit()
+            except Exception:
+                logger.exception("Could not refresh search job %s", self.job_id)
+
+
+class JobRunner:
+    """
+    Runs search and export jobs on a local thread pool.
+
+    The `searchjob` table is the queue: a job is claimed by atomically
+    moving it from queued to running, so several API processes can share
+    the table without a broker. A running job is kept fresh by its
+    `JobHeartbeat`; every process periodically fails the running jobs not
+    refreshed for `settings.CRE_JOB_STALE_AFTER` seconds, orphaned by a
+    crashed process. The CPU-bound scans themselves still go through the
+    scan pool.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is not None or self.workers <= 0:
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="search-job"
+            )
+            self._stopped.clear()
+        try:
+            self._recover_jobs()
+        except Exception:
+            logger.exception("Could not recover pending search jobs")
+        threading.Thread(
+            target=self._reap_stale_jobs, name="search-job-reaper", daemon=True
+        ).start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        self._stopped.set()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, job_id: uuid.UUID) -> None:
+        executor = self._executor
+        if executor is not None:
+            executor.submit(self._run, job_id)
+
+    def _recover_jobs(self) -> None:
+        self._fail_stale_jobs()
+        with Session(db_engine) as session:
+            job_ids = session.exec(
+                select(SearchJob.id)
+                .where(SearchJob.status == SearchJobStatus.QUEUED.value)
+                .order_by(SearchJob.created_at)
+            ).all()
+        for job_id in job_ids:
+            self.submit(job_id)
+
+    def _reap_stale_jobs(self) -> None:
+        while not self._stopped.wait(settings.CRE_JOB_HEARTBEAT_INTERVAL):
+            try:
+                self._fail_stale_jobs()
+            except Exception:
+                logger.exception("Could not fail stale search jobs")
+
+    def _fail_stale_jobs(self) -> None:
+        stale_before = datetime.now() - timedelta(seconds=settings.CRE_JOB_STALE_AFTER)
+        with Session(db_engine) as session:
+            session.exec(
+                update(SearchJob)
+                .where(
+                    SearchJob.status == SearchJobStatus.RUNNING.value,
+                    SearchJob.updated_at < stale_before,
+                )
+                .values(
+                    status=SearchJobStatus.FAILED.value,
+                    error="The job was interrupted.",
+                    finished_at=datetime.now(),
+                    updated_at=datetime.now(),
+                )
+            )
+            session.commit()
+
+    def _run(self, job_id: uuid.UUID) -> None:
+        with Session(db_engine) as session:
+            claimed = session.exec(
+                update(SearchJob)
+                .where(
+                    SearchJob.id == job_id,
+                    SearchJob.status == SearchJobStatus.QUEUED.value,
+                )
+                .values(
+                    status=SearchJobStatus.RUNNING.value,
+                    started_at=datetime.now(),
+                    updated_at=datetime.now(),
+                )
+            )
+            session.commit()
+            if claimed.rowcount == 0:
+                return
+
+            job = session.get(SearchJob, job_id)
+            # Waiting for the scan pool and long scans commit no progress
+            with JobHeartbeat(job_id, settings.CRE_JOB_HEARTBEAT_INTERVAL):
+                try:
+                    if job.kind == SearchJobKind.EXPORT.value:
+                        values = self._run_export(session, job)
+                    else:
+                        values = self._run_search(session, job)
+                    _update_running_job(
+                        session,
+                        job_id,
+                        status=SearchJobStatus.SUCCEEDED.value,
+                        finished_at=datetime.now(),
+                        **values,
+                    )
+                except JobCancelled:
+                    pass
+                except Exception as e:
+                    if not isinstance(e, HTTPException):
+                        logger.exception("Search job %s failed", job_id)
+                    session.rollback()
+                    try:
+                        _update_running_job(
+                            session,
+                            job_id,
+                            status=SearchJobStatus.FAILED.value,
+                            error=str(e.detail if isinstance(e, HTTPException) else e),
+                            finished_at=datetime.now(),
+                        )
+                    except JobCancelled:
+                        pass
+
+    def _run_search(self, session: Session, job: SearchJob) -> dict:
+        job_id = job.id
+        results = []
+        for index, sequence in enumerate(job.sequences):
+            data = _retry_when_busy(search_for_cre, session, MotifSearch(sequence=sequence))
+            results.append(MotifSearchOut.model_validate(data).model_dump(mode="json"))
+            _update_running_job(session, job_id, completed=index + 1)
+        return {"results": results}
+
+    def _run_export(self, session: Session, job: SearchJob) -> dict:
+        job_id = job.id
+        output = _retry_when_busy(
+            export_excel,
+            session,
+            [MotifSearch(sequence=sequence) for sequence in job.sequences],
+            lambda completed: _update_running_job(session, job_id, completed=completed),
+        )
+        return {"result_file": output.getvalue()}
+
+
+def _retry_when_busy(function, *args):
+    """Jobs wait for a saturated scan pool instead of failing."""
+    while True:
+        try:
+            return function(*args)
+        except HTTPException as e:
+            if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
+            time.sleep(int(e.headers["Retry-After"]))
+
+
+job_runner = JobRunner(workers=settings.CRE_JOB_WORKERS)
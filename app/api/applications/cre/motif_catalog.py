@@ -0,0 +1,169 @@
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from api.applications.cre.engines import SEARCH_ENGINES, StrandFoldedMatcher
+from api.applications.cre.hit_statistics import strand_match_probabilities
+from core.config import settings
+from models.catalog_version import CatalogVersion
+from models.factors import Factors
+from models.factors_function_labels import FactorsFunctionLabels
+
+CATALOG_VERSION_ID = 1
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+class MotifCatalog:
+    """
+    Immutable, process-resident snapshot of the factor catalog.
+
+    Holds detached copies of every factor and function label. The matchers
+    of the search engines are compiled lazily, once per snapshot, so a search
+    does not have to reload the factors table or recompile its patterns.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        factors: list[Factors],
+        function_labels: list[FactorsFunctionLabels],
+    ):
+        self.version = version
+        self.factors = factors
+        self.factors_by_ac = {factor.ac: factor for factor in factors}
+        self.function_labels = {label.id: label for label in function_labels}
+        self.database = {factor.ac: factor.sq for factor in factors}
+        # AC of each motif index of the matchers and their `HitTable`s
+        self.motif_ids = list(self.database)
+        self.motif_indexes = {ac: index for index, ac in enumerate(self.motif_ids)}
+        self.motif_lengths = [len(self.database[ac]) for ac in self.motif_ids]
+        self._matchers = {}
+        self._matchers_lock = threading.Lock()
+        self._match_probabilities = {}
+
+    def get_matcher(self, engine: str | None = None, fold_strands: bool | None = None):
+        engine = engine or settings.CRE_SEARCH_ENGINE
+        if fold_strands is None:
+            fold_strands = settings.CRE_FOLD_STRANDS
+        matcher = self._matchers.get((engine, fold_strands))
+        if matcher is not None:
+            return matcher
+
+        if engine not in SEARCH_ENGINES:
+            raise ValueError(f"Unknown search engine: {engine}")
+        with self._matchers_lock:
+            if (engine, fold_strands) not in self._matchers:
+                if fold_strands:
+                    matcher = StrandFoldedMatcher(SEARCH_ENGINES[engine], self.database)
+                else:
+                    matcher = SEARCH_ENGINES[engine](self.database)
+                self._matchers[(engine, fold_strands)] = matcher
+            return self._matchers[(engine, fold_strands)]
+
+    def get_approximate_matcher(self):
+        """Matcher of the mismatch-tolerant searches, only the bit-parallel engine has them."""
+        return self.get_matcher("bit_parallel", fold_strands=False)
+
+    def get_match_probabilities(self, background, cache: bool = True):
+        """
+        Forward and reverse strand match probabilities of every motif index
+        under `background`, computed once per snapshot and background
+        content unless `cache` is False (per-request backgrounds).
+        """
+        probabilities = self._match_probabilities.get(background.digest)
+        if probabilities is None:
+            probabilities = strand_match_probabilities(
+                [self.database[ac] for ac in self.motif_ids], background
+            )
+            if cache:
+                with self._matchers_lock:
+                    self._match_probabilities[background.digest] = probabilities
+        return probabilities
+
+    def get_function_label(
+        self, ft_id: uuid.UUID | None
+    ) -> FactorsFunctionLabels | None:
+        if ft_id is None:
+            return None
+        return self.function_labels.get(ft_id)
+
+
+def read_catalog_version(session: Session) -> int:
+    version = session.exec(
+        select(CatalogVersion.version).where(CatalogVersion.id == CATALOG_VERSION_ID)
+    ).first()
+    return version or 0
+
+
+def bump_catalog_version(session: Session) -> None:
+    """
+    Increment the shared catalog version inside the caller's transaction.
+
+    Must be called by every mutation of `Factors` or `FactorsFunctionLabels`
+    before the commit, so that all workers rebuild their snapshot on their
+    next search.
+    """
+    result = session.exec(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == CATALOG_VERSION_ID)
+        .values(version=CatalogVersion.version + 1, updated_at=datetime.now())
+    )
+    if result.rowcount == 0:
+        session.add(CatalogVersion(id=CATALOG_VERSION_ID, version=1))
+
+
+def load_catalog(session: Session) -> MotifCatalog:
+    """
+    Load a snapshot of the catalog labelled with the version its rows
+    belong to. The version is read before and after the rows: a mutation
+    committed in between bumps it (in its own transaction), and the load
+    is retried, so the rows never get the label of another version.
+    """
+    version = read_catalog_version(session)
+    while True:
+        # A unique order: motif indexes must not depend on the query plan
+        db_factors = session.exec(
+            select(Factors).order_by(Factors.ft_id, Factors.ac, Factors.id)
+        ).all()
+        db_function_labels = session.exec(select(FactorsFunctionLabels)).all()
+        loaded_version, version = version, read_catalog_version(session)
+        if loaded_version == version:
+            break
+
+    # Copy the rows so the snapshot never shares state with the request session
+    factors = [Factors(**factor.model_dump()) for factor in db_factors]
+    function_labels = [
+        FactorsFunctionLabels(**function_label.model_dump())
+        for function_label in db_function_labels
+    ]
+
+    return MotifCatalog(version, factors, function_labels)
+
+
+def get_catalog(session: Session, version: int | None = None) -> MotifCatalog:
+    """
+    Return the current catalog snapshot, rebuilding it if another worker
+    (or this one) has bumped the catalog version since it was loaded.
+
+    Callers that already read the catalog version may pass it to skip the
+    version query. A rebuilt snapshot carries the version actually loaded,
+    which may be newer than `version`: results derived from a snapshot are
+    keyed by its `version`, not by the one asked for.
+    """
+    global _catalog
+
+    if version is None:
+        version = read_catalog_version(session)
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    with _catalog_lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = load_catalog(session)
+        return _catalog
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+
+from api.applications.cre.hit_table import HitTable
+from core.config import settings
+
+# Rough per-object costs used to keep the cache within its memory budget
+_ENTRY_OVERHEAD = 512
+_ITEM_OVERHEAD = 64
+
+
+def estimate_size(value) -> int:
+    """
+    Approximate the memory held by a cached search result: a tuple of the
+    reverse complement and `HitTable` of a search, or of the per motif
+    counts of both strands.
+    """
+    size = _ENTRY_OVERHEAD
+    for item in value:
+        if isinstance(item, str):
+            size += len(item)
+        elif isinstance(item, HitTable):
+            size += item.nbytes
+        else:
+            size += _ITEM_OVERHEAD * len(item)
+    return size
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of CRE search results bounded by an approximate
+    memory budget.
+
+    Keys are `(sequence digest, catalog version, view)`: the digest of the
+    encoded (case-normalized) sequence, the catalog version the result was
+    computed against and the kind of result ("search" hits, "counts",
+    "presence"). A catalog change bumps the version, so stale entries are
+    simply never hit again and age out of the LRU order.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        size = estimate_size(value)
+        if size > self.max_entry_bytes or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.CRE_RESULT_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.CRE_RESULT_CACHE_MAX_ENTRY_BYTES,
+)
@@ -0,0 +1,304 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
+from sqlmodel import Session
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.sharding import (
+    chunk_bounds,
+    find_chunk_starts,
+    merge_chunk_starts,
+)
+from api.applications.cre.hit_table import FORWARD, REVERSE, HitTable
+from api.applications.cre.motif_catalog import MotifCatalog, get_catalog
+from core.config import settings
+from core.db import engine as db_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    """Load the catalog and compile the default matcher once per process."""
+    try:
+        with Session(db_engine) as session:
+            get_catalog(session).get_matcher()
+    except Exception:
+        # The first scan retries; a worker must not die with the database
+        logger.exception("Could not pre-load the motif catalog")
+
+
+class StaleCatalogError(Exception):
+    """The worker could not load the catalog version of the caller's snapshot."""
+
+
+def _worker_catalog(catalog_version: int) -> MotifCatalog:
+    """
+    The worker snapshot of `catalog_version`: the motif indexes it returns
+    are mapped through the caller's snapshot, so any other version is an
+    error (the catalog changed during the request).
+    """
+    with Session(db_engine) as session:
+        catalog = get_catalog(session, catalog_version)
+    if catalog.version != catalog_version:
+        raise StaleCatalogError(
+            f"Catalog version {catalog.version} loaded, {catalog_version} expected."
+        )
+    return catalog
+
+
+def _worker_matcher(catalog_version: int, engine: str | None):
+    return _worker_catalog(catalog_version).get_matcher(engine)
+
+
+def _scan_in_worker(
+    packed: bytes,
+    length: int,
+    catalog_version: int,
+    engine: str | None,
+    max_mismatches: int = 0,
+):
+    sequence = EncodedSequence.from_packed(packed, length)
+    if max_mismatches:
+        matcher = _worker_catalog(catalog_version).get_approximate_matcher()
+        return matcher.find_approximate_hits(sequence, max_mismatches)
+    return _worker_matcher(catalog_version, engine).find_hits(sequence)
+
+
+def _count_in_worker(
+    packed: bytes,
+    length: int,
+    catalog_version: int,
+    engine: str | None,
+    presence: bool,
+):
+    sequence = EncodedSequence.from_packed(packed, length)
+    matcher = _worker_matcher(catalog_version, engine)
+    if presence:
+        return matcher.find_present_both_strands(sequence)
+    return matcher.count_both_strands(sequence)
+
+
+def _scan_chunk_in_worker(
+    packed: bytes,
+    length: int,
+    core_length: int,
+    catalog_version: int,
+    engine: str | None,
+):
+    chunk = EncodedSequence.from_packed(packed, length)
+    matcher = _worker_matcher(catalog_version, engine)
+    return find_chunk_starts(matcher, chunk, core_length)
+
+
+class ScanPool:
+    """
+    Process pool running the CPU-bound motif scan off the API workers.
+
+    Every process keeps its own catalog snapshot and compiled matchers; a
+    scan only ships the packed sequence (half a byte per base) and the
+    catalog version, and gets the `HitTable` of both strands back. The
+    caller's thread waits without holding the GIL, so other requests keep
+    being served while scans run on the other cores.
+
+    Sequences longer than `chunk_size` are sharded into chunks overlapping
+    by the longest motif length - 1, scanned in parallel and merged, so one
+    long input uses every worker.
+
+    Admission is bounded: at most `workers + queue_size` requests may be
+    running or queued, further requests are rejected with 503 and a
+    `Retry-After` header instead of piling up.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        retry_after: int,
+        chunk_size: int,
+        mp_context=None,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.retry_after = retry_after
+        self.mp_context = mp_context or multiprocessing.get_context("spawn")
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self.mp_context,
+                    initializer=_init_worker,
+                )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def accepts(self, sequence: EncodedSequence) -> bool:
+        """Short sequences are cheaper to scan inline than to ship."""
+        return self.running and len(sequence) >= settings.CRE_SCAN_POOL_MIN_LENGTH
+
+    def scan(
+        self,
+        sequence: EncodedSequence,
+        catalog: MotifCatalog,
+        engine: str | None = None,
+        max_mismatches: int = 0,
+    ):
+        """
+        `find_hits` of `sequence` on the pool, or with `max_mismatches`,
+        `find_approximate_hits` (never sharded).
+        """
+        return self._admit(self._scan, sequence, catalog, engine, max_mismatches)
+
+    def count(
+        self,
+        sequence: EncodedSequence,
+        catalog: MotifCatalog,
+        engine: str | None = None,
+        presence: bool = False,
+    ):
+        """
+        `count_both_strands` of `sequence` on the pool, or with `presence`,
+        `find_present_both_strands`.
+        """
+        return self._admit(self._count, sequence, catalog, engine, presence)
+
+    def _admit(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The search queue is full, please retry later.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        try:
+            executor = self._executor
+            if executor is None:
+                raise BrokenProcessPool("The scan pool is not running.")
+            return function(executor, *args)
+        except StaleCatalogError:
+            logger.info("The motif catalog changed during a scan", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The motif catalog changed during the search, please retry.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        except BrokenProcessPool:
+            logger.exception("Scan pool is broken, restarting it")
+            self._restart(executor)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The search workers are restarting, please retry later.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        finally:
+            self._slots.release()
+
+    def _scan(self, executor, sequence, catalog, engine, max_mismatches):
+        if len(sequence) > self.chunk_size and not max_mismatches:
+            matcher, forward_starts, reverse_starts = self._scan_chunks(
+                executor, sequence, catalog, engine
+            )
+            return HitTable.concat(
+                [
+                    matcher.build_hits(forward_starts, FORWARD),
+                    matcher.build_hits(reverse_starts, REVERSE),
+                ]
+            )
+        future = executor.submit(
+            _scan_in_worker,
+            sequence.packed(),
+            len(sequence),
+            catalog.version,
+            engine,
+            max_mismatches,
+        )
+        return future.result()
+
+    def _count(self, executor, sequence, catalog, engine, presence):
+        if len(sequence) > self.chunk_size:
+            matcher, forward_starts, reverse_starts = self._scan_chunks(
+                executor, sequence, catalog, engine
+            )
+            if presence:
+                return set(forward_starts), set(reverse_starts)
+            return (
+                matcher.count_starts(forward_starts),
+                matcher.count_starts(reverse_starts),
+            )
+        future = executor.submit(
+            _count_in_worker,
+            sequence.packed(),
+            len(sequence),
+            catalog.version,
+            engine,
+            presence,
+        )
+        return future.result()
+
+    def _scan_chunks(self, executor, sequence, catalog, engine):
+        """
+        Merged `find_strand_starts` of the chunks of `sequence`, with the
+        matcher that turns them into matches.
+        """
+        matcher = catalog.get_matcher(engine)
+        bounds = chunk_bounds(
+            len(sequence), self.chunk_size, max(matcher.max_motif_length - 1, 0)
+        )
+        futures = []
+        for start, core_end, end in bounds:
+            chunk = sequence[start:end]
+            futures.append(
+                executor.submit(
+                    _scan_chunk_in_worker,
+                    chunk.packed(),
+                    len(chunk),
+                    core_end - start,
+                    catalog.version,
+                    engine,
+                )
+            )
+        try:
+            chunk_starts = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+        forward_starts, reverse_starts = merge_chunk_starts(
+            bounds, chunk_starts, len(sequence)
+        )
+        return matcher, forward_starts, reverse_starts
+
+    def _restart(self, broken_executor) -> None:
+        with self._lock:
+            if broken_executor is None or self._executor is not broken_executor:
+                return
+            self._executor = None
+        broken_executor.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+
+scan_pool = ScanPool(
+    workers=settings.CRE_SCAN_WORKERS,
+    queue_size=settings.CRE_SCAN_QUEUE_SIZE,
+    retry_after=settings.CRE_SCAN_RETRY_AFTER,
+    chunk_size=settings.CRE_SCAN_CHUNK_SIZE,
+)
@@ -1,4 +1,3 @@
-import re
 from sqlmodel import select, func
 from fastapi import HTTPException, status
 from sqlmodel import Session
@@ -13,107 +12,46 @@ from models.factors import (
     MotifSearchAndSaveHistoryOut,
     MotifSearchOut,
     QueryCreSearchIn,
-    Position,
+    SearchMode,
 )
 from models.factors_function_labels import FactorsFunctionLabels
 from core.config import settings
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.engines.base import reverse_complement
+from api.applications.cre.hit_statistics import annotate_strand_matches, window_counts
+from api.applications.cre.hit_table import FORWARD, REVERSE, HitTable
+from api.applications.cre.motif_catalog import MotifCatalog, get_catalog
+from api.applications.cre.result_cache import result_cache
+from api.applications.cre.search_formats import (
+    JSON_MEDIA_TYPE,
+    SearchView,
+    compact_search_result,
+    project_search_result,
+    render_search_result,
+)
+from api.applications.cre.scan_pool import scan_pool
+from api.applications.motif.background import SEQUENCE_BACKGROUND_NAME, resolve_background
 
 
-def search_for_cre(session: Session, data_in: MotifSearch) -> MotifSearchOut:
-    reverse_complement = rev_comp_st(data_in.sequence)
-    db_factors = session.exec(select(Factors).order_by(Factors.ft_id)).all()
-    database = {factor.ac: factor.sq for factor in db_factors}
-
-    # Find matches on both strands
-    forward_matches = find_sequence_in_database(data_in.sequence, database)
-    reverse_matches = find_sequence_in_database(reverse_complement, database)
-
-    # Group matches by factor_id
-    forward_matches_grouped = {}
-    for match in forward_matches:
-        factor_id = match[1]
-        if factor_id not in forward_matches_grouped:
-            forward_matches_grouped[factor_id] = []
-        forward_matches_grouped[factor_id].append(
-            Position(start=match[2], end=match[3])
-        )  # Store start, end
-
-    reverse_matches_grouped = {}
-    for match in reverse_matches:
-        factor_id = match[1]
-        if factor_id not in reverse_matches_grouped:
-            reverse_matches_grouped[factor_id] = []
-        reverse_matches_grouped[factor_id].append(
-            Position(start=match[2], end=match[3])
-        )  # Store start, end
-
-    # Prepare data for matches with color, only one entry per factor_id
-    forward_matches_with_color = []
-    for factor_id, positions in forward_matches_grouped.items():
-        factor = session.exec(select(Factors).where(Factors.ac == factor_id)).first()
-        if not factor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Factor with AC {factor_id} not found.",
-            )
-
-        function_label = None
-        if factor.ft_id:
-            function_label = session.exec(
-                select(FactorsFunctionLabels).where(
-                    FactorsFunctionLabels.id == factor.ft_id
-                )
-            ).first()
-
-        forward_matches_with_color.append(
-            {
-                "factor_id": factor_id,
-                "sq": factor.sq,
-                "de": factor.de,
-                "function_label": function_label,
-                "positions": positions,  # Store start, end as an array
-                "color": factor.color,
-            }
-        )
-
-    reverse_matches_with_color = []
-    for factor_id, positions in reverse_matches_grouped.items():
-        factor = session.exec(select(Factors).where(Factors.ac == factor_id)).first()
-        if not factor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Factor with AC {factor_id} not found.",
-            )
-        function_label = None
-        if factor.ft_id:
-            function_label = session.exec(
-                select(FactorsFunctionLabels).where(
-                    FactorsFunctionLabels.id == factor.ft_id
-                )
-            ).first()
-
-        reverse_matches_with_color.append(
-            {
-                "factor_id": factor_id,
-                "sq": factor.sq,
-                "de": factor.de,
-                "function_label": function_label,
-                "positions": positions,  # Store start, end as an array
-                "color": factor.color,
-            }
-        )
-
-    data = {
-        "original_sequence": data_in.sequence,
-        "reverse_complement_sequence": reverse_complement,
-        "forward_strand_matches": forward_matches_with_color,
-        "reverse_strand_matches": reverse_matches_with_color,
-    }
-    return data
+def search_for_cre(
+    session: Session,
+    data_in: MotifSearch,
+    engine: str | None = None,
+    media_type: str = JSON_MEDIA_TYPE,
+    view: SearchView | None = None,
+) -> MotifSearchOut:
+    view = view or SearchView()
+    data = _search_result(session, data_in, engine, view)
+    return render_search_result(data, media_type, view)
 
 
 def search_for_cre_and_save_history(
-    session: Session, data_in: MotifSearch, user_id: int
+    session: Session,
+    data_in: MotifSearch,
+    user_id: int,
+    engine: str | None = None,
+    media_type: str = JSON_MEDIA_TYPE,
+    view: SearchView | None = None,
 ) -> MotifSearchAndSaveHistoryOut:
     db_user = session.exec(select(User).where(User.id == user_id)).first()
     if not db_user:
@@ -131,138 +69,360 @@ def search_for_cre_and_save_history(
     session.commit()
     session.refresh(db_search_history)
 
-    reverse_complement = rev_comp_st(data_in.sequence)
-    db_factors = session.exec(select(Factors).order_by(Factors.ft_id)).all()
-    database = {factor.ac: factor.sq for factor in db_factors}
-
-    # Find matches on both strands
-    forward_matches = find_sequence_in_database(data_in.sequence, database)
-    reverse_matches = find_sequence_in_database(reverse_complement, database)
-
-    # Group matches by factor_id
-    forward_matches_grouped = {}
-    for match in forward_matches:
-        factor_id = match[1]
-        if factor_id not in forward_matches_grouped:
-            forward_matches_grouped[factor_id] = []
-        forward_matches_grouped[factor_id].append(
-            Position(start=match[2], end=match[3])
-        )  # Store start, end
-
-    reverse_matches_grouped = {}
-    for match in reverse_matches:
-        factor_id = match[1]
-        if factor_id not in reverse_matches_grouped:
-            reverse_matches_grouped[factor_id] = []
-        reverse_matches_grouped[factor_id].append(
-            Position(start=match[2], end=match[3])
-        )  # Store start, end
-
-    # Prepare data for matches with color, only one entry per factor_id
-    forward_matches_with_color = []
-    for factor_id, positions in forward_matches_grouped.items():
-        factor = session.exec(select(Factors).where(Factors.ac == factor_id)).first()
-        if not factor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Factor with AC {factor_id} not found.",
-            )
+    view = view or SearchView()
+    data = _search_result(session, data_in, engine, view)
+    data["history_id"] = db_search_history.id
+    return render_search_result(data, media_type, view)
 
-        function_label = None
-        if factor.ft_id:
-            function_label = session.exec(
-                select(FactorsFunctionLabels).where(
-                    FactorsFunctionLabels.id == factor.ft_id
-                )
-            ).first()
-
-        forward_matches_with_color.append(
-            {
-                "factor_id": factor_id,
-                "sq": factor.sq,
-                "de": factor.de,
-                "function_label": function_label,
-                "positions": positions,  # Store start, end as an array
-                "color": factor.color,
-            }
-        )
 
-    reverse_matches_with_color = []
-    for factor_id, positions in reverse_matches_grouped.items():
-        factor = session.exec(select(Factors).where(Factors.ac == factor_id)).first()
-        if not factor:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Factor with AC {factor_id} not found.",
+def _search_result(
+    session: Session, data_in: MotifSearch, engine: str | None, view: SearchView
+) -> dict:
+    if view.background is not None and data_in.max_mismatches:
+        # The match probabilities are those of exact occurrences
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="background statistics are only available for exact searches.",
+        )
+    sequence = EncodedSequence.from_text(data_in.sequence)
+    catalog = get_catalog(session)
+    if view.mode == SearchMode.POSITIONS:
+        reverse_complement, forward_matches_with_color, reverse_matches_with_color = (
+            find_cre_matches(
+                session,
+                sequence,
+                engine,
+                catalog,
+                max_mismatches=data_in.max_mismatches,
             )
-        function_label = None
-        if factor.ft_id:
-            function_label = session.exec(
-                select(FactorsFunctionLabels).where(
-                    FactorsFunctionLabels.id == factor.ft_id
-                )
-            ).first()
-
-        reverse_matches_with_color.append(
-            {
-                "factor_id": factor_id,
-                "sq": factor.sq,
-                "de": factor.de,
-                "function_label": function_label,
-                "positions": positions,  # Store start, end as an array
-                "color": factor.color,
-            }
         )
+    else:
+        forward_matches_with_color, reverse_matches_with_color = find_cre_factor_counts(
+            session,
+            sequence,
+            engine,
+            catalog,
+            presence=view.mode == SearchMode.PRESENCE,
+            max_mismatches=data_in.max_mismatches,
+        )
+        reverse_complement = None
+        if view.includes("reverse_complement_sequence"):
+            reverse_complement = sequence.reverse_complement().to_text()
 
     data = {
         "original_sequence": data_in.sequence,
         "reverse_complement_sequence": reverse_complement,
         "forward_strand_matches": forward_matches_with_color,
         "reverse_strand_matches": reverse_matches_with_color,
-        "history_id": db_search_history.id,
     }
+    if data_in.max_mismatches:
+        data["max_mismatches"] = data_in.max_mismatches
+    if view.background is not None:
+        data["background"] = add_match_statistics(
+            catalog,
+            sequence,
+            view.background,
+            forward_matches_with_color,
+            reverse_matches_with_color,
+        )
+    if view.fields is not None:
+        data = project_search_result(data, view.fields, sequence)
+    if view.compact:
+        data = compact_search_result(data, catalog.version)
     return data
 
 
+def add_match_statistics(
+    catalog: MotifCatalog,
+    sequence: EncodedSequence,
+    background_name: str,
+    forward_matches: list[dict],
+    reverse_matches: list[dict],
+) -> str:
+    """
+    Annotate the matches of both strands with their expected count, p-value
+    and z-score under the named background. The match probabilities of
+    uniform and file backgrounds are computed once per catalog version.
+    Returns the background name.
+    """
+    background = resolve_background(background_name, sequence)
+    forward_probabilities, reverse_probabilities = catalog.get_match_probabilities(
+        background, cache=background.name != SEQUENCE_BACKGROUND_NAME
+    )
+    windows = window_counts(
+        sequence,
+        [
+            catalog.motif_lengths[catalog.motif_indexes[match["factor_id"]]]
+            for match in forward_matches + reverse_matches
+        ],
+    )
+    annotate_strand_matches(catalog, forward_matches, forward_probabilities, windows)
+    annotate_strand_matches(catalog, reverse_matches, reverse_probabilities, windows)
+    return background.name
+
+
+def find_cre_matches(
+    session: Session,
+    sequence: EncodedSequence,
+    engine: str | None = None,
+    catalog: MotifCatalog | None = None,
+    fields: tuple[str, ...] | None = None,
+    max_mismatches: int = 0,
+):
+    """
+    Return `(reverse_complement, forward_matches, reverse_matches)` for the
+    search payloads, the matches hydrated with the factor `fields`
+    (default: `STRAND_MATCH_FIELDS`), and with `max_mismatches`, the
+    mismatch count of each position.
+    """
+    if catalog is None:
+        catalog = get_catalog(session)
+    reverse_complement, hits = find_cre_hits(
+        session, sequence, engine, catalog, max_mismatches
+    )
+    fields = fields or STRAND_MATCH_FIELDS
+    mismatches = bool(max_mismatches)
+    return (
+        reverse_complement,
+        hydrate_strand_matches(catalog, hits.strand(FORWARD), fields, mismatches),
+        hydrate_strand_matches(catalog, hits.strand(REVERSE), fields, mismatches),
+    )
+
+
+def find_cre_hits(
+    session: Session,
+    sequence: EncodedSequence,
+    engine: str | None = None,
+    catalog: MotifCatalog | None = None,
+    max_mismatches: int = 0,
+) -> tuple[str, HitTable]:
+    """
+    Return the reverse complement and the `HitTable` of both strands of
+    `sequence`, its motif indexes those of `catalog` (default: the current
+    snapshot), served from `result_cache` when the same sequence was
+    already searched against the same catalog version with the same
+    `max_mismatches`. The scan state grows with `max_mismatches`, which
+    must be at most `settings.CRE_MAX_MISMATCHES` (422 otherwise).
+    """
+    if not 0 <= max_mismatches <= settings.CRE_MAX_MISMATCHES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"max_mismatches must be between 0 and {settings.CRE_MAX_MISMATCHES}.",
+        )
+    if catalog is None:
+        catalog = get_catalog(session)
+    cache_key = _search_cache_key(sequence, catalog.version, max_mismatches)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = (
+        sequence.reverse_complement().to_text(),
+        scan_both_strands(sequence, catalog, engine, max_mismatches),
+    )
+    result_cache.put(cache_key, result)
+    return result
+
+
+def _search_cache_key(
+    sequence: EncodedSequence, catalog_version: int, max_mismatches: int = 0
+) -> tuple:
+    view = f"search-{max_mismatches}" if max_mismatches else "search"
+    return (sequence.digest(), catalog_version, view)
+
+
+# Factor columns copied into every `StrandMatch` payload
+STRAND_MATCH_FIELDS = ("sq", "de", "color")
+
+
+def hydrate_strand_matches(
+    catalog: MotifCatalog,
+    hits: HitTable,
+    fields: tuple[str, ...] = STRAND_MATCH_FIELDS,
+    mismatches: bool = False,
+) -> list[dict]:
+    """
+    One match per factor of a strand's `hits`, in catalog order, with its
+    `starts` and `ends` arrays (views of the table), its `mismatches` array
+    if asked for, and the factor `fields` and function label from the
+    catalog snapshot the hits were computed with, without any query.
+    """
+    matches_with_color = []
+    for index, factor_hits in hits.group_by_motif():
+        match = _factor_match(catalog, catalog.motif_ids[index], fields)
+        match["starts"] = factor_hits.starts
+        match["ends"] = factor_hits.ends
+        if mismatches:
+            match["mismatches"] = factor_hits.mismatches
+        matches_with_color.append(match)
+    return matches_with_color
+
+
+def _factor_match(catalog: MotifCatalog, factor_id: str, fields: tuple[str, ...]) -> dict:
+    factor = catalog.factors_by_ac.get(factor_id)
+    if not factor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Factor with AC {factor_id} not found.",
+        )
+
+    match = {"factor_id": factor_id}
+    match.update((field, getattr(factor, field)) for field in fields)
+    match["function_label"] = catalog.get_function_label(factor.ft_id)
+    return match
+
+
+def find_cre_factor_counts(
+    session: Session,
+    sequence: EncodedSequence,
+    engine: str | None = None,
+    catalog: MotifCatalog | None = None,
+    presence: bool = False,
+    max_mismatches: int = 0,
+):
+    """
+    Return `(forward_matches, reverse_matches)` with the number of matches
+    of each factor instead of their positions, or with `presence`, only the
+    factors found. Derived from cached hits when there are some, otherwise
+    the scan does not collect positions at all. Mismatch-tolerant counts
+    are always derived from the (cached) hits.
+    """
+    if catalog is None:
+        catalog = get_catalog(session)
+    if max_mismatches:
+        _, hits = find_cre_hits(session, sequence, engine, catalog, max_mismatches)
+        counts = tuple(hits.strand(strand).motif_counts() for strand in (FORWARD, REVERSE))
+        return tuple(
+            hydrate_factor_counts(catalog, strand_counts, None if presence else "count")
+            for strand_counts in counts
+        )
+
+    mode = SearchMode.PRESENCE if presence else SearchMode.COUNTS
+    cache_key = (sequence.digest(), catalog.version, mode.value)
+    counts = result_cache.get(cache_key)
+    if counts is None:
+        searched = result_cache.get(_search_cache_key(sequence, catalog.version))
+        if searched is not None:
+            _, hits = searched
+            counts = tuple(
+                hits.strand(strand).motif_counts() for strand in (FORWARD, REVERSE)
+            )
+        elif presence:
+            counts = tuple(
+                dict.fromkeys(sorted(found), 1)
+                for found in count_both_strands(sequence, catalog, engine, presence)
+            )
+        else:
+            counts = count_both_strands(sequence, catalog, engine)
+        result_cache.put(cache_key, counts)
+
+    return tuple(
+        hydrate_factor_counts(catalog, strand_counts, None if presence else "count")
+        for strand_counts in counts
+    )
+
+
+def hydrate_factor_counts(
+    catalog: MotifCatalog,
+    counts: dict[int, int],
+    count_field: str | None = "count",
+    fields: tuple[str, ...] = STRAND_MATCH_FIELDS,
+) -> list[dict]:
+    """
+    `hydrate_strand_matches` for match `counts` by motif index: the count is
+    stored under `count_field`, or left out (presence) when it is None.
+    """
+    matches_with_color = []
+    for index in sorted(counts):
+        match = _factor_match(catalog, catalog.motif_ids[index], fields)
+        if count_field is not None:
+            match[count_field] = counts[index]
+        matches_with_color.append(match)
+    return matches_with_color
+
+
+def warm_up_result_cache(session: Session, limit: int) -> int:
+    """
+    Pre-compute the results of the `limit` most frequently searched
+    sequences in `SearchForCreHistory`. Returns the number of sequences.
+    """
+    sequences = session.exec(
+        select(SearchForCreHistory.sequences)
+        .group_by(SearchForCreHistory.sequences)
+        .order_by(func.count().desc())
+        .limit(limit)
+    ).all()
+    for sequence in sequences:
+        find_cre_matches(session, EncodedSequence.from_text(sequence))
+    return len(sequences)
+
+
 def rev_comp_st(seq):
     """Tạo chuỗi DNA đảo ngược bổ sung."""
-    complement = {"A": "T", "T": "A", "C": "G", "G": "C"}
-    return "".join(complement.get(base, base) for base in reversed(seq)).upper()
-
-
-def iupac_to_regex(substring):
-    """Chuyển đổi chuỗi IUPAC thành biểu thức chính quy."""
-    iupac_codes = {
-        "R": "[AG]",
-        "Y": "[CT]",
-        "S": "[GC]",
-        "W": "[AT]",
-        "K": "[GT]",
-        "M": "[AC]",
-        "B": "[CGT]",
-        "D": "[AGT]",
-        "H": "[ACT]",
-        "V": "[ACG]",
-        "N": "[ACGT]",
-    }
-    pattern = ""
-    for char in substring:
-        if char in iupac_codes:
-            pattern += iupac_codes[char]
-        else:
-            pattern += char
-    return pattern
-
-
-def find_sequence_in_database(fragment_dna, database):
-    """Tìm kiếm chuỗi DNA khớp trong database."""
-    found_sequences = []
-    for key, value in database.items():
-        for match in re.finditer(iupac_to_regex(value), fragment_dna):
-            start = match.start()
-            end = start + len(value)
-            found_sequences.append((value, key, start, end))
-    return found_sequences
+    return reverse_complement(seq)
+
+
+def find_sequence_in_database(fragment_dna, catalog, engine=None):
+    """
+    Tìm kiếm chuỗi DNA khớp trong database.
+
+    `fragment_dna` is an `EncodedSequence` or plain text. `engine` selects
+    one of `SEARCH_ENGINES`; every engine returns the same
+    `(value, key, start, end)` tuples. Defaults to `settings.CRE_SEARCH_ENGINE`.
+    """
+    return catalog.get_matcher(engine, fold_strands=False).find(fragment_dna)
+
+
+def scan_both_strands(
+    sequence: EncodedSequence,
+    catalog: MotifCatalog,
+    engine: str | None = None,
+    max_mismatches: int = 0,
+) -> HitTable:
+    """
+    Scan both strands of `sequence`, on the process pool when it is running
+    and the sequence is long enough, inline otherwise. Sequences longer
+    than `settings.CRE_SCAN_CHUNK_SIZE` are sharded across the pool workers
+    (exact searches only). Raises 503 when the pool queue is full.
+    """
+    if scan_pool.accepts(sequence):
+        return scan_pool.scan(sequence, catalog, engine, max_mismatches)
+    return find_sequence_on_both_strands(sequence, catalog, engine, max_mismatches)
+
+
+def count_both_strands(
+    sequence: EncodedSequence,
+    catalog: MotifCatalog,
+    engine: str | None = None,
+    presence: bool = False,
+):
+    """
+    Per motif index match counts of both strands, or with `presence` the
+    indexes found, dispatched like `scan_both_strands`.
+    """
+    if scan_pool.accepts(sequence):
+        return scan_pool.count(sequence, catalog, engine, presence)
+    matcher = catalog.get_matcher(engine)
+    if presence:
+        return matcher.find_present_both_strands(sequence)
+    return matcher.count_both_strands(sequence)
+
+
+def find_sequence_on_both_strands(
+    fragment_dna, catalog, engine=None, max_mismatches=0
+) -> HitTable:
+    """
+    Return the `HitTable` of both strands, reverse hits in reverse
+    complement coordinates. With `settings.CRE_FOLD_STRANDS` both strands
+    come from a single scan of `fragment_dna`. With `max_mismatches`, the
+    hits may have up to that many substitutions; only the bit-parallel
+    engine supports it, `engine` is then ignored.
+    """
+    if max_mismatches:
+        return catalog.get_approximate_matcher().find_approximate_hits(
+            fragment_dna, max_mismatches
+        )
+    return catalog.get_matcher(engine).find_hits(fragment_dna)
 
 
 def query_cre(
@@ -0,0 +1,368 @@
+import json
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+from fastapi import Header, HTTPException, Query, Response, status
+
+from models.factors import SearchMode
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.crequest.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+SEARCH_MEDIA_TYPES = (
+    JSON_MEDIA_TYPE,
+    COLUMNAR_JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    ARROW_STREAM_MEDIA_TYPE,
+)
+_MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+_STRAND_MATCH_KEYS = ("forward_strand_matches", "reverse_strand_matches")
+_SEQUENCE_KEYS = ("original_sequence", "reverse_complement_sequence")
+# Top-level fields a search result can be projected to
+SEARCH_FIELDS = _SEQUENCE_KEYS + _STRAND_MATCH_KEYS
+_FACTOR_KEYS = ("sq", "de", "color", "function_label")
+_POSITION_KEYS = ("starts", "ends", "mismatches")
+_STATISTICS_KEYS = ("expected", "p_value", "z_score")
+
+# OpenAPI `responses` of the search endpoints
+SEARCH_RESPONSES = {
+    200: {
+        "content": {media_type: {} for media_type in SEARCH_MEDIA_TYPES[1:]},
+        "description": (
+            "The default JSON result, or with the `Accept` header, the same "
+            "result with parallel `starts`/`ends` arrays per factor as JSON, "
+            "MessagePack or an Arrow IPC stream (one row per factor and strand). "
+            "With `compact`, the factors and function labels referenced by "
+            "the matches are sent once, in `factors` and `function_labels` "
+            "dictionaries valid for `catalog_version`, and each match only "
+            "carries its `factor_id` and positions. With `mode=counts`, "
+            "matches carry a `count` instead of positions, with "
+            "`mode=presence` neither. Sequences left out by `fields` are "
+            "replaced by `sequence_digest` and `sequence_length`. With "
+            "`max_mismatches`, every position also carries its number of "
+            "mismatches (a parallel `mismatches` array). With `background`, "
+            "every factor also carries the `expected` number of matches, the "
+            "Poisson `p_value` of at least the observed number and a `z_score` "
+            "(exact searches only)."
+        ),
+    },
+    406: {"description": "None of the accepted media types is available."},
+}
+
+
+def negotiate_search_media_type(accept: str | None) -> str:
+    """
+    Pick the search result representation from an `Accept` header, by
+    quality then order. Wildcards and a missing header get the default JSON.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    ranges = []
+    for index, media_range in enumerate(accept.split(",")):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            ranges.append((-quality, index, media_type.lower()))
+
+    for _, _, media_type in sorted(ranges):
+        media_type = _MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        if media_type in SEARCH_MEDIA_TYPES:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return JSON_MEDIA_TYPE
+    raise HTTPException(
+        status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        detail=f"Supported media types: {', '.join(SEARCH_MEDIA_TYPES)}.",
+    )
+
+
+def search_media_type(accept: str | None = Header(default=None)) -> str:
+    return negotiate_search_media_type(accept)
+
+
+class SearchView:
+    """
+    Shape of a search result: what the matches carry (`mode`), the
+    top-level `fields` to return (None for all), whether factors and
+    labels are normalized into dictionaries (`compact`) and the background
+    model of the match statistics (None for no statistics).
+    """
+
+    __slots__ = ("mode", "fields", "compact", "background")
+
+    def __init__(
+        self,
+        mode: SearchMode = SearchMode.POSITIONS,
+        fields: set[str] | None = None,
+        compact: bool = False,
+        background: str | None = None,
+    ):
+        self.mode = mode
+        self.fields = fields
+        self.compact = compact
+        self.background = background
+
+    @property
+    def is_default(self) -> bool:
+        """Whether the result has the `MotifSearchOut` shape."""
+        return (
+            self.mode == SearchMode.POSITIONS
+            and self.fields is None
+            and not self.compact
+            and self.background is None
+        )
+
+    def includes(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+
+def search_view(
+    mode: SearchMode = SearchMode.POSITIONS,
+    fields: str | None = Query(
+        default=None,
+        description=f"Comma-separated subset of: {', '.join(SEARCH_FIELDS)}.",
+    ),
+    compact: bool = False,
+    background: str | None = Query(
+        default=None,
+        description=(
+            "Add the expected count, p-value and z-score of each factor under "
+            "this background: uniform, sequence (the searched sequence's base "
+            "composition) or the name of a .bg background model. Exact "
+            "searches only (`max_mismatches` 0)."
+        ),
+    ),
+) -> SearchView:
+    if fields is None:
+        return SearchView(mode, None, compact, background)
+
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected.difference(SEARCH_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}.",
+        )
+    return SearchView(mode, selected, compact, background)
+
+
+def project_search_result(data: dict, fields: set[str], sequence) -> dict:
+    """
+    Keep the `fields` of a search result (and its other metadata). Left out
+    sequences are replaced by the digest and length of the searched
+    `EncodedSequence`.
+    """
+    projected = {
+        key: value
+        for key, value in data.items()
+        if key not in SEARCH_FIELDS or key in fields
+    }
+    if any(key not in fields for key in _SEQUENCE_KEYS):
+        projected["sequence_digest"] = sequence.digest()
+        projected["sequence_length"] = len(sequence)
+    return projected
+
+
+def expand_positions(matches: list[dict]) -> list[dict]:
+    """
+    `StrandMatch` payloads of hydrated matches: their parallel `starts` and
+    `ends` arrays (and `mismatches`, if any) as a list of positions.
+    Matches without positions (counts, presence) are returned as they are.
+    """
+    return [
+        {
+            **{key: value for key, value in match.items() if key not in _POSITION_KEYS},
+            "positions": _positions(match),
+        }
+        if "starts" in match
+        else match
+        for match in matches
+    ]
+
+
+def _positions(match: dict) -> list[dict]:
+    starts = _as_list(match["starts"])
+    ends = _as_list(match["ends"])
+    if "mismatches" not in match:
+        return [{"start": start, "end": end} for start, end in zip(starts, ends)]
+    return [
+        {"start": start, "end": end, "mismatches": mismatches}
+        for start, end, mismatches in zip(starts, ends, _as_list(match["mismatches"]))
+    ]
+
+
+def compact_search_result(data: dict, catalog_version: int) -> dict:
+    """
+    Normalize a search result: the factors and function labels referenced
+    by its matches go to `factors` (by AC) and `function_labels` (by id)
+    dictionaries, and the matches keep only `factor_id` and their positions
+    or count. The dictionaries are valid for as long as `catalog_version`
+    is current.
+    """
+    match_keys = [key for key in _STRAND_MATCH_KEYS if key in data]
+    factors = {}
+    function_labels = {}
+    for key in match_keys:
+        for match in data[key]:
+            function_label = match["function_label"]
+            if function_label is not None:
+                function_labels.setdefault(
+                    str(function_label.id),
+                    {
+                        "label": function_label.label,
+                        "detail_label": function_label.detail_label,
+                    },
+                )
+            factors.setdefault(
+                match["factor_id"],
+                {
+                    "sq": match["sq"],
+                    "de": match["de"],
+                    "color": match["color"],
+                    "function_label_id": (
+                        str(function_label.id) if function_label is not None else None
+                    ),
+                },
+            )
+
+    return {
+        **{key: value for key, value in data.items() if key not in _STRAND_MATCH_KEYS},
+        "catalog_version": catalog_version,
+        "factors": factors,
+        "function_labels": function_labels,
+        **{
+            key: [
+                {name: value for name, value in match.items() if name not in _FACTOR_KEYS}
+                for match in data[key]
+            ]
+            for key in match_keys
+        },
+    }
+
+
+def render_search_result(
+    data: dict, media_type: str = JSON_MEDIA_TYPE, view: SearchView | None = None
+):
+    """
+    Render a search result shaped by `view`, whose strand matches carry
+    `starts`/`ends` arrays. The default JSON is returned as a payload for
+    the endpoint's `response_model`; the other representations and views
+    are serialized here, with no per-position objects.
+    """
+    view = view or SearchView()
+    match_keys = [key for key in _STRAND_MATCH_KEYS if key in data]
+    # Mismatch counts are not part of the `MotifSearchOut` positions
+    if media_type == JSON_MEDIA_TYPE and view.is_default and "max_mismatches" not in data:
+        return {**data, **{key: expand_positions(data[key]) for key in match_keys}}
+
+    if media_type == ARROW_STREAM_MEDIA_TYPE:
+        content = _arrow_stream(data, view.mode)
+    else:
+        payload = {**data, **{key: _columnar_matches(data[key]) for key in match_keys}}
+        if media_type == JSON_MEDIA_TYPE:
+            payload.update((key, expand_positions(payload[key])) for key in match_keys)
+        if media_type == MSGPACK_MEDIA_TYPE:
+            content = msgpack.packb(payload)
+        else:
+            content = json.dumps(payload, separators=(",", ":"))
+    return Response(content=content, media_type=media_type)
+
+
+def _function_label_payload(function_label) -> dict | None:
+    if function_label is None:
+        return None
+    return function_label.model_dump(mode="json", exclude={"factors"})
+
+
+def _as_list(positions) -> list[int]:
+    """Hit positions, a `HitTable` column view or a list, as Python ints."""
+    return positions.tolist() if isinstance(positions, np.ndarray) else positions
+
+
+def _columnar_matches(matches: list[dict]) -> list[dict]:
+    payloads = []
+    for match in matches:
+        payload = dict(match)
+        if "function_label" in match:
+            payload["function_label"] = _function_label_payload(match["function_label"])
+        for key in _POSITION_KEYS:
+            if key in match:
+                payload[key] = _as_list(match[key])
+        payloads.append(payload)
+    return payloads
+
+
+def _arrow_stream(data: dict, mode: SearchMode) -> bytes:
+    """
+    One row per factor and strand, positions as `starts`/`ends` (and
+    `mismatches`) list columns, or a `count` column, and the statistics
+    columns of a result with a `background`; the remaining top-level fields go to the
+    schema metadata, the dictionaries of a compact result as JSON.
+    """
+    rows = [
+        (strand, match)
+        for strand, key in zip(("forward", "reverse"), _STRAND_MATCH_KEYS)
+        for match in data.get(key, ())
+    ]
+    columns = {
+        "strand": pa.array([strand for strand, _ in rows], pa.string()).dictionary_encode(),
+        "factor_id": pa.array([match["factor_id"] for _, match in rows], pa.string()),
+    }
+    if "factors" not in data:
+        labels = [match["function_label"] for _, match in rows]
+        columns.update(
+            {
+                field: pa.array([match[field] for _, match in rows], pa.string())
+                for field in ("sq", "de", "color")
+            }
+        )
+        columns["function_label_id"] = pa.array(
+            [str(label.id) if label else None for label in labels], pa.string()
+        )
+        columns["function_label"] = pa.array(
+            [label.label if label else None for label in labels], pa.string()
+        )
+    if mode == SearchMode.POSITIONS:
+        offsets = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum([len(match["starts"]) for _, match in rows], out=offsets[1:])
+        position_dtypes = {"starts": np.int64, "ends": np.int64}
+        if "max_mismatches" in data:
+            position_dtypes["mismatches"] = np.int8
+        for column, dtype in position_dtypes.items():
+            values = np.concatenate(
+                [np.asarray(match[column], dtype=dtype) for _, match in rows]
+                or [np.empty(0, dtype=dtype)]
+            )
+            columns[column] = pa.ListArray.from_arrays(pa.array(offsets), pa.array(values))
+    elif mode == SearchMode.COUNTS:
+        columns["count"] = pa.array([match["count"] for _, match in rows], pa.int64())
+    if "background" in data:
+        for column in _STATISTICS_KEYS:
+            columns[column] = pa.array([match[column] for _, match in rows], pa.float64())
+
+    table = pa.table(
+        columns,
+        metadata={
+            key: json.dumps(value) if isinstance(value, dict) else str(value)
+            for key, value in data.items()
+            if key not in _STRAND_MATCH_KEYS
+        },
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
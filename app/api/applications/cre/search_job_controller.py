@@ -0,0 +1,176 @@
+import asyncio
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from api.applications.cre.job_runner import job_runner
+from core.config import settings
+from core.db import engine as db_engine
+from models.search_for_cre_history import SearchForCreHistory
+from models.search_job import (
+    FINISHED_JOB_STATUSES,
+    SearchJob,
+    SearchJobIn,
+    SearchJobKind,
+    SearchJobListOut,
+    SearchJobOut,
+    SearchJobResultOut,
+    SearchJobStatus,
+)
+from models.users import User
+
+
+def create_search_job(
+    session: Session, data_in: SearchJobIn, user_id: int | None = None
+) -> SearchJobOut:
+    if not data_in.sequences:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one sequence is required.",
+        )
+    if any(motif_search.max_mismatches for motif_search in data_in.sequences):
+        # Jobs store the bare sequences, and their results have no mismatch counts
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Search jobs only run exact searches, max_mismatches must be 0.",
+        )
+    sequences = [motif_search.sequence for motif_search in data_in.sequences]
+
+    db_job = SearchJob(
+        kind=data_in.kind.value,
+        sequences=sequences,
+        total=len(sequences),
+        user_id=user_id,
+    )
+    if user_id is not None:
+        db_user = session.get(User, user_id)
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found.",
+            )
+        # Save search history
+        db_search_history = SearchForCreHistory(
+            sequences="\n".join(sequences),
+            user_id=user_id,
+        )
+        session.add(db_search_history)
+        session.flush()
+        db_job.history_id = db_search_history.id
+
+    session.add(db_job)
+    session.commit()
+    session.refresh(db_job)
+
+    job_runner.submit(db_job.id)
+    return db_job
+
+
+def read_search_jobs(session: Session, user_id: int) -> SearchJobListOut:
+    count = session.exec(
+        select(func.count(SearchJob.id)).where(SearchJob.user_id == user_id)
+    ).one()
+    db_jobs = session.exec(
+        select(SearchJob)
+        .where(SearchJob.user_id == user_id)
+        .order_by(SearchJob.created_at.desc())
+    ).all()
+    return SearchJobListOut(data=db_jobs, count=count)
+
+
+def read_search_job(
+    session: Session, job_id: uuid.UUID, user_id: int | None = None
+) -> SearchJob:
+    """
+    Jobs are only visible to the user who submitted them; guest jobs,
+    which have no user, only through the guest routes.
+    """
+    db_job = session.get(SearchJob, job_id)
+    if not db_job or db_job.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Search job not found.",
+        )
+    return db_job
+
+
+def read_search_job_result(
+    session: Session, job_id: uuid.UUID, user_id: int | None = None
+):
+    db_job = read_search_job(session, job_id, user_id)
+    if db_job.status != SearchJobStatus.SUCCEEDED.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Search job is {db_job.status}.",
+        )
+
+    if db_job.kind == SearchJobKind.EXPORT.value:
+        headers = {
+            "Content-Disposition": "attachment; filename=cre.xlsx",
+            "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        }
+        return StreamingResponse(io.BytesIO(db_job.result_file), headers=headers)
+    return SearchJobResultOut(id=db_job.id, results=db_job.results)
+
+
+def cancel_search_job(
+    session: Session, job_id: uuid.UUID, user_id: int | None = None
+) -> SearchJobOut:
+    db_job = read_search_job(session, job_id, user_id)
+    session.exec(
+        update(SearchJob)
+        .where(
+            SearchJob.id == db_job.id,
+            SearchJob.status.not_in(FINISHED_JOB_STATUSES),
+        )
+        .values(
+            status=SearchJobStatus.CANCELLED.value,
+            finished_at=datetime.now(),
+            updated_at=datetime.now(),
+        )
+    )
+    session.commit()
+    session.refresh(db_job)
+    return db_job
+
+
+def _read_job_state(job_id: uuid.UUID, user_id: int | None) -> SearchJobOut:
+    with Session(db_engine) as session:
+        return SearchJobOut.model_validate(read_search_job(session, job_id, user_id))
+
+
+async def stream_search_job_events(
+    job_id: uuid.UUID, user_id: int | None = None
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for a job: a `progress` event whenever its status or
+    progress changes, then one event named after the final status.
+    """
+    last_state = None
+    while True:
+        try:
+            job = await run_in_threadpool(_read_job_state, job_id, user_id)
+        except HTTPException as e:
+            yield _sse("error", {"detail": e.detail})
+            return
+
+        state = (job.status, job.completed)
+        if state != last_state:
+            last_state = state
+            event = job.status if job.status in FINISHED_JOB_STATUSES else "progress"
+            yield _sse(event, json.loads(job.model_dump_json()))
+            if job.status in FINISHED_JOB_STATUSES:
+                return
+        await asyncio.sleep(settings.CRE_JOB_EVENTS_INTERVAL)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
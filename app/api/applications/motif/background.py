@@ -0,0 +1,335 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+from fastapi import HTTPException, status
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.motif.motif_matrix import MATRIX_BASES
+from core.config import settings
+
+UNIFORM_BACKGROUND_NAME = "uniform"
+SEQUENCE_BACKGROUND_NAME = "sequence"
+
+# Positions counted per vectorized pass of `BackgroundCounter`
+COUNT_BLOCK_POSITIONS = 1 << 20
+
+_BACKGROUND_NAME = re.compile(r"^[\w.-]+$")
+# Column of each 4-bit base mask, -1 for ambiguous codes
+_BASE_COLUMNS = np.full(16, -1, dtype=np.int8)
+for _column, _mask in enumerate((1, 2, 4, 8)):
+    _BASE_COLUMNS[_mask] = _column
+_backgrounds = {}
+_backgrounds_lock = threading.Lock()
+
+
+class BackgroundModel:
+    """
+    Markov background of order `order` in the INCLUSive layout: the single
+    nucleotide frequencies (A, C, G, T), the frequencies of the `4**order`
+    oligos and the transition probabilities from each oligo to the next
+    base. Oligos are indexed base-4 with their first base most significant.
+    `digest` identifies the model by content, for caches.
+    """
+
+    __slots__ = (
+        "name",
+        "order",
+        "frequencies",
+        "oligo_frequencies",
+        "transitions",
+        "digest",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        frequencies: np.ndarray,
+        oligo_frequencies: np.ndarray | None = None,
+        transitions: np.ndarray | None = None,
+    ):
+        frequencies = _normalized(np.asarray(frequencies, dtype=np.float64))
+        if oligo_frequencies is None or transitions is None:
+            oligo_frequencies = np.ones(1)
+            transitions = frequencies[None, :]
+        oligo_frequencies = _normalized(np.asarray(oligo_frequencies, dtype=np.float64))
+        transitions = np.asarray(transitions, dtype=np.float64)
+        order = int(round(np.log(len(oligo_frequencies)) / np.log(len(MATRIX_BASES))))
+        if (
+            frequencies.shape != (len(MATRIX_BASES),)
+            or len(oligo_frequencies) != len(MATRIX_BASES) ** order
+            or transitions.shape != (len(oligo_frequencies), len(MATRIX_BASES))
+        ):
+            raise ValueError(f"Background {name} is not a valid Markov model.")
+
+        self.name = name
+        self.order = order
+        self.frequencies = frequencies
+        self.oligo_frequencies = oligo_frequencies
+        self.transitions = transitions / transitions.sum(axis=1, keepdims=True)
+        digest = hashlib.sha256(self.frequencies.tobytes())
+        digest.update(self.oligo_frequencies.tobytes())
+        digest.update(self.transitions.tobytes())
+        self.digest = digest.hexdigest()
+
+
+def _normalized(frequencies: np.ndarray) -> np.ndarray:
+    if frequencies.ndim != 1 or (frequencies < 0).any() or frequencies.sum() <= 0:
+        raise ValueError("Background frequencies must be non-negative.")
+    return frequencies / frequencies.sum()
+
+
+def uniform_background() -> BackgroundModel:
+    return BackgroundModel(
+        UNIFORM_BACKGROUND_NAME, np.full(len(MATRIX_BASES), 1 / len(MATRIX_BASES))
+    )
+
+
+def sequence_background(sequence: EncodedSequence) -> BackgroundModel:
+    """Order 0 background of the base composition of `sequence`."""
+    counts = np.bincount(sequence.codes, minlength=16)[[1, 2, 4, 8]]
+    if not counts.sum():
+        return uniform_background()
+    return BackgroundModel(SEQUENCE_BACKGROUND_NAME, counts)
+
+
+def parse_inclusive_background(text: str, name: str) -> BackgroundModel:
+    """
+    Parse an INCLUSive background model (`.bg`): either the `#snf`,
+    `#oligo frequency` and `#transition matrix` sections of a Markov model,
+    or an order 0 model given as `<base> <frequency>` lines.
+    """
+    sections = {}
+    letters = {}
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            section = line[1:].strip().lower()
+            continue
+        values = line.split()
+        if len(values) == 2 and values[0].upper() in MATRIX_BASES:
+            letters[values[0].upper()] = float(values[1])
+        elif section is not None:
+            sections.setdefault(section, []).append([float(value) for value in values])
+
+    if "snf" in sections:
+        oligo_frequencies = sections.get("oligo frequency")
+        transitions = sections.get("transition matrix")
+        return BackgroundModel(
+            name,
+            np.ravel(sections["snf"]),
+            np.ravel(oligo_frequencies) if oligo_frequencies else None,
+            np.array(transitions) if transitions else None,
+        )
+    if set(letters) == set(MATRIX_BASES):
+        return BackgroundModel(name, [letters[base] for base in MATRIX_BASES])
+    raise ValueError(f"Background {name} has no nucleotide frequencies.")
+
+
+class BackgroundCounter:
+    """
+    Accumulates the oligo counts of a Markov background of order `order`
+    over several sequences: the single bases, the `order`-mers and the
+    `order + 1`-mers, oligos not spanning two sequences. Windows holding an
+    ambiguous base are skipped. Every oligo of a block of positions is
+    indexed at once by shifted sums of the base columns and counted with
+    `bincount`, so a sequence costs `order + 1` array passes.
+    """
+
+    __slots__ = ("order", "bases", "oligos", "transitions", "sequences")
+
+    def __init__(self, order: int):
+        size = len(MATRIX_BASES)
+        self.order = order
+        self.bases = np.zeros(size, dtype=np.int64)
+        self.oligos = np.zeros(size**order, dtype=np.int64)
+        self.transitions = np.zeros(size ** (order + 1), dtype=np.int64)
+        self.sequences = 0
+
+    def add(self, sequence: EncodedSequence) -> None:
+        columns = _BASE_COLUMNS[sequence.codes]
+        self.sequences += 1
+        for first in range(0, len(columns), COUNT_BLOCK_POSITIONS):
+            # Overlap the next block so the oligos starting here are whole
+            block = columns[first : first + COUNT_BLOCK_POSITIONS + self.order]
+            starts = min(COUNT_BLOCK_POSITIONS, len(columns) - first)
+            self.bases += _oligo_counts(block[:starts], 1)
+            if self.order:
+                self.oligos += _oligo_counts(block[: starts + self.order - 1], self.order)
+            self.transitions += _oligo_counts(block, self.order + 1)
+
+    def model(self, name: str, pseudocount: float = 1) -> BackgroundModel:
+        """
+        The background of the counts so far; `pseudocount` is added to each
+        count so that oligos absent from short sequences stay possible.
+        """
+        if not self.bases.sum():
+            raise ValueError("The sequences have no unambiguous bases.")
+        if not self.order:
+            return BackgroundModel(name, self.bases + pseudocount)
+        return BackgroundModel(
+            name,
+            self.bases + pseudocount,
+            self.oligos + pseudocount,
+            (self.transitions + pseudocount).reshape(-1, len(MATRIX_BASES)),
+        )
+
+
+def _oligo_counts(columns: np.ndarray, length: int) -> np.ndarray:
+    """Counts of the `length`-mers of base `columns`, by base-4 oligo index."""
+    size = len(MATRIX_BASES) ** length
+    windows = len(columns) - length + 1
+    if windows <= 0:
+        return np.zeros(size, dtype=np.int64)
+    indexes = np.zeros(windows, dtype=np.int32)
+    for offset in range(length):
+        indexes = indexes * len(MATRIX_BASES) + columns[offset : offset + windows]
+    # Running count of ambiguous bases, to reject the windows holding one
+    ambiguous = np.concatenate(([0], np.cumsum(columns < 0)))
+    indexes = indexes[ambiguous[length:] == ambiguous[:windows]]
+    return np.bincount(indexes, minlength=size)
+
+
+def format_inclusive_background(model: BackgroundModel, organism: str = "") -> str:
+    """
+    `model` in the INCLUSive `.bg` layout read by the motif sampler. The
+    sampler rejects order 0 models, which are written as the equivalent
+    order 1 model: the base frequencies whatever the previous base.
+    """
+    order = model.order
+    oligo_frequencies = model.oligo_frequencies
+    transitions = model.transitions
+    if not order:
+        order = 1
+        oligo_frequencies = model.frequencies
+        transitions = np.tile(model.frequencies, (len(MATRIX_BASES), 1))
+    lines = [
+        "#INCLUSive Background Model v1.0",
+        "#",
+        f"#Order = {order}",
+        f"#Organism = {organism}",
+        "#",
+        "",
+        "#snf",
+        "\t".join(f"{value:g}" for value in model.frequencies),
+        "",
+        "#oligo frequency",
+        *(f"{value:g}" for value in oligo_frequencies),
+        "",
+        "#transition matrix",
+        *("\t".join(f"{value:g}" for value in row) for row in transitions),
+        "",
+        "#END - BackgroundModel ends.",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def background_store_dir() -> str:
+    return settings.MOTIF_BACKGROUND_STORE_DIR or os.path.join(
+        tempfile.gettempdir(), "crequest-motif-backgrounds"
+    )
+
+
+def store_background(model: BackgroundModel, prefix: str = "background") -> str:
+    """
+    Write `model` to `background_store_dir()` under a name derived from its
+    content, so the same model is stored once, and return the name. The
+    store is kept within `settings.MOTIF_BACKGROUND_STORE_MAX_BYTES`, the
+    least recently stored models being removed first.
+    """
+    text = format_inclusive_background(model)
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    name = f"{prefix}_o{model.order}_{digest[:16]}"
+    directory = background_store_dir()
+    path = os.path.join(directory, f"{name}.bg")
+    if os.path.isfile(path):
+        # Storing it again makes it the most recent
+        os.utime(path)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as file:
+            file.write(text)
+        os.replace(temporary, path)
+    _evict_backgrounds(directory, settings.MOTIF_BACKGROUND_STORE_MAX_BYTES, path)
+    return name
+
+
+def _evict_backgrounds(directory: str, max_bytes: int, keep: str) -> None:
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".bg"):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+
+
+def background_path(name: str) -> str:
+    """
+    Path of the `<name>.bg` background: one of `settings.MOTIF_BACKGROUND_DIR`,
+    or else one built from an upload.
+    """
+    path = os.path.join(settings.MOTIF_BACKGROUND_DIR, f"{name}.bg")
+    if os.path.isfile(path):
+        return path
+    return os.path.join(background_store_dir(), f"{name}.bg")
+
+
+def read_background(name: str) -> BackgroundModel:
+    """
+    The `<name>.bg` background (see `background_path`), parsed once per
+    file modification.
+    """
+    path = background_path(name)
+    if not _BACKGROUND_NAME.match(name) or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Background {name} not found.",
+        )
+
+    modified = os.path.getmtime(path)
+    cached = _backgrounds.get(name)
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+    with open(path) as file:
+        try:
+            background = parse_inclusive_background(file.read(), name)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e),
+            )
+    with _backgrounds_lock:
+        _backgrounds[name] = (modified, background)
+    return background
+
+
+def resolve_background(name: str, sequence: EncodedSequence) -> BackgroundModel:
+    """`uniform`, the composition of `sequence` (`sequence`), or a `.bg` file."""
+    if name == UNIFORM_BACKGROUND_NAME:
+        return uniform_background()
+    if name == SEQUENCE_BACKGROUND_NAME:
+        return sequence_background(sequence)
+    return read_background(name)
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+
+from api.applications.motif.motif_matrix import MotifMatrix
+from api.applications.motif.pwm_scanner import FORWARD, REVERSE
+
+# Fraction of the narrower matrix that two aligned matrices must overlap
+MIN_OVERLAP_FRACTION = 0.75
+
+
+class MatrixAlignment:
+    """
+    Best alignment of matrix `b` on matrix `a`: `b` (reverse complemented
+    on the `REVERSE` strand) starts `offset` columns into `a`, negative
+    when it starts before it, with the mean column `similarity`.
+    """
+
+    __slots__ = ("similarity", "offset", "strand")
+
+    def __init__(self, similarity: float, offset: int, strand: int):
+        self.similarity = similarity
+        self.offset = offset
+        self.strand = strand
+
+
+def align_matrices(a: MotifMatrix, b: MotifMatrix) -> MatrixAlignment:
+    """
+    Compare two position frequency matrices on both strands and at every
+    offset overlapping at least `MIN_OVERLAP_FRACTION` of the narrower one.
+    The similarity of two columns is one minus their total variation
+    distance: 1 for identical base distributions, 0 for disjoint ones.
+    A motif found at different widths aligns on its shared core.
+    """
+    overlap = max(1, math.ceil(MIN_OVERLAP_FRACTION * min(a.width, b.width)))
+    best = MatrixAlignment(-1.0, 0, FORWARD)
+    for strand, columns in (
+        (FORWARD, b.probabilities),
+        # Reversed rows, A <-> T and C <-> G being reversed columns
+        (REVERSE, b.probabilities[::-1, ::-1]),
+    ):
+        for offset in range(overlap - b.width, a.width - overlap + 1):
+            first = max(offset, 0)
+            last = min(offset + b.width, a.width)
+            distances = np.abs(
+                a.probabilities[first:last] - columns[first - offset : last - offset]
+            ).sum(axis=1)
+            similarity = 1 - distances.mean() / 2
+            if similarity > best.similarity:
+                best = MatrixAlignment(float(similarity), offset, strand)
+    return best
+
+
+def cluster_matrices(
+    matrices: list[MotifMatrix], min_similarity: float
+) -> list[list[tuple[int, MatrixAlignment]]]:
+    """
+    Group near-identical matrices: in decreasing score order, a matrix
+    joins the cluster whose first (highest scoring) matrix it is most
+    similar to, if at least `min_similarity`, or starts a cluster.
+    Returns the clusters as `(matrix index, alignment on the cluster's
+    first matrix)` lists, largest first.
+    """
+    order = sorted(
+        range(len(matrices)),
+        key=lambda index: -math.inf if matrices[index].score is None else matrices[index].score,
+        reverse=True,
+    )
+    clusters = []
+    for index in order:
+        best = None
+        for cluster in clusters:
+            alignment = align_matrices(matrices[cluster[0][0]], matrices[index])
+            if alignment.similarity >= min_similarity and (
+                best is None or alignment.similarity > best[1].similarity
+            ):
+                best = (cluster, alignment)
+        if best is None:
+            clusters.append([(index, MatrixAlignment(1.0, 0, FORWARD))])
+        else:
+            best[0].append((index, best[1]))
+    clusters.sort(key=len, reverse=True)
+    return clusters
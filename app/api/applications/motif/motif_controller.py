@@ -1,26 +1,90 @@
+import asyncio
 import os
-import subprocess
+import shutil
+import time
+from collections.abc import Awaitable, Callable
+
+import numpy as np
 from fastapi import File, Form, HTTPException, UploadFile, status
 from sqlalchemy import func
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
 from models.computational_motif import (
     ComputationalMotif,
+    ComputationalMotifSite,
     ComputationalMotifIn,
     ComputationalMotifListOut,
     ComputationalMotifOut,
     SearchComputationalMotif,
 )
 from models.factors import FactorsIn, MotifSamplerResponse, Factors
+from models.motif_matrix import (
+    MotifBackgroundOut,
+    MotifCluster,
+    MotifClusterMember,
+    MotifMatrixIn,
+    MotifMatrixOut,
+    MotifSweepOut,
+    MotifSweepRun,
+    PWMPosition,
+    PWMScanIn,
+    PWMScanOut,
+    PWMStrandMatch,
+)
 from models.base import Message
 from core.config import settings
 from utils import random_color
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.cre.fasta_stream import (
+    FastaFormatError,
+    FastaStreamParser,
+    StreamDecoder,
+)
+from api.applications.cre.motif_catalog import bump_catalog_version
+from api.applications.motif.background import (
+    BackgroundCounter,
+    BackgroundModel,
+    background_path,
+    parse_inclusive_background,
+    read_background,
+    store_background,
+)
+from api.applications.motif.motif_clustering import MatrixAlignment, cluster_matrices
+from api.applications.motif.motif_matrix import (
+    MotifMatrix,
+    MotifSite,
+    parse_inclusive_matrices,
+    parse_inclusive_sites,
+)
+from api.applications.motif.pwm_scanner import (
+    FORWARD,
+    REVERSE,
+    SCORE_RESOLUTION,
+    PWMScanner,
+)
+from api.applications.motif.sampler_cache import sampler_cache, sampler_cache_key
+from api.applications.motif.sampler_runner import sampler_runner
+from api.applications.motif.sampler_workspace import (
+    UPLOAD_CHUNK_SIZE,
+    SamplerWorkspace,
+)
+
+# Directory of the motif sampler binary
+SAMPLER_DIR = "./app/media_motifsampler"
+SAMPLER_BINARY = os.path.join(SAMPLER_DIR, "motif-sampler")
+# Names of the uploaded inputs in a run workspace
+SAMPLER_SEQUENCES_FILE = "sequences.fa"
+SAMPLER_BACKGROUND_FILE = "background.bg"
+# Output names of the sweep runs, each in its own workspace
+SAMPLER_OUTPUT_O = "output.txt"
+SAMPLER_OUTPUT_M = "output.mtrx"
 
 
 async def motif_sampler(
     session,
     f_file: UploadFile = File(...),
-    b_file: UploadFile = File(...),
+    b_file: UploadFile | None = File(None),
     output_o: str = Form(...),
     output_m: str = Form(...),
     r: int | None = Form(100),
@@ -33,10 +97,16 @@ async def motif_sampler(
     Q: int | None = Form(100),
     z: int | None = Form(1),
     is_biologist_action: bool = False,
+    background: str | None = Form(None),
+    use_cache: bool = Form(False),
 ) -> MotifSamplerResponse:
-    # handle file upload
-    f_file_path = await save_upload_file(f_file)
-    b_file_path = await save_upload_file(b_file) if b_file else None
+    """
+    Run the motif sampler on the uploaded sequences. The sampler seeds
+    itself, so every run samples new motifs; only with `use_cache` are the
+    results of an earlier run on identical inputs and parameters served
+    from the sampler cache instead.
+    """
+    _check_background_input(b_file, background)
 
     parameters = {
         "r": r,
@@ -50,55 +120,422 @@ async def motif_sampler(
         "z": z,
     }
 
-    motifs = []
-    try:
-        motifs = await run_motif_sampler(
-            f_file_path, b_file_path, output_o, output_m, **parameters
+    matrices = []
+    # Inputs and outputs live in a workspace of their own, so concurrent
+    # runs never overwrite each other's files
+    with await run_in_threadpool(SamplerWorkspace.create) as workspace:
+        workspace.file(output_o)
+        workspace.file(output_m)
+        f_file_path, b_file_path = await _save_sampler_inputs(
+            workspace, f_file, b_file, background
+        )
+        try:
+            matrices, cached = await _sample(
+                workspace, f_file_path, b_file_path, output_o, output_m, parameters, use_cache
+            )
+            # save to computational_motif table
+            # if is_biologist_action:
+            #     motif_in = []
+            #     for motif in motifs:
+            #         db_computational_motif = ComputationalMotif(sequences=motif)
+            #         motif_in.append(db_computational_motif)
+            #     session.add_all(motif_in)
+            #     session.commit()
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=str(e),
+            )
+
+    return _sampler_response(matrices, cached)
+
+
+async def motif_sampler_sweep(
+    f_file: UploadFile,
+    b_file: UploadFile | None,
+    background: str | None,
+    widths: list[int],
+    motif_counts: list[int],
+    replicates: int,
+    parameters: dict,
+    min_similarity: float | None = None,
+    use_cache: bool = False,
+) -> MotifSweepOut:
+    """
+    Run the motif sampler for every combination of the motif `widths`
+    (`-w`), `motif_counts` (`-n`) and `replicates`, then cluster the
+    matrices of all the runs. The runs go through the sampler runner, as
+    many at once as it has slots, each in its own workspace reading the
+    inputs saved once. The sampler seeds itself from the clock, so the
+    replicates of the same parameters start in different seconds to sample
+    different motifs; each is cached on its own and served from the cache
+    only with `use_cache`.
+    A failed run is reported without failing the sweep.
+    """
+    _check_background_input(b_file, background)
+    runs = [
+        (width, count, replicate)
+        for width in dict.fromkeys(widths)
+        for count in dict.fromkeys(motif_counts)
+        for replicate in range(replicates)
+    ]
+    if not runs or len(runs) > settings.MOTIF_SAMPLER_MAX_SWEEP_RUNS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A sweep runs between 1 and {settings.MOTIF_SAMPLER_MAX_SWEEP_RUNS} "
+            f"sampler runs, not {len(runs)}.",
+        )
+    if min_similarity is None:
+        min_similarity = settings.MOTIF_CLUSTER_MIN_SIMILARITY
+
+    with await run_in_threadpool(SamplerWorkspace.create) as inputs:
+        f_file_path, b_file_path = await _save_sampler_inputs(
+            inputs, f_file, b_file, background
         )
-        # save to computational_motif table
-        # if is_biologist_action:
-        #     motif_in = []
-        #     for motif in motifs:
-        #         db_computational_motif = ComputationalMotif(sequences=motif)
-        #         motif_in.append(db_computational_motif)
-        #     session.add_all(motif_in)
-        #     session.commit()
-    except Exception as e:
+        # Only as many runs wait on the runner as it has slots, so a sweep
+        # never fills its queue by itself
+        slots = asyncio.Semaphore(sampler_runner.concurrency)
+        # The sampler draws its randomness from the clock second: replicates
+        # started within the same second would find the same motifs
+        starts = {}
+
+        async def distinct_start(width: int, count: int) -> None:
+            lock, _ = starts.setdefault((width, count), (asyncio.Lock(), None))
+            async with lock:
+                previous = starts[width, count][1]
+                while previous is not None and int(time.time()) <= previous:
+                    await asyncio.sleep(1.01 - time.time() % 1)
+                starts[width, count] = (lock, int(time.time()))
+
+        async def sweep_run(width: int, count: int, replicate: int):
+            run = MotifSweepRun(w=width, n=count, replicate=replicate)
+            async with slots:
+                with await run_in_threadpool(SamplerWorkspace.create) as workspace:
+                    try:
+                        matrices, run.cached = await _sample(
+                            workspace,
+                            inputs.file(f_file_path),
+                            os.path.join(inputs.path, b_file_path),
+                            SAMPLER_OUTPUT_O,
+                            SAMPLER_OUTPUT_M,
+                            {**parameters, "w": width, "n": count},
+                            use_cache,
+                            replicate,
+                            before_run=lambda: distinct_start(width, count),
+                        )
+                    except HTTPException as e:
+                        run.error = str(e.detail)
+                        return run, []
+                    except Exception as e:
+                        run.error = str(e)
+                        return run, []
+            run.motifs = len(matrices)
+            return run, matrices
+
+        results = await asyncio.gather(*(sweep_run(*run) for run in runs))
+
+    succeeded = sum(run.error is None for run, _ in results)
+    if not succeeded:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e),
+            detail=f"Every sampler run failed: {results[0][0].error}",
         )
+    matrices = []
+    matrix_runs = []
+    for index, (_, run_matrices) in enumerate(results):
+        matrices.extend(run_matrices)
+        matrix_runs.extend([index] * len(run_matrices))
+    clusters = await run_in_threadpool(cluster_matrices, matrices, min_similarity)
+    return MotifSweepOut(
+        runs=[run for run, _ in results],
+        clusters=[
+            _sweep_cluster(cluster, matrices, matrix_runs, succeeded) for cluster in clusters
+        ],
+    )
+
+
+def _sweep_cluster(
+    cluster: list[tuple[int, MatrixAlignment]],
+    matrices: list[MotifMatrix],
+    matrix_runs: list[int],
+    succeeded: int,
+) -> MotifCluster:
+    first = matrices[cluster[0][0]]
+    runs = len({matrix_runs[index] for index, _ in cluster})
+    return MotifCluster(
+        consensus=first.consensus,
+        matrix=MotifMatrixOut(**first.to_dict()),
+        occurrences=len(cluster),
+        runs=runs,
+        frequency=runs / succeeded,
+        members=[
+            MotifClusterMember(
+                run=matrix_runs[index],
+                name=matrices[index].name,
+                consensus=matrices[index].consensus,
+                score=matrices[index].score,
+                similarity=alignment.similarity,
+                offset=alignment.offset,
+                strand="+" if alignment.strand == FORWARD else "-",
+            )
+            for index, alignment in cluster
+        ],
+    )
+
 
+def _check_background_input(b_file: UploadFile | None, background: str | None) -> None:
+    if background:
+        # A stored `.bg` model, e.g. built by `create_background`
+        read_background(background)
+    elif not b_file:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="A b_file or a stored background is required.",
+        )
+
+
+async def _save_sampler_inputs(
+    workspace: SamplerWorkspace,
+    f_file: UploadFile,
+    b_file: UploadFile | None,
+    background: str | None,
+) -> tuple[str, str]:
+    """
+    Save the uploaded inputs, or a copy of the stored `background`, to
+    `workspace`, rejecting oversized or malformed ones before the sampler
+    starts. Returns the sequences and background paths, relative to the
+    workspace.
+    """
+    await workspace.save_fasta_upload(
+        f_file,
+        SAMPLER_SEQUENCES_FILE,
+        settings.MOTIF_SAMPLER_MAX_UPLOAD_SIZE,
+        settings.MOTIF_SAMPLER_MAX_RECORDS,
+        settings.MOTIF_SAMPLER_MAX_BASES,
+    )
+    if background:
+        # The copy outlives an eviction of the stored model during the run
+        try:
+            await run_in_threadpool(
+                shutil.copyfile,
+                background_path(background),
+                workspace.file(SAMPLER_BACKGROUND_FILE),
+            )
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Background {background} not found.",
+            )
+    else:
+        await workspace.save_upload(
+            b_file, SAMPLER_BACKGROUND_FILE, settings.MOTIF_SAMPLER_MAX_BACKGROUND_SIZE
+        )
+    _check_sampler_background(workspace.file(SAMPLER_BACKGROUND_FILE))
+    return SAMPLER_SEQUENCES_FILE, SAMPLER_BACKGROUND_FILE
+
+
+async def _sample(
+    workspace: SamplerWorkspace,
+    f_file_path: str,
+    b_file_path: str,
+    output_o: str,
+    output_m: str,
+    parameters: dict,
+    use_cache: bool,
+    replicate: int | None = None,
+    before_run: Callable[[], Awaitable[None]] | None = None,
+) -> tuple[list[MotifMatrix], bool]:
+    """
+    The matrices of a sampler run in `workspace`, and whether they come
+    from the sampler cache, which is only read with `use_cache`; every new
+    run is cached. `replicate` keeps the replicates of a sweep apart in the
+    cache, and `before_run` is awaited before a new run.
+    """
+    key_parameters = parameters if replicate is None else {**parameters, "replicate": replicate}
+    cache_key = await run_in_threadpool(
+        sampler_cache_key,
+        os.path.join(workspace.path, f_file_path),
+        os.path.join(workspace.path, b_file_path),
+        SAMPLER_BINARY,
+        key_parameters,
+    )
+    cached = await run_in_threadpool(sampler_cache.get, cache_key) if use_cache else None
+    if cached is not None:
+        return cached, True
+
+    if before_run is not None:
+        await before_run()
+    matrices = await run_motif_sampler(
+        f_file_path, b_file_path, output_o, output_m, workspace=workspace.path, **parameters
+    )
+    await run_in_threadpool(sampler_cache.put, cache_key, matrices)
+    return matrices, False
+
+
+def _sampler_response(
+    matrices: list[MotifMatrix], cached: bool = False
+) -> MotifSamplerResponse:
     return MotifSamplerResponse(
         status="success",
-        message="Motif sampler completed successfully.",
-        results=motifs,
+        message="Motif sampler results of an identical earlier run."
+        if cached
+        else "Motif sampler completed successfully.",
+        results=[matrix.consensus for matrix in matrices],
+        matrices=[MotifMatrixOut(**matrix.to_dict()) for matrix in matrices],
+        cached=cached,
     )
 
 
-def save_computational_motif(session: Session, data_in: list[str]) -> Message:
+def _check_sampler_background(path: str) -> None:
+    """
+    The sampler only reads the Markov layout of order 1 or more, and
+    crashes on an order 0 letter list.
+    """
+    with open(path, errors="replace") as file:
+        try:
+            model = parse_inclusive_background(file.read(), os.path.basename(path))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid background file: {e}",
+            )
+    if model.order < 1:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The background file must be a Markov model of order 1 or more.",
+        )
+
+
+def save_computational_motif(
+    session: Session, data_in: list[str | MotifMatrixIn]
+) -> Message:
+    """
+    Save consensus sequences, or sampler matrices with their consensus,
+    score and site instances.
+    """
     data_append = []
     for motif in data_in:
-        db_computational_motif = ComputationalMotif(sequences=motif)
+        if isinstance(motif, str):
+            db_computational_motif = ComputationalMotif(sequences=motif)
+        else:
+            db_computational_motif = _matrix_motif(motif)
         data_append.append(db_computational_motif)
     session.add_all(data_append)
     session.commit()
     return Message(status_code=status.HTTP_200_OK, message="Items created")
 
 
-async def save_upload_file(uploaded_file: UploadFile):
-    # Create media_motifsampler directory if not exists
-    save_dir = "./app/media_motifsampler"
-    os.makedirs(save_dir, exist_ok=True)
+def _matrix_motif(data_in: MotifMatrixIn) -> ComputationalMotif:
+    try:
+        matrix = MotifMatrix(
+            data_in.name, data_in.probabilities, data_in.consensus, data_in.score
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    return ComputationalMotif(
+        sequences=matrix.consensus,
+        matrix_name=matrix.name,
+        score=matrix.score,
+        matrix=matrix.to_bytes(),
+        sites=[ComputationalMotifSite(**site.model_dump()) for site in data_in.sites],
+    )
+
+
+def read_computational_motif_matrix(session: Session, motif_id: int) -> MotifMatrixOut:
+    db_computational_motif = read_computational_motif(session, motif_id)
+    if db_computational_motif.matrix is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Computational motif has no matrix",
+        )
+    return MotifMatrixOut(**_stored_matrix(db_computational_motif).to_dict())
+
+
+def _stored_matrix(db_computational_motif: ComputationalMotif) -> MotifMatrix:
+    return MotifMatrix.from_bytes(
+        db_computational_motif.matrix_name or str(db_computational_motif.id),
+        db_computational_motif.matrix,
+        consensus=db_computational_motif.sequences,
+        score=db_computational_motif.score,
+        sites=[
+            MotifSite(
+                site.sequence_name,
+                site.start,
+                site.end,
+                site.strand,
+                site.score,
+                site.site,
+            )
+            for site in db_computational_motif.sites
+        ],
+    )
+
+
+async def create_background(upload: UploadFile, order: int) -> MotifBackgroundOut:
+    """
+    Build a Markov background of `order` from the records of an uploaded
+    (optionally gzip-compressed) multi-FASTA file and store it as a `.bg`
+    model named after its content: the same sequences give the same name,
+    usable as the sampler `background` and the search `background`.
+    """
+    if not 0 <= order <= settings.MOTIF_BACKGROUND_MAX_ORDER:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"order must be between 0 and {settings.MOTIF_BACKGROUND_MAX_ORDER}",
+        )
+
+    counter = BackgroundCounter(order)
+    decoder = StreamDecoder()
+    parser = FastaStreamParser(settings.MOTIF_BACKGROUND_MAX_UPLOAD_SIZE)
+    size = 0
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            data = decoder.decode(chunk)
+            size += len(data)
+            if size > settings.MOTIF_BACKGROUND_MAX_UPLOAD_SIZE:
+                raise FastaFormatError(
+                    f"FASTA is larger than {settings.MOTIF_BACKGROUND_MAX_UPLOAD_SIZE} bytes."
+                )
+            for record in parser.feed(data):
+                await run_in_threadpool(_count_record, counter, record.sequence)
+        for record in parser.feed(decoder.flush()) + parser.close():
+            await run_in_threadpool(_count_record, counter, record.sequence)
+        model = counter.model(upload.filename or "background")
+    except (FastaFormatError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+
+    name = await run_in_threadpool(store_background, model)
+    return _background_out(
+        read_background(name),
+        sequences=counter.sequences,
+        bases=int(counter.bases.sum()),
+    )
+
+
+def _count_record(counter: BackgroundCounter, sequence: bytes) -> None:
+    counter.add(EncodedSequence.from_bytes(sequence))
+
 
-    file_path = os.path.join(save_dir, uploaded_file.filename)
+def read_background_model(name: str) -> MotifBackgroundOut:
+    return _background_out(read_background(name))
 
-    # Save file into media_motifsampler
-    with open(file_path, "wb") as f:
-        content = await uploaded_file.read()
-        f.write(content)
 
-    return uploaded_file.filename
+def _background_out(model: BackgroundModel, **counts) -> MotifBackgroundOut:
+    return MotifBackgroundOut(
+        name=model.name,
+        order=model.order,
+        digest=model.digest,
+        frequencies=model.frequencies.tolist(),
+        **counts,
+    )
 
 
 async def run_motif_sampler(
@@ -106,8 +543,9 @@ async def run_motif_sampler(
     b_file_path: str | None = None,
     output_o: str = "output.txt",
     output_m: str = "output.mtrx",
+    workspace: str = SAMPLER_DIR,
     **parameters,
-) -> list[str]:
+) -> list[MotifMatrix]:
     """
     Runs the motif sampler tool with the given parameters.
 
@@ -116,47 +554,43 @@ async def run_motif_sampler(
         b_file_path (str, optional): The file path of the background file. Defaults to None.
         output_o (str, optional): The output file path for the motifs. Defaults to "output.txt".
         output_m (str, optional): The output file path for the motif matrix. Defaults to "output.mtrx".
+        workspace (str, optional): The working directory of the run, where relative
+            paths are resolved. Defaults to the motif sampler directory.
         **parameters: Additional parameters to be passed to the motif sampler tool.
 
     Returns:
-        list[str]: A list of motifs extracted by the motif sampler tool.
+        list[MotifMatrix]: The motif matrices computed by the motif sampler tool,
+        with their consensus and the site instances of the motifs output.
 
     Raises:
         Exception: If the motif sampler fails with an error.
 
     """
-    # Construct command line
-    command = [
-        "cd",
-        "./app/media_motifsampler",
-        "&&",
-        "./motif-sampler",
-        "-f",
-        f_file_path,
-    ]
+    # Construct the argument list, run without a shell
+    arguments = [os.path.abspath(SAMPLER_BINARY)]
+    arguments.extend(["-f", f_file_path])
     if b_file_path:
-        command.extend(["-b", b_file_path])
-    command.extend(["-o", output_o, "-m", output_m])
+        arguments.extend(["-b", b_file_path])
+    arguments.extend(["-o", output_o, "-m", output_m])
     for key, value in parameters.items():
         if value is not None:
-            command.extend([f"-{key}", str(value)])
+            arguments.extend([f"-{key}", str(value)])
 
-    # Execute command line
-    command = " ".join(command)
-    process = subprocess.run(command, capture_output=True, text=True, shell=True)
+    returncode, _, stderr = await sampler_runner.run(arguments, cwd=workspace)
 
     # Handle results
-    if process.returncode == 0:
-        path_result = f"./app/media_motifsampler/{output_m}"
+    if returncode == 0:
+        path_result = os.path.join(workspace, output_m)
         with open(path_result, "r") as f:
-            motifs = []
-            for line in f:
-                if line.startswith("#Consensus"):
-                    motif = line.split("=")[1].strip()  # Keep only the sequence part
-                    motifs.append(motif)
-        return motifs
+            matrices = parse_inclusive_matrices(f.read())
+        path_sites = os.path.join(workspace, output_o)
+        with open(path_sites, "r") as f:
+            sites = parse_inclusive_sites(f.read())
+        for matrix in matrices:
+            matrix.sites = sites.get(matrix.name, [])
+        return matrices
     else:
-        error_message = process.stderr.strip()
+        error_message = stderr.strip()
         raise Exception(f"Motif sampler failed with error: {error_message}")
 
 
@@ -220,6 +654,7 @@ def validate_computational_motif(
 
     # remove computational motif
     session.delete(db_computational_motif)
+    bump_catalog_version(session)
     session.commit()
 
     return Message(
@@ -265,3 +700,92 @@ def create_computational_motif(
     session.commit()
     session.refresh(db_computational_motif)
     return db_computational_motif
+
+
+def scan_motif_matrices(session: Session, data_in: PWMScanIn) -> PWMScanOut:
+    """
+    Score both strands of the sequence against the position weight matrices
+    of `data_in` and the saved matrices of its `motif_ids`, and return the
+    windows above its score and/or p-value thresholds (default: a p-value
+    of `settings.MOTIF_PWM_MAX_P_VALUE`).
+    """
+    matrices = []
+    for motif_id in data_in.motif_ids:
+        db_computational_motif = read_computational_motif(session, motif_id)
+        if db_computational_motif.matrix is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Computational motif {motif_id} has no matrix",
+            )
+        matrices.append(_stored_matrix(db_computational_motif))
+    try:
+        matrices.extend(
+            MotifMatrix(matrix.name, matrix.probabilities, matrix.consensus, matrix.score)
+            for matrix in data_in.matrices
+        )
+        background = _pwm_background(data_in.background)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+
+    max_p_value = data_in.max_p_value
+    if not matrices:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one matrix or motif id is required.",
+        )
+    if max_p_value is None and data_in.min_score is None:
+        max_p_value = settings.MOTIF_PWM_MAX_P_VALUE
+
+    scanner = PWMScanner(matrices, background)
+    hits = scanner.scan(
+        EncodedSequence.from_text(data_in.sequence), data_in.min_score, max_p_value
+    )
+    return PWMScanOut(
+        forward_strand_matches=_pwm_strand_matches(scanner, hits, FORWARD),
+        reverse_strand_matches=_pwm_strand_matches(scanner, hits, REVERSE),
+    )
+
+
+def _pwm_background(frequencies: list[float] | None) -> np.ndarray | None:
+    if frequencies is None:
+        return None
+    background = np.asarray(frequencies, dtype=np.float64)
+    if background.shape != (4,) or (background <= 0).any():
+        raise ValueError("The background must be 4 positive frequencies (A, C, G, T).")
+    return background / background.sum()
+
+
+def _pwm_strand_matches(scanner: PWMScanner, hits, strand: int) -> list[PWMStrandMatch]:
+    matrix_indexes, strands, starts, scores = hits
+    selected = strands == strand
+    matrix_indexes, starts, scores = (
+        matrix_indexes[selected],
+        starts[selected],
+        scores[selected],
+    )
+    p_values = scanner.p_values(matrix_indexes, scores)
+
+    matches = []
+    for index in np.unique(matrix_indexes).tolist():
+        matrix = scanner.matrices[index]
+        rows = matrix_indexes == index
+        positions = [
+            PWMPosition(
+                start=start,
+                end=start + matrix.width,
+                score=round(score * SCORE_RESOLUTION, 2),
+                p_value=p_value,
+            )
+            for start, score, p_value in zip(
+                starts[rows].tolist(), scores[rows].tolist(), p_values[rows].tolist()
+            )
+        ]
+        matches.append(
+            PWMStrandMatch(
+                matrix=matrix.name, consensus=matrix.consensus, positions=positions
+            )
+        )
+    return matches
@@ -0,0 +1,185 @@
+import re
+
+import numpy as np
+
+# Column order of the INCLUSive matrices and of every PWM array
+MATRIX_BASES = "ACGT"
+# Storage type of the matrices: 16 bytes per motif position
+MATRIX_DTYPE = np.dtype("<f4")
+
+_GFF_ATTRIBUTE = re.compile(r'(\w+) "([^"]*)"')
+
+
+class MotifSite:
+    """Site instance of a motif in the motif sampler GFF output."""
+
+    __slots__ = ("sequence_name", "start", "end", "strand", "score", "site")
+
+    def __init__(
+        self,
+        sequence_name: str,
+        start: int,
+        end: int,
+        strand: str,
+        score: float,
+        site: str,
+    ):
+        self.sequence_name = sequence_name
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.score = score
+        self.site = site
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MotifMatrix:
+    """
+    Position frequency matrix of a motif found by the motif sampler: one
+    row per motif position, the probabilities of A, C, G and T.
+    """
+
+    __slots__ = ("name", "score", "consensus", "probabilities", "sites")
+
+    def __init__(
+        self,
+        name: str,
+        probabilities: np.ndarray,
+        consensus: str | None = None,
+        score: float | None = None,
+        sites: list[MotifSite] | None = None,
+    ):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if probabilities.ndim != 2 or probabilities.shape[1] != len(MATRIX_BASES):
+            raise ValueError(f"Matrix {name} must have {len(MATRIX_BASES)} columns.")
+        if not len(probabilities):
+            raise ValueError(f"Matrix {name} is empty.")
+        if (probabilities < 0).any():
+            raise ValueError(f"Matrix {name} has negative probabilities.")
+        totals = probabilities.sum(axis=1, keepdims=True)
+        if (totals == 0).any():
+            raise ValueError(f"Matrix {name} has an empty row.")
+
+        self.name = name
+        # Rows of the sampler output sum to 1 up to rounding; counts are accepted too
+        self.probabilities = probabilities / totals
+        self.consensus = consensus or self.default_consensus()
+        self.score = score
+        self.sites = sites or []
+
+    @classmethod
+    def from_bytes(cls, name: str, data: bytes, **kwargs) -> "MotifMatrix":
+        """Matrix stored by `to_bytes`."""
+        probabilities = np.frombuffer(data, dtype=MATRIX_DTYPE)
+        return cls(name, probabilities.reshape(-1, len(MATRIX_BASES)), **kwargs)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MotifMatrix":
+        """Matrix returned by `to_dict`."""
+        return cls(
+            data["name"],
+            data["probabilities"],
+            data["consensus"],
+            data["score"],
+            [MotifSite(**site) for site in data["sites"]],
+        )
+
+    def to_bytes(self) -> bytes:
+        return self.probabilities.astype(MATRIX_DTYPE).tobytes()
+
+    @property
+    def width(self) -> int:
+        return len(self.probabilities)
+
+    def default_consensus(self) -> str:
+        return "".join(MATRIX_BASES[base] for base in self.probabilities.argmax(axis=1))
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "score": self.score,
+            "consensus": self.consensus,
+            "probabilities": self.probabilities.tolist(),
+            "sites": [site.to_dict() for site in self.sites],
+        }
+
+
+def parse_inclusive_matrices(text: str) -> list[MotifMatrix]:
+    """
+    Parse the `.mtrx` output of the motif sampler (INCLUSive motif model):
+    `#ID`, `#Score`, `#W` and `#Consensus` headers, each followed by `W`
+    rows of four tab-separated probabilities. Other lines are ignored.
+    """
+    matrices = []
+    headers = {}
+    rows = []
+
+    def flush():
+        if rows:
+            score = headers.get("Score")
+            matrices.append(
+                MotifMatrix(
+                    headers.get("ID") or f"motif_{len(matrices) + 1}",
+                    np.array(rows),
+                    headers.get("Consensus"),
+                    float(score) if score else None,
+                )
+            )
+        headers.clear()
+        rows.clear()
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#"):
+            name, separator, value = line[1:].partition("=")
+            if not separator:
+                continue
+            if rows:
+                flush()
+            headers[name.strip()] = value.strip()
+            continue
+        values = line.split()
+        if len(values) != len(MATRIX_BASES):
+            if rows:
+                flush()
+            continue
+        try:
+            rows.append([float(value) for value in values])
+        except ValueError:
+            flush()
+    flush()
+    return matrices
+
+
+def parse_inclusive_sites(text: str) -> dict[str, list[MotifSite]]:
+    """
+    Parse the site instances of the `.txt` output of the motif sampler
+    (INCLUSive GFF: sequence, source, feature, start, end, score, strand,
+    frame and `id "..."; site "...";` attributes), by motif id. Positions
+    are kept as written, 1-based and inclusive.
+    """
+    sites = {}
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) < 9:
+            continue
+        attributes = dict(_GFF_ATTRIBUTE.findall(fields[8]))
+        if "id" not in attributes:
+            continue
+        try:
+            site = MotifSite(
+                fields[0].strip().rstrip(":"),
+                int(fields[3]),
+                int(fields[4]),
+                fields[6].strip(),
+                float(fields[5]),
+                attributes.get("site", ""),
+            )
+        except ValueError:
+            continue
+        sites.setdefault(attributes["id"], []).append(site)
+    return sites
@@ -0,0 +1,164 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from api.applications.cre.encoded_sequence import EncodedSequence
+from api.applications.motif.motif_matrix import MATRIX_BASES, MotifMatrix
+
+FORWARD = 0
+REVERSE = 1
+
+UNIFORM_BACKGROUND = np.full(len(MATRIX_BASES), 1 / len(MATRIX_BASES))
+# Log-odds are rounded to this many bits, which makes the p-values exact
+SCORE_RESOLUTION = 0.01
+# Floor of the matrix probabilities, a zero would make a base impossible
+MIN_PROBABILITY = 1e-4
+# Sequence positions scored per matrix product
+BLOCK_POSITIONS = 1 << 16
+
+# Column of each 4-bit base mask in the matrices, -1 for ambiguous codes
+_BASE_COLUMNS = np.full(16, -1, dtype=np.int8)
+for _column, _mask in enumerate((1, 2, 4, 8)):
+    _BASE_COLUMNS[_mask] = _column
+
+
+def log_odds_scores(matrix: MotifMatrix, background: np.ndarray) -> np.ndarray:
+    """
+    Position weight matrix of `matrix` against `background` base
+    frequencies: log2 odds as integers in units of `SCORE_RESOLUTION`.
+    """
+    probabilities = np.maximum(matrix.probabilities, MIN_PROBABILITY)
+    log_odds = np.log2(probabilities / background)
+    return np.rint(log_odds / SCORE_RESOLUTION).astype(np.int64)
+
+
+def score_tail(scores: np.ndarray, background: np.ndarray) -> tuple[int, np.ndarray]:
+    """
+    Exact distribution of the window score of integer `scores` when the
+    bases are drawn from `background`: returns the lowest score and
+    `tail[i]`, the probability of a score >= lowest + i.
+    """
+    minimums = scores.min(axis=1)
+    distribution = np.ones(1)
+    for column, minimum in zip(scores, minimums):
+        shifts = column - minimum
+        convolved = np.zeros(len(distribution) + shifts.max())
+        for shift, probability in zip(shifts, background):
+            convolved[shift : shift + len(distribution)] += probability * distribution
+        distribution = convolved
+    tail = np.cumsum(distribution[::-1])[::-1]
+    return int(minimums.sum()), np.minimum(tail, 1.0)
+
+
+class PWMScanner:
+    """
+    Scores every window of a sequence, on both strands, against a set of
+    position weight matrices.
+
+    The sequence is one-hot encoded once; for each matrix width its windows
+    are a strided view of that encoding, so all the matrices of the width
+    and their reverse complements are scored by a single matrix product
+    per block of positions. Windows with an ambiguous base are not scored.
+    Scores are integral multiples of `SCORE_RESOLUTION` with an exact
+    p-value under the background, computed once per matrix.
+    """
+
+    def __init__(self, matrices: list[MotifMatrix], background: np.ndarray | None = None):
+        self.matrices = matrices
+        self.background = UNIFORM_BACKGROUND if background is None else background
+        self.scores = [log_odds_scores(matrix, self.background) for matrix in matrices]
+        self.tails = [score_tail(scores, self.background) for scores in self.scores]
+
+        self.widths = {}
+        for index, scores in enumerate(self.scores):
+            self.widths.setdefault(len(scores), []).append(index)
+
+    def score_threshold(self, index: int, max_p_value: float) -> int:
+        """Lowest integer score of matrix `index` with a p-value <= `max_p_value`."""
+        lowest, tail = self.tails[index]
+        passing = np.flatnonzero(tail <= max_p_value)
+        if not len(passing):
+            return lowest + len(tail)
+        return lowest + int(passing[0])
+
+    def p_values(self, indexes: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """P-values of integer `scores` of the matrices `indexes`."""
+        p_values = np.empty(len(scores))
+        for index in np.unique(indexes).tolist():
+            selected = indexes == index
+            lowest, tail = self.tails[index]
+            p_values[selected] = tail[np.clip(scores[selected] - lowest, 0, len(tail) - 1)]
+        return p_values
+
+    def scan(
+        self,
+        sequence: EncodedSequence | str,
+        min_score: float | None = None,
+        max_p_value: float | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return `(matrices, strands, starts, scores)` of the windows scoring
+        at least `min_score` bits and with a p-value at most `max_p_value`,
+        sorted by strand, matrix index and start. Reverse hits are in
+        reverse complement coordinates, like the CRE search. Scores are
+        integers in units of `SCORE_RESOLUTION`.
+        """
+        sequence = EncodedSequence.coerce(sequence)
+        columns = _BASE_COLUMNS[sequence.codes]
+        one_hot = np.zeros((len(columns), len(MATRIX_BASES)), dtype=np.float32)
+        concrete = np.flatnonzero(columns >= 0)
+        one_hot[concrete, columns[concrete]] = 1
+        # Running count of ambiguous bases, to reject the windows holding one
+        ambiguous = np.concatenate(([0], np.cumsum(columns < 0)))
+
+        found = []
+        for width, indexes in self.widths.items():
+            if width > len(sequence):
+                continue
+            thresholds = np.array(
+                [self._threshold(index, min_score, max_p_value) for index in indexes] * 2
+            )
+            # Forward matrices then their reverse complements (reversed rows,
+            # A <-> T and C <-> G being reversed columns)
+            weights = np.stack(
+                [self.scores[index] for index in indexes]
+                + [self.scores[index][::-1, ::-1] for index in indexes]
+            ).astype(np.float32)
+            windows = sliding_window_view(one_hot, (width, len(MATRIX_BASES)))[:, 0]
+            valid = ambiguous[width:] == ambiguous[:-width]
+
+            for first in range(0, len(windows), BLOCK_POSITIONS):
+                block = windows[first : first + BLOCK_POSITIONS]
+                # Exact: integer scores stay far below the float32 mantissa
+                scores = np.rint(np.tensordot(block, weights, axes=([1, 2], [1, 2])))
+                scores = scores.astype(np.int64)
+                hit = (scores >= thresholds) & valid[first : first + len(block), None]
+                positions, rows = np.nonzero(hit)
+                found.append(
+                    (
+                        np.asarray(indexes)[rows % len(indexes)],
+                        rows // len(indexes),
+                        positions + first,
+                        scores[positions, rows],
+                    )
+                )
+
+        if not found:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty
+        matrices, strands, starts, scores = (np.concatenate(column) for column in zip(*found))
+        widths = np.array([len(matrix_scores) for matrix_scores in self.scores])[matrices]
+        # The reverse complement matrix at forward start i is the matrix at
+        # n - i - width of the reverse complement sequence
+        starts = np.where(strands == REVERSE, len(sequence) - starts - widths, starts)
+        order = np.lexsort((starts, matrices, strands))
+        return matrices[order], strands[order], starts[order], scores[order]
+
+    def _threshold(
+        self, index: int, min_score: float | None, max_p_value: float | None
+    ) -> int:
+        threshold = self.tails[index][0]
+        if min_score is not None:
+            threshold = max(threshold, int(np.ceil(min_score / SCORE_RESOLUTION - 1e-9)))
+        if max_p_value is not None:
+            threshold = max(threshold, self.score_threshold(index, max_p_value))
+        return threshold
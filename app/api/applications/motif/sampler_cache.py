@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from api.applications.motif.motif_matrix import MotifMatrix
+from core.config import settings
+
+# Bytes hashed at a time
+DIGEST_CHUNK_SIZE = 1 << 20
+# Bump when the stored layout or the key derivation changes
+CACHE_FORMAT = 1
+_ENTRY_SUFFIX = ".json"
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sampler_cache_key(
+    sequences_path: str, background_path: str, binary_path: str, parameters: dict
+) -> str:
+    """
+    Key of a sampler run: the contents of its sequences, background and
+    binary, and its parameters, the unset ones (the sampler defaults)
+    left out.
+    """
+    key = {
+        "format": CACHE_FORMAT,
+        "sequences": file_digest(sequences_path),
+        "background": file_digest(background_path),
+        "binary": file_digest(binary_path),
+        "parameters": {
+            name: value for name, value in parameters.items() if value is not None
+        },
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+class SamplerResultCache:
+    """
+    On-disk cache of the parsed motif sampler results, one JSON file per
+    `sampler_cache_key`, bounded by `max_bytes` in total (0 disables it).
+
+    The sampler draws its own random seed, so an entry is one sample of
+    the results of its inputs: identical requests get the same sample
+    back until it is refreshed or evicted. Reads refresh the file
+    modification time, and the least recently used entries are evicted
+    first. Entries are written atomically, so worker processes can share
+    the directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{_ENTRY_SUFFIX}")
+
+    def get(self, key: str) -> list[MotifMatrix] | None:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return [MotifMatrix.from_dict(matrix) for matrix in data]
+
+    def put(self, key: str, matrices: list[MotifMatrix]) -> None:
+        if not self.enabled:
+            return
+        data = json.dumps([matrix.to_dict() for matrix in matrices]).encode()
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(_ENTRY_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self) -> None:
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.endswith(_ENTRY_SUFFIX):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> dict:
+        entries = 0
+        current_bytes = 0
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(_ENTRY_SUFFIX):
+                    entries += 1
+                    current_bytes += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            return {
+                "entries": entries,
+                "current_bytes": current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+sampler_cache = SamplerResultCache(
+    directory=settings.MOTIF_SAMPLER_CACHE_DIR
+    or os.path.join(tempfile.gettempdir(), "crequest-motif-sampler-cache"),
+    max_bytes=settings.MOTIF_SAMPLER_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SamplerRunner:
+    """
+    Runs motif sampler processes without blocking the event loop.
+
+    At most `concurrency` processes run at once; up to `queue_size` more
+    runs wait for a slot, further requests are rejected with 503 and a
+    `Retry-After` header like the scan pool. A run exceeding `timeout`
+    seconds is killed, as is the process of a cancelled request.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int, timeout: float, retry_after: int):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = threading.Lock()
+
+    async def run(self, arguments: list[str], cwd: str) -> tuple[int, str, str]:
+        """
+        Run the executable `arguments[0]` with the other `arguments` in
+        `cwd`, without a shell; return its exit code, stdout and stderr.
+        """
+        with self._lock:
+            if self.waiting >= self.queue_size and self._semaphore.locked():
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="The motif sampler queue is full, please retry later.",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self.waiting += 1
+
+        queued = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                self.wait_seconds += time.perf_counter() - queued
+
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return await self._run_process(arguments, cwd)
+        finally:
+            self._semaphore.release()
+            with self._lock:
+                self.running -= 1
+                self.run_seconds += time.perf_counter() - started
+
+    async def _run_process(self, arguments: list[str], cwd: str) -> tuple[int, str, str]:
+        process = await asyncio.create_subprocess_exec(
+            *arguments,
+            cwd=cwd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"The motif sampler did not finish within {self.timeout:g} seconds.",
+            )
+        finally:
+            if process.returncode is None:
+                logger.warning("Killing motif sampler process %s", process.pid)
+                process.kill()
+                await process.wait()
+
+        with self._lock:
+            if process.returncode == 0:
+                self.completed += 1
+            else:
+                self.failed += 1
+        return (
+            process.returncode,
+            stdout.decode("utf-8", "replace"),
+            stderr.decode("utf-8", "replace"),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "queue_size": self.queue_size,
+                "running": self.running,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "rejected": self.rejected,
+                "wait_seconds": self.wait_seconds,
+                "run_seconds": self.run_seconds,
+            }
+
+
+sampler_runner = SamplerRunner(
+    concurrency=settings.MOTIF_SAMPLER_CONCURRENCY or os.cpu_count() or 1,
+    queue_size=settings.MOTIF_SAMPLER_QUEUE_SIZE,
+    timeout=settings.MOTIF_SAMPLER_TIMEOUT,
+    retry_after=settings.MOTIF_SAMPLER_RETRY_AFTER,
+)
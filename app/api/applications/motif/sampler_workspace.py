@@ -0,0 +1,253 @@
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException, UploadFile, status
+
+from api.applications.cre.fasta_stream import (
+    FastaFormatError,
+    FastaLimitError,
+    FastaValidator,
+    StreamDecoder,
+)
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes written from an upload at a time
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Present while a run uses the workspace, locked by its owner for as long
+# as it holds the workspace, so no collector removes it
+ACTIVE_MARKER = ".active"
+WORKSPACE_PREFIX = "run-"
+
+_collect_lock = threading.Lock()
+
+
+def workspace_root() -> str:
+    return settings.MOTIF_SAMPLER_WORKSPACE_DIR or os.path.join(
+        tempfile.gettempdir(), "crequest-motif-sampler"
+    )
+
+
+class SamplerWorkspace:
+    """
+    Private working directory of one motif sampler run: its uploaded
+    inputs, checked while they are written, and its outputs, named inside
+    the workspace so that concurrent runs never share a file. Used as a
+    context manager, the workspace is
+    active for the duration of the run and kept afterwards until
+    `collect_workspaces` removes it by age or disk quota.
+
+    An active workspace holds a lease, an exclusive `flock` on its marker
+    file: the lease lasts however long the owner keeps the workspace (a
+    whole sweep for its inputs) and ends with the owner's process, so a
+    collector tells the workspaces of live runs from those of crashed ones.
+    """
+
+    __slots__ = ("path", "_lease")
+
+    def __init__(self, path: str, lease=None):
+        self.path = path
+        self._lease = lease
+
+    @classmethod
+    def create(cls) -> "SamplerWorkspace":
+        root = workspace_root()
+        os.makedirs(root, exist_ok=True)
+        collect_workspaces(root)
+        path = tempfile.mkdtemp(prefix=WORKSPACE_PREFIX, dir=root)
+        lease = open(os.path.join(path, ACTIVE_MARKER), "w")
+        fcntl.flock(lease, fcntl.LOCK_EX)
+        return cls(path, lease)
+
+    def __enter__(self) -> "SamplerWorkspace":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def file(self, name: str) -> str:
+        """Path of the workspace file `name`, a plain file name."""
+        if not name or os.path.basename(name) != name or name in (".", ".."):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid file name: {name}",
+            )
+        if name == ACTIVE_MARKER:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Reserved file name: {name}",
+            )
+        return os.path.join(self.path, name)
+
+    async def save_upload(self, upload: UploadFile, name: str, max_bytes: int) -> str:
+        """
+        Write `upload` to the workspace file `name` by chunks; 413 once it
+        exceeds `max_bytes`.
+        """
+        path = self.file(name)
+        size = 0
+        with open(path, "wb") as file:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    file.close()
+                    os.remove(path)
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"{upload.filename} is larger than {max_bytes} bytes.",
+                    )
+                file.write(chunk)
+        return name
+
+    async def save_fasta_upload(
+        self,
+        upload: UploadFile,
+        name: str,
+        max_bytes: int,
+        max_records: int,
+        max_bases: int,
+    ) -> FastaValidator:
+        """
+        Write the (optionally gzip-compressed) FASTA `upload` decompressed
+        to the workspace file `name`, validating it by chunks as it is
+        written: 413 once it exceeds a limit, 422 if it is malformed.
+        """
+        path = self.file(name)
+        decoder = StreamDecoder()
+        validator = FastaValidator(max_records, max_bases)
+        size = 0
+        try:
+            with open(path, "wb") as file:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    data = decoder.decode(chunk)
+                    size += len(data)
+                    if size > max_bytes:
+                        raise FastaLimitError(
+                            f"{upload.filename} is larger than {max_bytes} bytes."
+                        )
+                    validator.feed(data)
+                    file.write(data)
+                data = decoder.flush()
+                validator.feed(data)
+                validator.close()
+                file.write(data)
+        except FastaFormatError as e:
+            os.remove(path)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                if isinstance(e, FastaLimitError)
+                else status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e),
+            )
+        return validator
+
+    def release(self) -> None:
+        try:
+            os.remove(os.path.join(self.path, ACTIVE_MARKER))
+            # The age of a workspace counts from the end of its run
+            os.utime(self.path)
+        except FileNotFoundError:
+            pass
+        if self._lease is not None:
+            # Closing the marker releases its lock
+            self._lease.close()
+            self._lease = None
+
+
+def _workspace_size(path: str) -> int:
+    size = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(directory, name)).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+
+def _is_leased(path: str) -> bool:
+    """Whether a live run holds the lease of the workspace at `path`."""
+    try:
+        marker = open(os.path.join(path, ACTIVE_MARKER))
+    except FileNotFoundError:
+        return False
+    with marker:
+        try:
+            fcntl.flock(marker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(marker, fcntl.LOCK_UN)
+    return False
+
+
+def collect_workspaces(
+    root: str | None = None,
+    ttl: float | None = None,
+    max_bytes: int | None = None,
+) -> int:
+    """
+    Remove the finished workspaces older than `ttl` seconds, then the
+    oldest ones until all of them fit in `max_bytes`. Leased workspaces
+    are never removed, however old; an active workspace whose lease has
+    ended belongs to a crashed run and is removed after `ttl` too.
+    Returns the number of workspaces removed.
+    """
+    root = root or workspace_root()
+    ttl = settings.MOTIF_SAMPLER_WORKSPACE_TTL if ttl is None else ttl
+    max_bytes = settings.MOTIF_SAMPLER_WORKSPACE_MAX_BYTES if max_bytes is None else max_bytes
+    if not _collect_lock.acquire(blocking=False):
+        # Another request is collecting already
+        return 0
+    try:
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(root)
+                if entry.name.startswith(WORKSPACE_PREFIX) and entry.is_dir()
+            ]
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        removable = []
+        kept_bytes = 0
+        removed = 0
+        for entry in entries:
+            try:
+                age = now - entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            leased = _is_leased(entry.path)
+            if age > ttl and not leased:
+                removed += _remove(entry.path)
+                continue
+            size = _workspace_size(entry.path)
+            kept_bytes += size
+            if not leased and not os.path.exists(os.path.join(entry.path, ACTIVE_MARKER)):
+                removable.append((age, size, entry.path))
+
+        # Oldest first, active workspaces are never evicted for space
+        removable.sort(reverse=True)
+        for _, size, path in removable:
+            if kept_bytes <= max_bytes:
+                break
+            removed += _remove(path)
+            kept_bytes -= size
+        return removed
+    finally:
+        _collect_lock.release()
+
+
+def _remove(path: str) -> int:
+    try:
+        shutil.rmtree(path)
+    except OSError:
+        logger.warning("Could not remove motif sampler workspace %s", path, exc_info=True)
+        return 0
+    return 1
@@ -1,14 +1,32 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
 
 from api.deps import SessionDep
 from models.computational_motif import ComputationalMotifListOut, SearchComputationalMotif
 from core.config import settings
 from fastapi.params import Depends
-from models.factors import FactorsListOut, CreUpdateIn, FactorsOut, MotifSearch, MotifSearchOut
+from models.factors import (
+    CreResultCacheStatsOut,
+    FactorsListOut,
+    CreUpdateIn,
+    FactorsOut,
+    MotifSamplerCacheStatsOut,
+    MotifSamplerStatsOut,
+    MotifSearch,
+    MotifSearchOut,
+)
 
 import api.applications.cre.cre_controller as CreController
 import api.applications.cre.search_cre_controller as SearchMotifController
+from api.applications.cre.result_cache import result_cache
+from api.applications.cre.search_formats import (
+    SEARCH_RESPONSES,
+    SearchView,
+    search_media_type,
+    search_view,
+)
 import api.applications.motif.motif_controller as MotifController
+from api.applications.motif.sampler_cache import sampler_cache
+from api.applications.motif.sampler_runner import sampler_runner
 
 import uuid
 
@@ -107,9 +125,75 @@ def delete_function_label(session: SessionDep, ft_id: uuid.UUID) -> Message:
     return CreController.delete_function_label(session, ft_id)
 
 
-@router.post("/search-for-cre", response_model=MotifSearchOut, dependencies=[Depends(get_current_active_admin)])
-def search_for_cre(*, session: SessionDep, data_in: MotifSearch):
-    return SearchMotifController.search_for_cre(session, data_in)
+@router.post(
+    "/search-for-cre",
+    response_model=MotifSearchOut,
+    responses=SEARCH_RESPONSES,
+    dependencies=[Depends(get_current_active_admin)],
+)
+def search_for_cre(
+    *,
+    session: SessionDep,
+    data_in: MotifSearch,
+    media_type: str = Depends(search_media_type),
+    view: SearchView = Depends(search_view),
+):
+    return SearchMotifController.search_for_cre(
+        session, data_in, media_type=media_type, view=view
+    )
+
+
+@router.get(
+    "/search-for-cre/cache",
+    response_model=CreResultCacheStatsOut,
+    dependencies=[Depends(get_current_active_admin)],
+)
+def read_search_result_cache_stats() -> CreResultCacheStatsOut:
+    return result_cache.stats()
+
+
+@router.delete(
+    "/search-for-cre/cache",
+    response_model=Message,
+    dependencies=[Depends(get_current_active_admin)],
+)
+def clear_search_result_cache() -> Message:
+    result_cache.clear()
+    return Message(
+        status_code=status.HTTP_200_OK, message="Search result cache cleared."
+    )
+
+
+@router.get(
+    "/motif-sampler/stats",
+    response_model=MotifSamplerStatsOut,
+    dependencies=[Depends(get_current_active_admin)],
+)
+def read_motif_sampler_stats() -> MotifSamplerStatsOut:
+    """Motif sampler slots, queue depth and run counters of this worker."""
+    return sampler_runner.stats()
+
+
+@router.get(
+    "/motif-sampler/cache",
+    response_model=MotifSamplerCacheStatsOut,
+    dependencies=[Depends(get_current_active_admin)],
+)
+def read_motif_sampler_cache_stats() -> MotifSamplerCacheStatsOut:
+    return sampler_cache.stats()
+
+
+@router.delete(
+    "/motif-sampler/cache",
+    response_model=Message,
+    dependencies=[Depends(get_current_active_admin)],
+)
+def clear_motif_sampler_cache() -> Message:
+    sampler_cache.clear()
+    return Message(
+        status_code=status.HTTP_200_OK, message="Motif sampler result cache cleared."
+    )
+
 
 @router.post(
     "/computational-motifs/search",
@@ -8,6 +8,14 @@ from models.computational_motif import (
     SearchComputationalMotif,
 )
 from models.factors import FactorsIn, MotifSamplerResponse
+from models.motif_matrix import (
+    MotifBackgroundOut,
+    MotifMatrixIn,
+    MotifMatrixOut,
+    MotifSweepOut,
+    PWMScanIn,
+    PWMScanOut,
+)
 from models.base import Message
 import api.applications.motif.motif_controller as MotifController
 from core.config import settings
@@ -27,6 +35,15 @@ def read_computational_motif(
     return MotifController.read_computational_motif(session, motif_id)
 
 
+@router.get(
+    "/computational-motifs/{motif_id}/matrix",
+    response_model=MotifMatrixOut,
+    dependencies=[Depends(get_current_active_biologist)],
+)
+def read_computational_motif_matrix(session: SessionDep, motif_id: int) -> MotifMatrixOut:
+    return MotifController.read_computational_motif_matrix(session, motif_id)
+
+
 @router.get(
     "/computational-motifs",
     response_model=ComputationalMotifListOut,
@@ -66,7 +83,7 @@ def validate_computational_motif(
 async def motif_sampler(
     session: SessionDep,
     f_file: UploadFile = File(...),
-    b_file: UploadFile = File(...),
+    b_file: UploadFile | None = File(None),
     output_o: str = Form(...),
     output_m: str = Form(...),
     r: int | None = Form(100),
@@ -78,13 +95,17 @@ async def motif_sampler(
     p: int | None = Form(None),
     Q: int | None = Form(100),
     z: int | None = Form(1),
+    background: str | None = Form(None),
+    use_cache: bool = Form(False),
 ) -> MotifSamplerResponse:
     """
     Endpoint for performing motif sampling.
 
     Args:
         f_file (UploadFile): The input file for motif sampling.
-        b_file (UploadFile): The background file for motif sampling.
+        b_file (UploadFile | None): The background file for motif sampling.
+        background (str | None): A stored background model, used instead of b_file.
+        use_cache (bool): Serve the results of an identical earlier run from the cache. Default is False.
         output_o (str): The output file for observed motifs.
         output_m (str): The output file for motif occurrences.
         r (int | None): The number of randomizations to perform. Default is 100.
@@ -101,7 +122,93 @@ async def motif_sampler(
         MotifSamplerResponse: The response containing the results of motif sampling.
     """
     return await MotifController.motif_sampler(
-        session, f_file, b_file, output_o, output_m, r, s, w, n, x, M, p, Q, z, True
+        session,
+        f_file,
+        b_file,
+        output_o,
+        output_m,
+        r,
+        s,
+        w,
+        n,
+        x,
+        M,
+        p,
+        Q,
+        z,
+        True,
+        background=background,
+        use_cache=use_cache,
+    )
+
+
+@router.post(
+    "/motif-backgrounds",
+    response_model=MotifBackgroundOut,
+    dependencies=[Depends(get_current_active_biologist)],
+)
+async def create_motif_background(
+    fasta_file: UploadFile = File(...), order: int = Form(2)
+) -> MotifBackgroundOut:
+    """
+    Build a Markov background model of `order` (0 to 5) from the sequences
+    of a multi-FASTA file, optionally gzip-compressed. The returned `name`
+    can be passed as the motif sampler `background` and as the search
+    `background`; the same sequences and order give the same name.
+    """
+    return await MotifController.create_background(fasta_file, order)
+
+
+@router.get(
+    "/motif-backgrounds/{name}",
+    response_model=MotifBackgroundOut,
+    dependencies=[Depends(get_current_active_biologist)],
+)
+def read_motif_background(name: str) -> MotifBackgroundOut:
+    return MotifController.read_background_model(name)
+
+
+@router.post(
+    "/motif-sampler/sweep",
+    response_model=MotifSweepOut,
+    dependencies=[Depends(get_current_active_biologist)],
+)
+async def motif_sampler_sweep(
+    f_file: UploadFile = File(...),
+    b_file: UploadFile | None = File(None),
+    background: str | None = Form(None),
+    w: list[int] = Form([8]),
+    n: list[int] = Form([1]),
+    replicates: int = Form(3, ge=1),
+    r: int | None = Form(100),
+    s: int | None = Form(0),
+    x: int | None = Form(1),
+    M: int | None = Form(2),
+    p: int | None = Form(None),
+    Q: int | None = Form(100),
+    z: int | None = Form(1),
+    similarity: float | None = Form(None, gt=0, le=1),
+    use_cache: bool = Form(False),
+) -> MotifSweepOut:
+    """
+    Run the motif sampler once per combination of the motif widths `w`
+    and motif counts `n` (repeated form fields) and replicate, in
+    parallel, and merge the motifs of all the runs: matrices whose mean
+    column `similarity` (on either strand, at the best offset) reaches
+    the threshold form one cluster, reported with the number and share
+    of runs that found it. The other parameters are those of
+    `/motif-sampler`.
+    """
+    return await MotifController.motif_sampler_sweep(
+        f_file,
+        b_file,
+        background,
+        w,
+        n,
+        replicates,
+        {"r": r, "s": s, "x": x, "M": M, "p": p, "Q": Q, "z": z},
+        similarity,
+        use_cache,
     )
 
 
@@ -110,7 +217,13 @@ async def motif_sampler(
     response_model=Message,
     dependencies=[Depends(get_current_active_biologist)],
 )
-def save_computational_motif(session: SessionDep, data_in: list[str]) -> Message:
+def save_computational_motif(
+    session: SessionDep, data_in: list[str | MotifMatrixIn]
+) -> Message:
+    """
+    Save consensus sequences, or the `matrices` returned by the motif
+    sampler; those keep their matrix and site instances.
+    """
     return MotifController.save_computational_motif(session, data_in)
 
 
@@ -137,3 +250,19 @@ def create_computational_motif(
     session: SessionDep, data_in: ComputationalMotifIn
 ) -> ComputationalMotifOut:
     return MotifController.create_computational_motif(session, data_in)
+
+
+@router.post(
+    "/motif-matrices/scan",
+    response_model=PWMScanOut,
+    dependencies=[Depends(get_current_active_biologist)],
+)
+def scan_motif_matrices(session: SessionDep, data_in: PWMScanIn) -> PWMScanOut:
+    """
+    Scan both strands of a sequence with position weight matrices, such as
+    the `matrices` returned by the motif sampler. Hits score at least
+    `min_score` bits and/or have a p-value of at most `max_p_value` against
+    the `background` base frequencies; reverse strand positions are on the
+    reverse complement.
+    """
+    return MotifController.scan_motif_matrices(session, data_in)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, File, Form, UploadFile
+import uuid
+
+from fastapi import APIRouter, Depends, File, Form, Request, UploadFile
 from fastapi.responses import StreamingResponse
 from api.deps import SessionDep
 from core.config import settings
 
+from models.motif_matrix import MotifBackgroundOut
+from models.search_job import SearchJobIn, SearchJobOut, SearchJobResultOut
 from models.factors import (
     CreResultSendEmail,
     FactorsListOut,
@@ -12,6 +16,14 @@ from models.factors import (
     QueryCreSearchIn,
 )
 import api.applications.cre.search_cre_controller as SearchMotifController
+from api.applications.cre.search_formats import (
+    SEARCH_RESPONSES,
+    SearchView,
+    search_media_type,
+    search_view,
+)
+import api.applications.cre.fasta_search_controller as FastaSearchController
+import api.applications.cre.search_job_controller as SearchJobController
 import api.applications.motif.motif_controller as MotifController
 import api.applications.cre.export_cre_controller as ExportCreController
 
@@ -19,9 +31,44 @@ import api.applications.cre.export_cre_controller as ExportCreController
 router = APIRouter()
 
 
-@router.post("/search-for-cre", response_model=MotifSearchOut)
-def search_for_cre(*, session: SessionDep, data_in: MotifSearch):
-    return SearchMotifController.search_for_cre(session, data_in)
+@router.post(
+    "/search-for-cre", response_model=MotifSearchOut, responses=SEARCH_RESPONSES
+)
+def search_for_cre(
+    *,
+    session: SessionDep,
+    data_in: MotifSearch,
+    media_type: str = Depends(search_media_type),
+    view: SearchView = Depends(search_view),
+):
+    return SearchMotifController.search_for_cre(
+        session, data_in, media_type=media_type, view=view
+    )
+
+
+@router.post(
+    "/search-for-cre/fasta",
+    response_class=StreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/x-fasta": {"schema": {"type": "string", "format": "binary"}},
+                "application/gzip": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def search_for_cre_fasta(request: Request):
+    """
+    Search every record of a multi-FASTA file sent as the raw request body,
+    optionally gzip-compressed. Results are streamed back as
+    newline-delimited JSON, one line per record.
+    """
+    return FastaSearchController.RequestStreamingResponse(
+        FastaSearchController.search_fasta_stream(request.stream()),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.post("/query-cre", response_model=FactorsListOut)
@@ -38,7 +85,7 @@ def query_cre(
 async def motif_sampler(
     session: SessionDep,
     f_file: UploadFile = File(...),
-    b_file: UploadFile = File(...),
+    b_file: UploadFile | None = File(None),
     output_o: str = Form(...),
     output_m: str = Form(...),
     r: int | None = Form(100),
@@ -50,12 +97,35 @@ async def motif_sampler(
     p: int | None = Form(None),
     Q: int | None = Form(100),
     z: int | None = Form(1),
+    background: str | None = Form(None),
+    use_cache: bool = Form(False),
 ) -> MotifSamplerResponse:
     return await MotifController.motif_sampler(
-        session, f_file, b_file, output_o, output_m, r, s, w, n, x, M, p, Q, z, False
+        session,
+        f_file,
+        b_file,
+        output_o,
+        output_m,
+        r,
+        s,
+        w,
+        n,
+        x,
+        M,
+        p,
+        Q,
+        z,
+        False,
+        background=background,
+        use_cache=use_cache,
     )
 
 
+@router.get("/motif-backgrounds/{name}", response_model=MotifBackgroundOut)
+def read_motif_background(name: str) -> MotifBackgroundOut:
+    return MotifController.read_background_model(name)
+
+
 @router.post("/cre/export-excel")
 def export_cre_excel(session: SessionDep, data_in: list[MotifSearch]):
     """
@@ -86,3 +156,37 @@ def send_cre_excel_email(session: SessionDep, data_in: CreResultSendEmail):
 
     """
     return ExportCreController.send_cre_excel_email(session, data_in)
+
+
+@router.post("/search-jobs", response_model=SearchJobOut)
+def create_search_job(session: SessionDep, data_in: SearchJobIn):
+    """
+    Submit a search or Excel export of several sequences as a background
+    job. Poll it, follow its events, then fetch its result by job id. Jobs
+    run exact searches (`max_mismatches` 0).
+    """
+    return SearchJobController.create_search_job(session, data_in)
+
+
+@router.get("/search-jobs/{job_id}", response_model=SearchJobOut)
+def read_search_job(session: SessionDep, job_id: uuid.UUID):
+    return SearchJobController.read_search_job(session, job_id)
+
+
+@router.get("/search-jobs/{job_id}/events")
+def read_search_job_events(job_id: uuid.UUID):
+    return StreamingResponse(
+        SearchJobController.stream_search_job_events(job_id),
+        media_type="text/event-stream",
+    )
+
+
+@router.get("/search-jobs/{job_id}/result", response_model=SearchJobResultOut)
+def read_search_job_result(session: SessionDep, job_id: uuid.UUID):
+    """Search results as JSON, or the workbook of an export job."""
+    return SearchJobController.read_search_job_result(session, job_id)
+
+
+@router.delete("/search-jobs/{job_id}", response_model=SearchJobOut)
+def cancel_search_job(session: SessionDep, job_id: uuid.UUID):
+    return SearchJobController.cancel_search_job(session, job_id)
@@ -1,3 +1,5 @@
+import uuid
+
 from fastapi import APIRouter, Depends, File, Form, UploadFile
 from fastapi.responses import StreamingResponse
 
@@ -15,12 +17,26 @@ from models.factors import (
     MotifSearchAndSaveHistoryOut,
     QueryCreSearchIn,
 )
+from models.motif_matrix import MotifBackgroundOut
+from models.search_job import (
+    SearchJobIn,
+    SearchJobListOut,
+    SearchJobOut,
+    SearchJobResultOut,
+)
 from core.config import settings
 
 import api.applications.cre.search_cre_controller as SearchMotifController
+from api.applications.cre.search_formats import (
+    SEARCH_RESPONSES,
+    SearchView,
+    search_media_type,
+    search_view,
+)
 import api.applications.history.history_controller as HistoryController
 import api.applications.motif.motif_controller as MotifController
 import api.applications.cre.export_cre_controller as ExportCreController
+import api.applications.cre.search_job_controller as SearchJobController
 
 router = APIRouter()
 
@@ -54,10 +70,15 @@ def query_cre(
 @router.post(
     "/{user_id}/search-for-cre",
     response_model=MotifSearchAndSaveHistoryOut,
+    responses=SEARCH_RESPONSES,
     dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
 )
 def search_for_cre_and_save_history(
-    session: SessionDep, data_in: MotifSearch, user_id: int
+    session: SessionDep,
+    data_in: MotifSearch,
+    user_id: int,
+    media_type: str = Depends(search_media_type),
+    view: SearchView = Depends(search_view),
 ):
     """
     Search for cre and save search history.
@@ -65,13 +86,17 @@ def search_for_cre_and_save_history(
     Parameters:
     - session: The database session.
     - data_in: The input data for the motif search.
+    - media_type: The result representation, negotiated from the `Accept` header.
+    - view: `mode` (positions, counts or presence), the `fields` to return
+      and `compact`, which sends the referenced factors and function labels
+      once, in dictionaries, instead of with every match.
 
     Returns:
     - The result of the motif search.
 
     """
     return SearchMotifController.search_for_cre_and_save_history(
-        session, data_in, user_id
+        session, data_in, user_id, media_type=media_type, view=view
     )
 
 
@@ -145,7 +170,7 @@ def delete_search_for_cre_history(
 async def motif_sampler(
     session: SessionDep,
     f_file: UploadFile = File(...),
-    b_file: UploadFile = File(...),
+    b_file: UploadFile | None = File(None),
     output_o: str = Form(...),
     output_m: str = Form(...),
     r: int | None = Form(100),
@@ -157,13 +182,17 @@ async def motif_sampler(
     p: int | None = Form(None),
     Q: int | None = Form(100),
     z: int | None = Form(1),
+    background: str | None = Form(None),
+    use_cache: bool = Form(False),
 ) -> MotifSamplerResponse:
     """
     Endpoint for performing motif sampling.
 
     Args:
         f_file (UploadFile): The input file for motif sampling.
-        b_file (UploadFile): The background file for motif sampling.
+        b_file (UploadFile | None): The background file for motif sampling.
+        background (str | None): A stored background model, used instead of b_file.
+        use_cache (bool): Serve the results of an identical earlier run from the cache. Default is False.
         output_o (str): The output file for observed motifs.
         output_m (str): The output file for motif occurrences.
         r (int | None): The number of randomizations to perform. Default is 100.
@@ -180,10 +209,52 @@ async def motif_sampler(
         MotifSamplerResponse: The response containing the results of motif sampling.
     """
     return await MotifController.motif_sampler(
-        session, f_file, b_file, output_o, output_m, r, s, w, n, x, M, p, Q, z, False
+        session,
+        f_file,
+        b_file,
+        output_o,
+        output_m,
+        r,
+        s,
+        w,
+        n,
+        x,
+        M,
+        p,
+        Q,
+        z,
+        False,
+        background=background,
+        use_cache=use_cache,
     )
 
 
+@router.post(
+    "/motif-backgrounds",
+    response_model=MotifBackgroundOut,
+    dependencies=[Depends(get_current_active_user)],
+)
+async def create_motif_background(
+    fasta_file: UploadFile = File(...), order: int = Form(2)
+) -> MotifBackgroundOut:
+    """
+    Build a Markov background model of `order` (0 to 5) from the sequences
+    of a multi-FASTA file, optionally gzip-compressed. The returned `name`
+    can be passed as the motif sampler `background` and as the search
+    `background`; the same sequences and order give the same name.
+    """
+    return await MotifController.create_background(fasta_file, order)
+
+
+@router.get(
+    "/motif-backgrounds/{name}",
+    response_model=MotifBackgroundOut,
+    dependencies=[Depends(get_current_active_user)],
+)
+def read_motif_background(name: str) -> MotifBackgroundOut:
+    return MotifController.read_background_model(name)
+
+
 @router.post("/cre/export-excel", dependencies=[Depends(get_current_active_user)])
 def export_cre_excel(session: SessionDep, data_in: list[MotifSearch]):
     """
@@ -216,3 +287,72 @@ def send_cre_excel_email(session: SessionDep, data_in: CreResultSendEmail):
 
     """
     return ExportCreController.send_cre_excel_email(session, data_in)
+
+
+@router.post(
+    "/{user_id}/search-jobs",
+    response_model=SearchJobOut,
+    dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
+)
+def create_search_job(session: SessionDep, data_in: SearchJobIn, user_id: int):
+    """
+    Submit a search or Excel export of several sequences as a background
+    job. The job is linked to a new search history entry. Jobs run exact
+    searches (`max_mismatches` 0).
+
+    Returns:
+    - The queued job.
+    """
+    return SearchJobController.create_search_job(session, data_in, user_id)
+
+
+@router.get(
+    "/{user_id}/search-jobs",
+    response_model=SearchJobListOut,
+    dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
+)
+def read_search_jobs(session: SessionDep, user_id: int):
+    return SearchJobController.read_search_jobs(session, user_id)
+
+
+@router.get(
+    "/{user_id}/search-jobs/{job_id}",
+    response_model=SearchJobOut,
+    dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
+)
+def read_search_job(session: SessionDep, user_id: int, job_id: uuid.UUID):
+    return SearchJobController.read_search_job(session, job_id, user_id)
+
+
+@router.get(
+    "/{user_id}/search-jobs/{job_id}/events",
+    dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
+)
+def read_search_job_events(user_id: int, job_id: uuid.UUID):
+    """
+    Server-sent events with the progress of the job, ending with an event
+    named after its final status.
+    """
+    return StreamingResponse(
+        SearchJobController.stream_search_job_events(job_id, user_id),
+        media_type="text/event-stream",
+    )
+
+
+@router.get(
+    "/{user_id}/search-jobs/{job_id}/result",
+    response_model=SearchJobResultOut,
+    dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
+)
+def read_search_job_result(session: SessionDep, user_id: int, job_id: uuid.UUID):
+    """Search results as JSON, or the workbook of an export job."""
+    return SearchJobController.read_search_job_result(session, job_id, user_id)
+
+
+@router.delete(
+    "/{user_id}/search-jobs/{job_id}",
+    response_model=SearchJobOut,
+    dependencies=[Depends(get_current_active_user), Depends(verify_user_id)],
+)
+def cancel_search_job(session: SessionDep, user_id: int, job_id: uuid.UUID):
+    return SearchJobController.cancel_search_job(session, job_id, user_id)
@@ -6,6 +6,7 @@ from pydantic import (
     BeforeValidator,
     PostgresDsn,
     computed_field,
+    model_validator,
 )
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -66,11 +67,94 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Report the number of SQL statements of each request in a response
+    # header; unset, only local development reports them
+    DB_QUERY_COUNT_HEADER: bool | None = None
+
+    @model_validator(mode="after")
+    def _default_query_count_header(self) -> "Settings":
+        if self.DB_QUERY_COUNT_HEADER is None:
+            self.DB_QUERY_COUNT_HEADER = self.ENVIRONMENT == "local"
+        return self
+
     # Email
     EMAIL_HOST: str
     EMAIL_PORT: int
     EMAIL_HOST_USER: str
     EMAIL_HOST_PASSWORD: str
 
+    # CRE search
+    CRE_SEARCH_ENGINE: Literal["regex", "aho_corasick", "bit_parallel"] = "regex"
+    # Scan both strands in one pass; pays off with the single-pass engines
+    CRE_FOLD_STRANDS: bool = False
+    # Search result cache, keyed by sequence digest and catalog version
+    CRE_RESULT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    CRE_RESULT_CACHE_MAX_ENTRY_BYTES: int = 16 * 1024 * 1024
+    # Number of most frequent history sequences searched at startup (0 = off)
+    CRE_RESULT_CACHE_WARMUP: int = 0
+    # Process pool for the motif scan (0 workers scans in the request thread)
+    CRE_SCAN_WORKERS: int = 2
+    # Scans allowed to wait for a worker before requests get a 503
+    CRE_SCAN_QUEUE_SIZE: int = 8
+    CRE_SCAN_RETRY_AFTER: int = 5
+    # Shorter sequences are scanned inline, shipping them costs more
+    CRE_SCAN_POOL_MIN_LENGTH: int = 10_000
+    # Longer sequences are split into overlapping chunks scanned in parallel
+    CRE_SCAN_CHUNK_SIZE: int = 2_000_000
+    # Largest `max_mismatches` of the mismatch-tolerant search
+    CRE_MAX_MISMATCHES: int = 2
+    # Longest record accepted by the streaming multi-FASTA search
+    CRE_FASTA_MAX_RECORD_LENGTH: int = 10_000_000
+    # Background search/export jobs
+    CRE_JOB_WORKERS: int = 2
+    # Running jobs refresh their row this often while they run, jobs not
+    # refreshed for `CRE_JOB_STALE_AFTER` seconds are failed as orphaned
+    CRE_JOB_HEARTBEAT_INTERVAL: int = 60
+    CRE_JOB_STALE_AFTER: int = 600
+    CRE_JOB_EVENTS_INTERVAL: float = 1.0
+
+    # Motif sampler processes run at once (0 = number of CPUs)
+    MOTIF_SAMPLER_CONCURRENCY: int = 0
+    # Runs allowed to wait for a slot before requests get a 503
+    MOTIF_SAMPLER_QUEUE_SIZE: int = 16
+    MOTIF_SAMPLER_RETRY_AFTER: int = 30
+    # Runs taking longer (seconds) are killed
+    MOTIF_SAMPLER_TIMEOUT: float = 600
+    # Limits of the sampler inputs, checked while they are uploaded
+    MOTIF_SAMPLER_MAX_UPLOAD_SIZE: int = 50_000_000
+    MOTIF_SAMPLER_MAX_RECORDS: int = 10_000
+    MOTIF_SAMPLER_MAX_BASES: int = 10_000_000
+    MOTIF_SAMPLER_MAX_BACKGROUND_SIZE: int = 5_000_000
+    # Cache of the parsed sampler results (empty = in the system temporary
+    # directory, 0 bytes = off)
+    MOTIF_SAMPLER_CACHE_DIR: str = ""
+    MOTIF_SAMPLER_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # Most sampler runs of a parameter sweep
+    MOTIF_SAMPLER_MAX_SWEEP_RUNS: int = 64
+    # Mean column similarity (1 - total variation distance) of two aligned
+    # matrices clustered as the same motif
+    MOTIF_CLUSTER_MIN_SIMILARITY: float = 0.8
+    # Per-run working directories (empty = in the system temporary directory)
+    MOTIF_SAMPLER_WORKSPACE_DIR: str = ""
+    # Finished workspaces are removed after this many seconds, oldest first
+    # beyond this many bytes in total
+    MOTIF_SAMPLER_WORKSPACE_TTL: int = 3600
+    MOTIF_SAMPLER_WORKSPACE_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # Motif matrices and backgrounds
+    # Directory of the `.bg` background models used by the hit statistics
+    MOTIF_BACKGROUND_DIR: str = "./app/media_motifsampler"
+    # Highest Markov order of the backgrounds built from uploaded FASTA
+    MOTIF_BACKGROUND_MAX_ORDER: int = 5
+    # Largest (decompressed) FASTA accepted by the background builder
+    MOTIF_BACKGROUND_MAX_UPLOAD_SIZE: int = 100_000_000
+    # Directory of the backgrounds built from uploads (default: under the
+    # system temporary directory), the least recently stored ones removed
+    # beyond this many bytes in total
+    MOTIF_BACKGROUND_STORE_DIR: str = ""
+    MOTIF_BACKGROUND_STORE_MAX_BYTES: int = 64 * 1024 * 1024
+    # P-value threshold of the PWM scan when the request sets none
+    MOTIF_PWM_MAX_P_VALUE: float = 1e-4
+
 
 settings = Settings()  # type: ignore
@@ -1,11 +1,13 @@
 import json
-from sqlalchemy import func
+from sqlalchemy import event, func
 from sqlmodel import Session, create_engine, select
 
 from utils import random_color
 from core.config import settings
+from core.query_count import count_query
 
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+event.listen(engine, "before_cursor_execute", count_query)
 
 
 def init_db(session: Session) -> None:
@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+QUERY_COUNT_HEADER = b"x-db-query-count"
+
+
+class QueryCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+# The counter is shared by reference with the threads a request runs its
+# sync endpoints and dependencies in, which get a copy of the context
+_query_counter: ContextVar[QueryCounter | None] = ContextVar(
+    "query_counter", default=None
+)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    """`before_cursor_execute` listener of the database engine."""
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed in the current context."""
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+class QueryCountMiddleware:
+    """
+    Add the number of SQL statements a request executed before its response
+    started as an `X-DB-Query-Count` header. Streamed bodies that query
+    while streaming are only counted up to the first chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((QUERY_COUNT_HEADER, str(counter.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
@@ -1,20 +1,57 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from sqlmodel import Session
 from starlette.middleware.cors import CORSMiddleware
 
+from api.applications.cre.job_runner import job_runner
+from api.applications.cre.scan_pool import scan_pool
+from api.applications.cre.search_cre_controller import warm_up_result_cache
+from api.applications.motif.sampler_workspace import collect_workspaces
 from api.main import api_router
 from core.config import settings
+from core.db import engine
+from core.query_count import QueryCountMiddleware
+
+logger = logging.getLogger(__name__)
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+def _warm_up_result_cache():
+    try:
+        with Session(engine) as session:
+            count = warm_up_result_cache(session, settings.CRE_RESULT_CACHE_WARMUP)
+        logger.info("Warmed up the CRE result cache with %d sequences", count)
+    except Exception:
+        logger.exception("CRE result cache warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scan_pool.start()
+    job_runner.start()
+    # Sampler workspaces expired while the app was down
+    threading.Thread(target=collect_workspaces, daemon=True).start()
+    if settings.CRE_RESULT_CACHE_WARMUP > 0:
+        # Off the event loop so the app accepts requests while warming up
+        threading.Thread(target=_warm_up_result_cache, daemon=True).start()
+    yield
+    job_runner.shutdown()
+    scan_pool.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
     root_path=settings.ROOT_PATH,
+    lifespan=lifespan,
 )
 
 
@@ -37,4 +74,7 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+if settings.DB_QUERY_COUNT_HEADER:
+    app.add_middleware(QueryCountMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
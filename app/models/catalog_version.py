@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlmodel import Field, SQLModel
+
+
+# Single-row table used as a cross-worker change counter for the factor catalog
+class CatalogVersion(SQLModel, table=True):
+    id: int = Field(default=None, primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,7 @@
 from datetime import datetime
-from sqlmodel import Field, SQLModel
+
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary
+from sqlmodel import Field, Relationship, SQLModel
 
 
 class ComputationalMotifBase(SQLModel):
@@ -8,19 +10,57 @@ class ComputationalMotifBase(SQLModel):
 
 class ComputationalMotif(ComputationalMotifBase, table=True):
     id: int = Field(default=None, primary_key=True)
+    # Motif sampler id and score of the motif, when saved with its matrix
+    matrix_name: str | None = Field(default=None, nullable=True)
+    score: float | None = Field(default=None, nullable=True)
+    # Position frequency matrix: little-endian float32 rows of A, C, G, T
+    matrix: bytes | None = Field(
+        default=None, sa_column=Column(LargeBinary, nullable=True)
+    )
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
+    sites: list["ComputationalMotifSite"] = Relationship(
+        back_populates="motif",
+        sa_relationship_kwargs={"cascade": "all, delete-orphan"},
+    )
+
     class Config:
         from_attributes = True
 
 
+class ComputationalMotifSiteBase(SQLModel):
+    # Site instance of the motif sampler GFF output
+    sequence_name: str
+    start: int
+    end: int
+    strand: str
+    score: float
+    site: str
+
+
+class ComputationalMotifSite(ComputationalMotifSiteBase, table=True):
+    id: int = Field(default=None, primary_key=True)
+    motif_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("computationalmotif.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        )
+    )
+
+    motif: ComputationalMotif = Relationship(back_populates="sites")
+
+
 class ComputationalMotifIn(ComputationalMotifBase):
     pass
 
 
 class ComputationalMotifOut(ComputationalMotifBase):
     id: int
+    matrix_name: str | None = None
+    score: float | None = None
     created_at: datetime
     updated_at: datetime
 
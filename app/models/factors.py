@@ -1,8 +1,13 @@
+from enum import Enum
+import re
+
 from fastapi import File, Form, UploadFile
 from pydantic import field_validator
 from sqlmodel import Field, Relationship, SQLModel
 import uuid
+from core.config import settings
 from models.factors_function_labels import FactorsFunctionLabels
+from models.motif_matrix import MotifMatrixOut
 
 
 class FactorsBase(SQLModel):
@@ -55,8 +60,32 @@ class FactorsListOut(SQLModel):
     count: int
 
 
+# IUPAC nucleotide codes, U and gaps, either case
+_SEARCH_SEQUENCE = re.compile(r"[ACGTURYSWKMBDHVN-]*", re.IGNORECASE)
+
+
 class MotifSearch(SQLModel):
     sequence: str
+    # Substitutions allowed per match, 0 for an exact search
+    max_mismatches: int = Field(default=0, ge=0, le=settings.CRE_MAX_MISMATCHES)
+
+    @field_validator("sequence")
+    def check_is_nucleotide_sequence(cls, v):
+        # The search reads the sequence as IUPAC codes, anything else would
+        # be searched (and reverse complemented) as a gap
+        if not _SEARCH_SEQUENCE.fullmatch(v):
+            invalid = "".join(sorted(set(_SEARCH_SEQUENCE.sub("", v))))
+            raise ValueError(f"Invalid characters in sequence: {invalid!r}")
+        return v
+
+
+class SearchMode(str, Enum):
+    # Every match position
+    POSITIONS = "positions"
+    # Number of matches per factor
+    COUNTS = "counts"
+    # Factors matched at least once
+    PRESENCE = "presence"
 
 
 class Position(SQLModel):
@@ -84,6 +113,29 @@ class MotifSearchAndSaveHistoryOut(MotifSearchOut):
     history_id: int
 
 
+class FastaRecordSearchOut(SQLModel):
+    record_index: int
+    id: str
+    header: str
+    length: int
+    forward_strand_matches: list[StrandMatch]
+    reverse_strand_matches: list[StrandMatch]
+
+
+class FastaSearchErrorOut(SQLModel):
+    record_index: int | None = None
+    error: str
+
+
+class CreResultCacheStatsOut(SQLModel):
+    entries: int
+    current_bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
 class QueryCreSearchIn(SQLModel):
     id: str | None = None
     ac: str | None = None
@@ -126,6 +178,27 @@ class MotifSamplerResponse(SQLModel):
     status: str
     message: str
     results: list[str] | None = None
+    matrices: list[MotifMatrixOut] | None = None
+    # The results of an identical earlier run, from the sampler cache
+    cached: bool = False
+
+
+class MotifSamplerCacheStatsOut(CreResultCacheStatsOut):
+    pass
+
+
+class MotifSamplerStatsOut(SQLModel):
+    concurrency: int
+    queue_size: int
+    running: int
+    waiting: int
+    completed: int
+    failed: int
+    timed_out: int
+    rejected: int
+    # Total seconds spent waiting for a slot and running
+    wait_seconds: float
+    run_seconds: float
 
 
 class CreResultSendEmail(SQLModel):
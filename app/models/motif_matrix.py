@@ -0,0 +1,104 @@
+from sqlmodel import Field, SQLModel
+
+from models.computational_motif import ComputationalMotifSiteBase
+
+
+class MotifSite(ComputationalMotifSiteBase):
+    pass
+
+
+class MotifMatrixIn(SQLModel):
+    name: str
+    # One row per motif position: the probabilities (or counts) of A, C, G, T
+    probabilities: list[list[float]]
+    consensus: str | None = None
+    score: float | None = None
+    sites: list[MotifSite] = []
+
+
+class MotifMatrixOut(SQLModel):
+    name: str
+    probabilities: list[list[float]]
+    consensus: str
+    score: float | None = None
+    sites: list[MotifSite] = []
+
+
+class PWMScanIn(SQLModel):
+    sequence: str
+    matrices: list[MotifMatrixIn] = []
+    # Saved computational motifs whose matrices are scanned too
+    motif_ids: list[int] = []
+    # Frequencies of A, C, G, T; uniform by default
+    background: list[float] | None = None
+    # Lowest log2-odds score of a hit, in bits
+    min_score: float | None = None
+    max_p_value: float | None = Field(default=None, gt=0, le=1)
+
+
+class PWMPosition(SQLModel):
+    start: int
+    end: int
+    score: float
+    p_value: float
+
+
+class PWMStrandMatch(SQLModel):
+    matrix: str
+    consensus: str
+    positions: list[PWMPosition]
+
+
+class PWMScanOut(SQLModel):
+    forward_strand_matches: list[PWMStrandMatch]
+    reverse_strand_matches: list[PWMStrandMatch]
+
+
+class MotifBackgroundOut(SQLModel):
+    # `.bg` name, for the sampler `background` and the search `background`
+    name: str
+    order: int
+    digest: str
+    # Frequencies of A, C, G, T
+    frequencies: list[float]
+    # Records and unambiguous bases counted, for a background just built
+    sequences: int | None = None
+    bases: int | None = None
+
+
+class MotifSweepRun(SQLModel):
+    w: int
+    n: int
+    replicate: int
+    cached: bool = False
+    # Matrices found, none when the run failed with `error`
+    motifs: int = 0
+    error: str | None = None
+
+
+class MotifClusterMember(SQLModel):
+    # Index of the run in `MotifSweepOut.runs`
+    run: int
+    name: str
+    consensus: str
+    score: float | None = None
+    # Alignment on the first matrix of the cluster
+    similarity: float
+    offset: int
+    strand: str
+
+
+class MotifCluster(SQLModel):
+    consensus: str
+    # Highest scoring matrix of the cluster
+    matrix: MotifMatrixOut
+    occurrences: int
+    # Successful runs that found the motif, and their share of all of them
+    runs: int
+    frequency: float
+    members: list[MotifClusterMember]
+
+
+class MotifSweepOut(SQLModel):
+    runs: list[MotifSweepRun]
+    clusters: list[MotifCluster]
@@ -0,0 +1,84 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from sqlalchemy import JSON, Column, LargeBinary
+from sqlmodel import Field, SQLModel
+
+from models.factors import MotifSearch, MotifSearchOut
+
+
+class SearchJobKind(str, Enum):
+    SEARCH = "search"
+    EXPORT = "export"
+
+
+class SearchJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_JOB_STATUSES = (
+    SearchJobStatus.SUCCEEDED.value,
+    SearchJobStatus.FAILED.value,
+    SearchJobStatus.CANCELLED.value,
+)
+
+
+class SearchJobBase(SQLModel):
+    kind: str = Field(default=SearchJobKind.SEARCH.value)
+    status: str = Field(default=SearchJobStatus.QUEUED.value, index=True)
+    total: int = Field(default=0)
+    completed: int = Field(default=0)
+    error: str | None = Field(default=None, nullable=True)
+    user_id: int | None = Field(default=None, foreign_key="user.id", nullable=True)
+    history_id: int | None = Field(
+        default=None, foreign_key="searchforcrehistory.id", nullable=True
+    )
+
+
+class SearchJob(SearchJobBase, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    sequences: list[str] = Field(default=[], sa_column=Column(JSON, nullable=False))
+    # MotifSearchOut dumps of a search job
+    results: list[dict[str, Any]] | None = Field(
+        default=None, sa_column=Column(JSON, nullable=True)
+    )
+    # Workbook of an export job
+    result_file: bytes | None = Field(
+        default=None, sa_column=Column(LargeBinary, nullable=True)
+    )
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: datetime | None = Field(default=None, nullable=True)
+    finished_at: datetime | None = Field(default=None, nullable=True)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        from_attributes = True
+
+
+class SearchJobIn(SQLModel):
+    kind: SearchJobKind = SearchJobKind.SEARCH
+    sequences: list[MotifSearch]
+
+
+class SearchJobOut(SearchJobBase):
+    id: uuid.UUID
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    updated_at: datetime
+
+
+class SearchJobListOut(SQLModel):
+    data: list[SearchJobOut]
+    count: int
+
+
+class SearchJobResultOut(SQLModel):
+    id: uuid.UUID
+    results: list[MotifSearchOut]
@@ -0,0 +1,37 @@
+import numpy as np
+
+from api.applications.cre.engines.bit_parallel_engine import BitParallelMatcher
+from api.applications.cre.hit_table import (
+    FORWARD,
+    fewest_mismatches_non_overlapping,
+    non_overlapping,
+)
+
+
+def _forward_hits(database, sequence, max_mismatches):
+    hits = BitParallelMatcher(database).find_approximate_hits(sequence, max_mismatches)
+    hits = hits.strand(FORWARD)
+    return list(zip(hits.starts.tolist(), hits.mismatches.tolist()))
+
+
+def test_exact_occurrence_wins_over_overlapping_approximate_one():
+    database = {"M1": "AAAAAC"}
+    assert _forward_hits(database, "GAAAAAAC", 0) == [(2, 0)]
+    # The 1-mismatch candidate at 1 overlaps the exact occurrence at 2
+    assert _forward_hits(database, "GAAAAAAC", 1) == [(2, 0)]
+
+
+def test_equal_mismatches_reduce_leftmost_first():
+    starts = np.array([0, 2, 4, 6, 8])
+    mismatches = np.array([1, 1, 1, 1, 1])
+    kept = fewest_mismatches_non_overlapping(starts, mismatches, 4)
+    assert starts[kept].tolist() == starts[non_overlapping(starts, 4)].tolist() == [0, 4, 8]
+
+
+def test_fewer_mismatches_kept_then_leftmost():
+    starts = np.array([0, 2, 3, 5, 9])
+    mismatches = np.array([2, 1, 0, 1, 2])
+    kept = fewest_mismatches_non_overlapping(starts, mismatches, 3)
+    # 3 (0 mm) blocks 2 and 5, then 0 and 9 fit around it
+    assert starts[kept].tolist() == [0, 3, 9]
+    assert mismatches[kept].tolist() == [2, 0, 2]
@@ -0,0 +1,72 @@
+"""
+Benchmark the mismatch-tolerant CRE search against the exact search.
+
+Runs without a database: the catalog is read from app/init_data/factors.json.
+Both searches use the bit-parallel engine on both strands of a random
+sequence, the exact one through `find_hits`, the others through
+`find_approximate_hits`.
+
+    python scripts/benchmark_approximate_search.py --sizes 1 --mismatches 1 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from api.applications.cre.encoded_sequence import BASE_MASKS, EncodedSequence  # noqa: E402
+from api.applications.cre.engines import SEARCH_ENGINES  # noqa: E402
+
+
+def load_database() -> dict[str, str]:
+    with open(os.path.join(APP_DIR, "init_data", "factors.json")) as file:
+        return {item["fields"]["ac"]: item["fields"]["sq"] for item in json.load(file)}
+
+
+def random_sequence(length: int, seed: int) -> EncodedSequence:
+    masks = np.array(list(BASE_MASKS.values()), dtype=np.uint8)
+    return EncodedSequence(np.random.default_rng(seed).choice(masks, size=length))
+
+
+def best_of(repeat: int, function, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1], help="Mb")
+    parser.add_argument("--mismatches", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    matcher = SEARCH_ENGINES["bit_parallel"](load_database())
+    print(f"motifs={len(matcher.motifs)} cpus={os.cpu_count()}")
+
+    for size in args.sizes:
+        sequence = random_sequence(int(size * 1_000_000), seed=int(size * 1000))
+        exact, hits = best_of(args.repeat, matcher.find_hits, sequence)
+        print(f"{size:>6} Mb  exact  {exact:8.2f} s  {len(hits):>9} hits")
+
+        for max_mismatches in args.mismatches:
+            elapsed, hits = best_of(
+                args.repeat, matcher.find_approximate_hits, sequence, max_mismatches
+            )
+            print(
+                f"{size:>6} Mb  k={max_mismatches:<4} {elapsed:8.2f} s  {len(hits):>9} hits"
+                f"  {elapsed / exact:5.2f}x exact"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark the chunk-sharded CRE scan against a single serial scan.
+
+Runs without a database: the catalog is read from app/init_data/factors.json
+and every worker process compiles its own matcher, like the scan pool does.
+
+    python scripts/benchmark_sharded_scan.py --sizes 10 50 100 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from api.applications.cre.encoded_sequence import BASE_MASKS, EncodedSequence  # noqa: E402
+from api.applications.cre.engines import SEARCH_ENGINES, StrandFoldedMatcher  # noqa: E402
+from api.applications.cre.engines.sharding import (  # noqa: E402
+    chunk_bounds,
+    find_chunk_starts,
+    merge_chunk_starts,
+)
+
+_matcher = None
+
+
+def load_database() -> dict[str, str]:
+    with open(os.path.join(APP_DIR, "init_data", "factors.json")) as file:
+        return {item["fields"]["ac"]: item["fields"]["sq"] for item in json.load(file)}
+
+
+def build_matcher(engine: str, fold_strands: bool):
+    database = load_database()
+    if fold_strands:
+        return StrandFoldedMatcher(SEARCH_ENGINES[engine], database)
+    return SEARCH_ENGINES[engine](database)
+
+
+def _init_worker(engine: str, fold_strands: bool) -> None:
+    global _matcher
+    _matcher = build_matcher(engine, fold_strands)
+
+
+def _scan_chunk(packed: bytes, length: int, core_length: int):
+    chunk = EncodedSequence.from_packed(packed, length)
+    return find_chunk_starts(_matcher, chunk, core_length)
+
+
+def random_sequence(length: int, seed: int) -> EncodedSequence:
+    masks = np.array(list(BASE_MASKS.values()), dtype=np.uint8)
+    return EncodedSequence(np.random.default_rng(seed).choice(masks, size=length))
+
+
+def sharded_scan(executor, matcher, sequence, chunk_size):
+    bounds = chunk_bounds(len(sequence), chunk_size, matcher.max_motif_length - 1)
+    futures = []
+    for start, core_end, end in bounds:
+        chunk = sequence[start:end]
+        futures.append(
+            executor.submit(_scan_chunk, chunk.packed(), len(chunk), core_end - start)
+        )
+    forward, reverse = merge_chunk_starts(
+        bounds, [future.result() for future in futures], len(sequence)
+    )
+    return matcher.build_matches(forward), matcher.build_matches(reverse)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10], help="Mb")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-size", type=int, default=2_000_000)
+    parser.add_argument("--engine", choices=sorted(SEARCH_ENGINES), default="aho_corasick")
+    parser.add_argument("--fold-strands", action="store_true")
+    args = parser.parse_args()
+
+    matcher = build_matcher(args.engine, args.fold_strands)
+    print(f"engine={args.engine} fold_strands={args.fold_strands} cpus={os.cpu_count()}")
+
+    for size in args.sizes:
+        sequence = random_sequence(size * 1_000_000, seed=size)
+
+        started = time.perf_counter()
+        expected = matcher.find_both_strands(sequence)
+        serial = time.perf_counter() - started
+        print(f"{size:>4} Mb  serial      {serial:8.2f} s")
+
+        for workers in args.workers:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(args.engine, args.fold_strands),
+            ) as executor:
+                # Start every worker before timing
+                list(executor.map(_scan_chunk, [b""] * workers, [0] * workers, [0] * workers))
+                started = time.perf_counter()
+                result = sharded_scan(executor, matcher, sequence, args.chunk_size)
+                elapsed = time.perf_counter() - started
+            status = "ok" if result == expected else "MISMATCH"
+            print(
+                f"{size:>4} Mb  {workers:>2} workers  {elapsed:8.2f} s"
+                f"  speed-up {serial / elapsed:5.2f}x  {status}"
+            )
+
+
+if __name__ == "__main__":
+    main()